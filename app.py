@@ -2,7 +2,8 @@
 # Archivo principal de la aplicación Flask.
 # Contiene la clase PaginaWeb que encapsula la app, la conexión a la DB y todas las rutas.
 
-from flask import Flask, render_template, request, session, redirect, url_for, jsonify
+from flask import Flask, render_template, request, session, redirect, url_for, jsonify, send_file
+from flask import Response, stream_with_context
 # Importa las herramientas de Flask que se usan:
 # - Flask: para crear la app
 # - render_template: para renderizar archivos HTML (Jinja2)
@@ -10,37 +11,281 @@ from flask import Flask, render_template, request, session, redirect, url_for, j
 # - session: para almacenar datos por usuario (carrito, usuario logueado)
 # - redirect / url_for: para redireccionamientos
 # - jsonify: para responder JSON en endpoints AJAX
+# - send_file: para enviar archivos (imágenes redimensionadas) con ETag
+# - Response / stream_with_context: para respuestas que se generan y envían por partes (streaming)
 
-import mysql.connector
-# Conector para MySQL (permite conectar y ejecutar queries)
+from jinja2 import FileSystemBytecodeCache
+# Guarda en disco las plantillas ya compiladas, así un worker nuevo no las vuelve a compilar
+
+import json
+import os
+import sys
+import time
+import uuid
+# uuid: genera el id del carrito que se guarda en la cookie de sesión
+
+from datetime import date, timedelta
+# date/timedelta: para validar los filtros de fecha (AAAA-MM-DD) de ventas y reportes
+
+import configuracion
+# Valores por defecto, archivo de configuración y variables de entorno PAGINAWEB_* (ver configuracion.py)
+
+from conexion import PoolConexiones, PoolAgotado
+# Pool de conexiones MySQL (una conexión por petición, ver conexion.py)
+
+from repositorios import (RepoUsuario, RepoProducto, RepoProveedor, RepoComprador,
+                          RepoVenta, RepoVentaDetalle, LineaVenta, agrupar_por_venta)
+# Acceso a datos por tabla con sentencias preparadas (ver repositorios.py)
+
+from cache_productos import CacheProductos
+# Caché en memoria del catálogo de productos (ver cache_productos.py)
+
+from carrito_store import crear_store
+# Carritos guardados en el servidor (memoria o SQLite), ver carrito_store.py
+
+from assets import Assets
+# Archivos estáticos con hash, WebP y precomprimidos (ver assets.py)
+
+from imagenes import CacheDisco, Redimensionador, ancho_permitido
+# Imágenes de productos redimensionadas bajo demanda (ver imagenes.py)
+
+from busqueda import IndiceProductos
+# Índice invertido para la búsqueda de productos (ver busqueda.py)
+
+from reportes import Resumenes
+# Tablas resumen de ventas para los reportes (ver reportes.py)
+
+import importacion
+# Importación/exportación masiva en CSV o JSON Lines (ver importacion.py)
+
+from replicas import Enrutador
+# Lecturas repartidas entre réplicas de MySQL, escrituras al primario (ver replicas.py)
+
+from cola_compras import ColaCompras, ColaLlena, CompraPendiente
+# Cola de compras con commit agrupado para horas pico (ver cola_compras.py)
+
+from inventario import SinStock, descontar_stock
+# Descuento atómico de stock al confirmar una compra (ver inventario.py)
+
+from compresion import Compresor
+# Compresión gzip/brotli negociada de las respuestas (ver compresion.py)
+
+from metricas import Metricas
+# Latencia por ruta y tiempos de consultas SQL, expuestos en /metrics (ver metricas.py)
+
+from cache_paginas import CachePaginas, crear_backend
+# Caché de páginas completas para visitantes anónimos, con ETag y 304 (ver cache_paginas.py)
 
 class PaginaWeb:
     # Clase que agrupa la aplicación, la conexión a la DB y la configuración de rutas.
-    def __init__(self, nombre):
-        # Constructor: crea la app Flask y configura la base de datos.
+    def __init__(self, nombre, config_db=None, config=None, archivo_config=None):
+        # Constructor: crea la app Flask y configura sus componentes.
+        # Nada aquí abre conexiones a MySQL ni inicia hilos: las conexiones se piden al pool con la
+        # primera consulta de cada petición, así la app se puede crear en el proceso maestro
+        # (gunicorn --preload) antes de hacer fork de los workers.
+        # config_db: parámetros de conexión a MySQL distintos a los de DB_* (por ejemplo, benchmark.py).
+        # config / archivo_config: configuración adicional (ver configuracion.py).
         self.app = Flask(nombre)
-        # Clave secreta para sesiones (cookies firmadas). En producción debe venir de variable de entorno.
-        self.app.secret_key = "superclave"
-
-        # 🔹 CONEXIÓN A MYSQL (AGREGADO)
-        # Se establece la conexión a la base de datos MySQL.
-        # ⚠️ Atención: aquí la contraseña está vacía. En producción debes usar credenciales seguras y variables de entorno.
-        self.db = mysql.connector.connect(
-            host="localhost",
-            user="root",
-            password="",  # si tu MySQL tiene contraseña, agrégala aquí
-            database="postres"
+        configuracion.cargar(self.app, archivo_config, config)
+        self.app.extensions["paginaweb"] = self
+
+        # 🔹 PLANTILLAS
+        # Caché de bytecode de Jinja en disco: se configura antes de que Flask cree el entorno Jinja.
+        if self.app.config["PLANTILLAS_CACHE_DIR"]:
+            carpeta = os.path.join(self.app.root_path, self.app.config["PLANTILLAS_CACHE_DIR"])
+            os.makedirs(carpeta, exist_ok=True)
+            self.app.jinja_options = dict(self.app.jinja_options,
+                                          bytecode_cache=FileSystemBytecodeCache(carpeta))
+
+        # 🔹 CONEXIÓN A MYSQL (POOL)
+        # En lugar de una sola conexión compartida por todas las rutas, se usa un pool:
+        # cada petición toma su propia conexión y la devuelve al terminar (ver conexion.py).
+        primario = config_db or configuracion.config_db(self.app.config)
+        self.pool = PoolConexiones(
+            primario,
+            tamano=self.app.config["DB_POOL_SIZE"],
+            espera_max=self.app.config["DB_POOL_TIMEOUT"],
+            max_inactiva=self.app.config["DB_POOL_MAX_INACTIVA"],
         )
-        # Cursor con dictionary=True para recibir cada fila como dict {columna: valor}
-        self.cursor = self.db.cursor(dictionary=True)
+        # Devuelve la conexión al pool en el teardown de cada petición
+        self.pool.registrar(self.app)
+
+        # 🔹 RÉPLICAS DE LECTURA
+        # Los listados y reportes leen de las réplicas (si hay) y las escrituras van al primario.
+        replicas = [
+            PoolConexiones(
+                parametros,
+                tamano=self.app.config["DB_POOL_SIZE"],
+                espera_max=self.app.config["DB_POOL_TIMEOUT"],
+                max_inactiva=self.app.config["DB_POOL_MAX_INACTIVA"],
+                nombre="replica%d" % i,
+            )
+            for i, parametros in enumerate(configuracion.config_replicas(self.app.config, primario))
+        ]
+        self.enrutador = Enrutador(
+            self.pool,
+            replicas,
+            pegajosa=self.app.config["DB_REPLICA_PEGAJOSA"],
+            reintento=self.app.config["DB_REPLICA_REINTENTO"],
+        )
+        self.enrutador.registrar(self.app)
+
+        # 🔹 ACCESO A DATOS
+        # Una clase por tabla, con sentencias preparadas y filas como tuplas (ver repositorios.py)
+        self.usuarios = RepoUsuario(self.pool)
+        self.productos = RepoProducto(self.pool, self.enrutador)
+        self.proveedores = RepoProveedor(self.pool, self.enrutador)
+        self.compradores = RepoComprador(self.pool)
+        self.ventas = RepoVenta(self.pool, self.enrutador)
+        self.detalles = RepoVentaDetalle(self.pool, self.enrutador)
+
+        # 🔹 MÉTRICAS
+        # Cada cursor de petición se envuelve para medir sus consultas; /metrics expone los datos.
+        self.metricas = Metricas(lenta=self.app.config["METRICAS_CONSULTA_LENTA"])
+        self.metricas.perfilado = self.app.config["PERFILADO_HABILITADO"]
+        self.metricas.registrar(self.app)
+        self.pool.envolver_cursor = self.metricas.envolver
+        self.metricas.registrar_fuente("db_pool", self.pool.estadisticas)
+        for replica in self.enrutador.replicas:
+            replica.envolver_cursor = self.metricas.envolver
+            self.metricas.registrar_fuente("db_" + replica.nombre, replica.estadisticas)
+        self.metricas.registrar_fuente("db_lecturas", self.enrutador.estadisticas)
+
+        # 🔹 CACHÉ DEL CATÁLOGO
+        # Los productos se leen de MySQL como máximo una vez cada CATALOGO_TTL segundos,
+        # o después de agregar/editar/eliminar un producto.
+        self.catalogo = CacheProductos(self.cargar_productos, ttl=self.app.config["CATALOGO_TTL"])
+        self._catalogo_modificado = float("-inf")   # momento (monotonic) del último cambio de productos
+        self.metricas.registrar_fuente("catalogo_cache", self.catalogo.estadisticas)
+
+        # 🔹 CACHÉ DE PÁGINAS
+        # HTML ya renderizado de las páginas públicas; las del catálogo se purgan junto con él
+        # (ver invalidar_catalogo). Con backend "" las páginas se renderizan siempre.
+        self.paginas = None
+        if self.app.config["PAGINAS_CACHE_BACKEND"]:
+            self.paginas = CachePaginas(
+                crear_backend(
+                    self.app.config["PAGINAS_CACHE_BACKEND"],
+                    os.path.join(self.app.root_path, self.app.config["PAGINAS_CACHE_DIR"]),
+                    self.app.config["PAGINAS_CACHE_MAX_MB"] * 1024 * 1024,
+                ),
+                ttl=self.app.config["PAGINAS_CACHE_TTL"],
+            )
+            self.metricas.registrar_fuente("paginas_cache", self.paginas.estadisticas)
+
+        # Índice de búsqueda: se sincroniza con el catálogo (solo reindexa lo que cambió)
+        self.busqueda = IndiceProductos()
+
+        # 🔹 RESÚMENES DE VENTAS (reportes)
+        self.resumenes = Resumenes()
+
+        # 🔹 MODO DE CHECKOUT
+        # En modo "grupal" el hilo escritor se crea con la primera compra, no aquí.
+        self.cola_compras = ColaCompras(
+            self.pool,
+            self.insertar_compra,
+            preparar=self.resumenes.asegurar_tablas,
+            max_cola=self.app.config["CHECKOUT_MAX_COLA"],
+            max_lote=self.app.config["CHECKOUT_MAX_LOTE"],
+            espera_lote=self.app.config["CHECKOUT_ESPERA_LOTE"],
+        )
+
+        # 🔹 CARRITO EN EL SERVIDOR
+        opciones = {}
+        if self.app.config["CARRITO_BACKEND"] == "sqlite":
+            # Ruta relativa a la carpeta de la app (no al directorio desde el que se lanza gunicorn)
+            opciones["ruta"] = os.path.join(self.app.root_path, self.app.config["CARRITO_SQLITE_RUTA"])
+        self.carritos = crear_store(self.app.config["CARRITO_BACKEND"], **opciones)
+
+        # 🔹 ARCHIVOS ESTÁTICOS
+        # Genera static/dist (solo si cambió algo en /static) y registra /assets/ y asset_url(...)
+        self.assets = Assets(self.app.static_folder)
+        self.assets.preparar()
+        self.assets.registrar(self.app)
+
+        # 🔹 IMÁGENES DE PRODUCTOS REDIMENSIONADAS
+        # Caché en disco con tamaño máximo; se borran primero las variantes menos usadas.
+        self.imagenes = Redimensionador(
+            self.app.static_folder,
+            CacheDisco(
+                os.path.join(self.app.root_path, self.app.config["IMAGENES_CACHE_DIR"]),
+                self.app.config["IMAGENES_CACHE_MAX_MB"] * 1024 * 1024,
+            ),
+        )
+
+        # 🔹 COMPRESIÓN
+        # gzip/brotli según Accept-Encoding para HTML, JSON, CSV... (ver compresion.py)
+        if self.app.config["COMPRESION_HABILITADA"]:
+            Compresor(
+                minimo=self.app.config["COMPRESION_MINIMO"],
+                nivel_gzip=self.app.config["COMPRESION_NIVEL_GZIP"],
+                nivel_br=self.app.config["COMPRESION_NIVEL_BR"],
+            ).registrar(self.app)
 
         # Configura las rutas de la aplicación
         self.configurar_rutas()
 
+        if self.app.config["PLANTILLAS_PRECOMPILAR"]:
+            self.precompilar_plantillas()
+
+    def precompilar_plantillas(self):
+        # Carga todas las plantillas en el entorno Jinja (y en la caché de bytecode).
+        # Con --preload los workers heredan las plantillas ya compiladas del proceso maestro.
+        entorno = self.app.jinja_env
+        for nombre in entorno.list_templates(extensions=["html"]):
+            entorno.get_template(nombre)
+
+    @property
+    def db(self):
+        # Conexión MySQL de la petición actual (prestada por el pool).
+        return self.pool.conexion()
+
+    @property
+    def cursor(self):
+        # Cursor con dictionary=True de la petición actual: cada fila llega como dict {columna: valor}
+        return self.pool.cursor()
+
+    @property
+    def db_lectura(self):
+        # Conexión para consultas de solo lectura: una réplica, o el primario si no hay
+        # réplicas disponibles o si esta sesión escribió hace poco (ver replicas.py).
+        return self.enrutador.pool_lectura().conexion()
+
+    @property
+    def cursor_lectura(self):
+        # Cursor (dictionary=True) sobre db_lectura
+        return self.enrutador.pool_lectura().cursor()
+
+    def renderizar_por_partes(self, nombre, **contexto):
+        # Como render_template, pero la página se envía a medida que Jinja la genera:
+        # el primer byte sale antes de formatear todas las filas y nunca está completa en memoria.
+        self.app.update_template_context(contexto)
+        flujo = self.app.jinja_env.get_template(nombre).stream(contexto)
+        flujo.enable_buffering(self.app.config["PLANTILLAS_STREAM_BUFFER"])
+        return Response(stream_with_context(flujo), mimetype="text/html")
+
+    def confirmar(self):
+        # Commit de la petición actual en el primario. Las lecturas siguientes de esta
+        # sesión irán al primario por unos segundos, así se ve lo que se acaba de guardar.
+        self.db.commit()
+        self.enrutador.marcar_escritura()
+
+    def asegurar_resumenes(self):
+        # Crea las tablas resumen si hace falta. Se mira la marca antes de usar self.db:
+        # así los reportes (que leen de una réplica) no piden una conexión al primario en cada petición.
+        if not self.resumenes.tablas_listas:
+            self.resumenes.asegurar_tablas(self.db, self.cursor)
+
     def configurar_rutas(self):
         # Método que define todas las rutas (endpoints) de la app.
         # Las rutas usan self.app.route para que queden registradas en la instancia Flask.
 
+        def cachear(*etiquetas):
+            # Decorador de las páginas públicas: usa la caché de páginas si está activada.
+            if self.paginas is None:
+                return lambda vista: vista
+            return self.paginas.cachear(etiquetas)
+
         # --------------------------
         # 🔹 LOGIN POST (AGREGADO)
         # --------------------------
@@ -59,14 +304,8 @@ class PaginaWeb:
                 return render_template("login.html", error="Usuario inválido")
 
             password = request.form.get("password")
-            # Query parametrizada para evitar SQL injection.
-            query = """
-                SELECT * FROM usuario 
-                WHERE Id_Usuario=%s AND Contraseña=%s 
-            """
-            # Ejecuta la query usando parámetros (usuario, password)
-            self.cursor.execute(query, (usuario, password))
-            datos = self.cursor.fetchone()  # trae la primera fila que cumpla la condición
+            # Sentencia preparada con parámetros (evita SQL injection), ver repositorios.py
+            datos = self.usuarios.autenticar(usuario, password)
 
             if datos:
                 # Si se encontró el usuario -> crea sesión y redirige a la página de bienvenida.
@@ -91,103 +330,118 @@ class PaginaWeb:
 
         @self.app.route("/agregar_carrito", methods=["POST"])
         def agregar_carrito():
-            # Añade un producto al carrito almacenado en session.
-            # Los datos llegan por form: titulo, precio, imagen. Se fija cantidad inicial = 1.
-
-            producto = {
-                "titulo": request.form.get("titulo"),
-                "precio": float(request.form.get("precio") or 0),
-                "imagen": request.form.get("imagen"),
-                "cantidad": 1
-            }
-
-            # Si la sesión no tiene carrito, se crea uno vacío (lista).
-            if "carrito" not in session:
-                session["carrito"] = []
-
-            existe = False
-            # Busca si el producto ya está en el carrito; si está, incrementa cantidad.
-            for item in session["carrito"]:
-                if item["titulo"] == producto["titulo"]:
-                    item["cantidad"] += 1
-                    existe = True
-                    break
-
-            # Si no existe, lo añade a la lista del carrito.
-            if not existe:
-                session["carrito"].append(producto)
-
-            # Indica que la sesión fue modificada (para que Flask lo persista)
-            session.modified = True
+            # Añade un producto al carrito del servidor (ver carrito_store.py).
+            # Llega 'id_producto' por form; si no viene (formularios antiguos) se busca por 'titulo'.
+            producto = self.producto_para_carrito(request.form.get("id_producto"), request.form.get("titulo"))
+            if producto is None:
+                return "Producto no encontrado", 404
+
+            # Si ya estaba en el carrito solo se incrementa la cantidad (O(1), por Id_Producto)
+            self.carritos.agregar(self.id_carrito(), producto)
             return "OK"  # Respuesta simple para AJAX
 
         @self.app.route("/carrito")
         def carrito():
-            # Renderiza la vista del carrito mostrando el contenido de la sesión.
-            carrito = session.get("carrito", [])
+            # Renderiza la vista del carrito con los ítems guardados en el servidor.
+            carrito = list(self.carritos.obtener(self.id_carrito()).values())
             return render_template("carrito.html", carrito=carrito)
 
-        @self.app.route("/eliminar_item/<titulo>")
-        def eliminar_item(titulo):
-            # Elimina un ítem del carrito filtrando por título.
-            carrito = session.get("carrito", [])
-            carrito = [item for item in carrito if item["titulo"] != titulo]
-            session["carrito"] = carrito
-            session.modified = True
+        @self.app.route("/eliminar_item/<int:id_producto>")
+        def eliminar_item(id_producto):
+            # Elimina un ítem del carrito por Id_Producto.
+            self.carritos.eliminar(self.id_carrito(), id_producto)
             return redirect(url_for("carrito"))
 
         @self.app.route("/actualizar_cantidad", methods=["POST"])
         def actualizar_cantidad():
-            # Endpoint que actualiza la cantidad de un producto dentro del carrito.
-            # Espera 'titulo' y 'accion' en request.form (accion: 'sumar' o 'restar').
-
-            titulo = request.form.get("titulo")
-            accion = request.form.get("accion")
-
-            carrito = session.get("carrito", [])
-
-            removed = False    # Indica si el item fue removido (cantidad <= 0)
-            nueva_cantidad = None
-
-            # Recorre el carrito para encontrar el item y ajustar cantidad
-            for item in carrito:
-                if item["titulo"] == titulo:
-                    if accion == "sumar":
-                        item["cantidad"] = int(item.get("cantidad", 0)) + 1
-                    elif accion == "restar":
-                        item["cantidad"] = int(item.get("cantidad", 0)) - 1
-
-                    # Si la cantidad queda en 0 o menos, se elimina el item
-                    if item["cantidad"] <= 0:
-                        carrito = [i for i in carrito if i["titulo"] != titulo]
-                        removed = True
-                        nueva_cantidad = 0
-                    else:
-                        nueva_cantidad = item["cantidad"]
-                    break  # sale del loop cuando ya actualizó el item
-
-            # Guarda cambios en session
-            session["carrito"] = carrito
-            session.modified = True
+            # Endpoint que actualiza cantidades del carrito. Acepta:
+            # - form con 'id' (Id_Producto) y 'accion' ('sumar' o 'restar'), o 'id' y 'cantidad' (valor exacto)
+            # - JSON {"items": [{"id": 3, "cantidad": 5}, {"id": 7, "accion": "sumar"}, ...]} para varios a la vez
+            #   (también se acepta directamente la lista [{"id": 3, "cantidad": 5}, ...])
+            # Responde con la nueva cantidad de cada ítem y los totales del carrito, en una sola ida y vuelta.
+            # Un producto que no está en el carrito vuelve con "encontrado": false.
+            datos = request.get_json(silent=True) if request.is_json else None
+            if isinstance(datos, list):
+                cambios = datos
+            elif isinstance(datos, dict) and isinstance(datos.get("items"), list):
+                cambios = datos["items"]
+            elif isinstance(datos, dict) and datos:
+                cambios = [datos]
+            elif request.is_json:
+                return jsonify({"ok": False, "error": "Se esperaba un objeto o una lista de ítems"}), 400
+            else:
+                cambios = [request.form]
+            maximo = self.app.config["CARRITO_CANTIDAD_MAX"]
+
+            # Primero se validan TODOS los cambios y después se aplican: si uno es inválido
+            # se responde 400 sin haber tocado el carrito.
+            validados = []
+            for cambio in cambios:
+                try:
+                    id_producto = int(cambio.get("id"))
+                    cantidad = cambio.get("cantidad")
+                    cantidad = int(cantidad) if cantidad not in (None, "") else None
+                except (TypeError, ValueError, AttributeError):
+                    return jsonify({"ok": False, "error": "Producto o cantidad inválidos"}), 400
+                if cantidad is not None and cantidad > maximo:
+                    # Se corta aquí: un valor enorme fallaría recién en el checkout (columna INT)
+                    return jsonify({"ok": False, "error": "Máximo %d unidades por producto" % maximo}), 400
+                if cantidad is None:
+                    accion = cambio.get("accion")
+                    delta = 1 if accion == "sumar" else -1 if accion == "restar" else 0
+                else:
+                    delta = None
+                validados.append((id_producto, cantidad, delta))
+
+            id_carrito = self.id_carrito()
+            resultados = []
+            for id_producto, cantidad, delta in validados:
+                if cantidad is not None:
+                    # Cantidad exacta (0 o menos elimina el ítem)
+                    nueva_cantidad = self.carritos.fijar(id_carrito, id_producto, cantidad)
+                else:
+                    nueva_cantidad = self.carritos.sumar(id_carrito, id_producto, delta)
+                    if nueva_cantidad is not None and nueva_cantidad > maximo:
+                        nueva_cantidad = self.carritos.fijar(id_carrito, id_producto, maximo)
+
+                resultados.append({
+                    "id": id_producto,
+                    # None: el producto no estaba en el carrito (no se agregó)
+                    "encontrado": nueva_cantidad is not None,
+                    "cantidad": nueva_cantidad or 0,
+                    # Si la cantidad queda en 0 o menos, el store ya eliminó el ítem
+                    "removed": nueva_cantidad == 0,
+                })
 
             # Responde en JSON si la petición viene por AJAX (X-Requested-With) o si es JSON
             if request.headers.get('X-Requested-With') == 'XMLHttpRequest' or request.is_json:
-                return jsonify({"ok": True, "cantidad": nueva_cantidad or 0, "removed": removed})
+                respuesta = {"ok": True, "items": resultados}
+                respuesta.update(self.totales_carrito(self.carritos.obtener(id_carrito)))
+                if len(resultados) == 1:
+                    # Compatibilidad con el formato anterior (un solo ítem)
+                    if not resultados[0]["encontrado"]:
+                        return jsonify({"ok": False, "error": "El producto no está en el carrito"}), 404
+                    respuesta["cantidad"] = resultados[0]["cantidad"]
+                    respuesta["removed"] = resultados[0]["removed"]
+                return jsonify(respuesta)
 
             # Si no es AJAX, redirige a la vista del carrito
             return redirect(url_for("carrito"))
 
         @self.app.route("/")
+        @cachear()
         def index():
             # Ruta raíz -> renderiza index.html
             return render_template("index.html")
 
         @self.app.route('/nosotros')
+        @cachear()
         def nosotros():
             # Muestra la página 'Nosotros'
             return render_template('nosotros.html')
 
         @self.app.route("/contacto", methods=["GET", "POST"])
+        @cachear()
         def contacto():
             # Página de contacto. Si es POST, recoge los datos del formulario
             mensaje_enviado = False
@@ -202,45 +456,109 @@ class PaginaWeb:
             return render_template("contacto.html", mensaje_enviado=mensaje_enviado)
 
         @self.app.route('/login')
+        @cachear()
         def login():
             # Muestra la página de login (GET)
             return render_template('login.html')
 
         @self.app.route('/producto')
+        @cachear("catalogo")
         def producto():
-            # Consulta todos los productos desde la tabla producto y los envía al template.
-            query = "SELECT * FROM producto"
-            self.cursor.execute(query)
-            productos = self.cursor.fetchall()  # devuelve lista de diccionarios
+            # Envía todos los productos al template (desde la caché del catálogo).
+            productos = self.catalogo.todos()  # lista de diccionarios
             return render_template("producto.html", productos=productos)
 
+        @self.app.route("/api/productos/buscar")
+        def buscar_productos():
+            # Búsqueda de productos en JSON.
+            # Parámetros: q (palabras o prefijos, sin importar tildes), precio_min, precio_max,
+            # disponible=1 (solo con stock), pagina, por_pagina
+            try:
+                precio_min = request.args.get("precio_min", type=float)
+                precio_max = request.args.get("precio_max", type=float)
+                pagina = max(1, int(request.args.get("pagina", 1)))
+                por_pagina = int(request.args.get("por_pagina", self.app.config["BUSQUEDA_POR_PAGINA"]))
+            except ValueError:
+                return jsonify({"ok": False, "error": "Parámetros inválidos"}), 400
+            por_pagina = max(1, min(por_pagina, self.app.config["BUSQUEDA_LIMITE_MAX"]))
+            stock_min = 1 if request.args.get("disponible") in ("1", "true", "si") else None
+
+            # Pone el índice al día con el catálogo (no hace nada si el catálogo no cambió)
+            self.busqueda.sincronizar(self.catalogo.todos())
+            encontrados = self.busqueda.buscar(
+                request.args.get("q", ""),
+                precio_min=precio_min,
+                precio_max=precio_max,
+                stock_min=stock_min,
+            )
+
+            inicio = (pagina - 1) * por_pagina
+            return jsonify({
+                "ok": True,
+                "total": len(encontrados),
+                "pagina": pagina,
+                "por_pagina": por_pagina,
+                "resultados": [
+                    {
+                        "id": p["Id_Producto"],
+                        "nombre": p["Nombre_Producto"],
+                        "descripcion": p["Descripcion"],
+                        "precio": float(p["Precio"] or 0),
+                        "stock": p["Stock"],
+                        "imagen": url_for("imagen_producto", id_producto=p["Id_Producto"], ancho=480),
+                    }
+                    for p in encontrados[inicio:inicio + por_pagina]
+                ],
+            })
+
         @self.app.route('/producto_detalle')
+        @cachear()
         def producto_detalle():
             # Página de detalle de producto que recibe datos por query params.
+            id_producto = request.args.get("id", type=int)
             titulo = request.args.get("titulo", "Sin título")
             descripcion = request.args.get("descripcion", "Sin descripción")
             imagen = request.args.get("imagen", "")
             precio = request.args.get("precio")
             return render_template("producto_detalle.html",
+                id_producto=id_producto,
                 titulo=titulo,
                 descripcion=descripcion,
                 imagen=imagen,
                 precio=precio)
 
+        @self.app.route("/imagen/<int:id_producto>")
+        def imagen_producto(id_producto):
+            # Imagen del producto reducida al ancho pedido (?ancho=480), en WebP y con ETag.
+            # El navegador revalida con If-None-Match y recibe 304 si no cambió.
+            producto = self.catalogo.por_id(id_producto)
+            if producto is None or not producto["Imagen"]:
+                return "Imagen no encontrada", 404
+            try:
+                ancho = ancho_permitido(int(request.args.get("ancho", 480)))
+            except ValueError:
+                return "Ancho inválido", 400
+
+            resultado = self.imagenes.obtener(producto["Imagen"], ancho)
+            if resultado is None:
+                # Imagen externa (URL de otro sitio) o Pillow no instalado: se usa la original
+                return redirect(producto["Imagen"])
+
+            archivo, etag = resultado
+            return send_file(archivo, mimetype="image/webp", etag=etag, conditional=True,
+                             max_age=self.app.config["IMAGENES_MAX_AGE"])
+
         @self.app.route("/vaciar_carrito", methods=["POST"])
         def vaciar_carrito():
-            # Vacía el carrito de la sesión (usado después de finalizar compra).
-            session["carrito"] = []
-            session.modified = True
+            # Vacía el carrito (usado después de finalizar compra).
+            self.carritos.vaciar(self.id_carrito())
             return jsonify({"ok": True})
 
         @self.app.route("/gestion_productos")
         def gestion_productos():
-            # Vista para administrar productos (listar)
-            query = "SELECT * FROM producto"
-            self.cursor.execute(query)
-            productos = self.cursor.fetchall()
-            return render_template("gestion_productos.html", productos=productos)
+            # Vista para administrar productos (listar), desde la caché del catálogo
+            productos = self.catalogo.todos()
+            return self.renderizar_por_partes("gestion_productos.html", productos=productos)
 
         @self.app.route("/producto/agregar", methods=["GET","POST"])
         def agregar_producto():
@@ -256,29 +574,76 @@ class PaginaWeb:
             stock = request.form["stock"]
             fecha = request.form["fecha"]
 
-            # Query parametrizada para insertar un nuevo producto.
-            query = """
-                INSERT INTO producto 
-                (Nombre_Producto, Descripcion, Imagen, Precio, Stock, Fecha_Vencimiento, Usuario_D_Creacion, Fecha_Hora_Creacion)
-                VALUES (%s, %s, %s, %s, %s, %s, 'admin', NOW())
-            """
-
-            valores = (nombre, descripcion, imagen, precio, stock, fecha)
-
-            self.cursor.execute(query, valores)
+            # Inserta el nuevo producto
+            self.productos.crear(nombre, descripcion, imagen, precio, stock, fecha)
             # Confirma la transacción en la DB
-            self.db.commit()
+            self.confirmar()
+            # El catálogo cambió: se invalida la caché
+            self.invalidar_catalogo()
 
             # Redirige a la vista de gestión de productos
             return redirect("/gestion_productos")
         
+        @self.app.route("/producto/importar", methods=["POST"])
+        def importar_productos():
+            # Importa productos desde un archivo CSV o JSON Lines ('archivo' en el form).
+            # El archivo se procesa por lotes y la respuesta se envía mientras avanza:
+            # una línea JSON de progreso por lote y una final con "fin": true y los errores encontrados.
+            archivo = request.files.get("archivo")
+            if archivo is None or not archivo.filename:
+                return jsonify({"ok": False, "error": "Falta el archivo"}), 400
+            formato = request.form.get("formato") or archivo.filename.rsplit(".", 1)[-1].lower()
+            if formato == "json":
+                formato = "jsonl"
+            if formato not in ("csv", "jsonl"):
+                return jsonify({"ok": False, "error": "Formato no soportado (usa .csv o .jsonl)"}), 400
+
+            usuario = session.get("usuario", "admin")
+            # La sesión se marca antes de empezar: cuando la respuesta se está enviando ya no se puede
+            self.enrutador.marcar_escritura()
+
+            def generar():
+                try:
+                    for progreso in importacion.importar_productos(
+                        self.db, self.cursor,
+                        importacion.leer_filas(archivo.stream, formato),
+                        usuario,
+                        tamano_lote=self.app.config["IMPORTACION_TAMANO_LOTE"],
+                    ):
+                        yield json.dumps(progreso, ensure_ascii=False) + "\n"
+                except Exception as error:
+                    # Por ejemplo, sin conexión a MySQL antes del primer lote: el cliente siempre
+                    # recibe una última línea con "fin" en lugar de una respuesta cortada.
+                    self.app.logger.exception("Error en la importación de productos")
+                    yield json.dumps({"fin": True, "error": str(error)}, ensure_ascii=False) + "\n"
+                finally:
+                    # Aunque falle a mitad, los lotes ya guardados cambiaron el catálogo
+                    self.invalidar_catalogo()
+
+            return Response(stream_with_context(generar()), mimetype="application/x-ndjson")
+
+        @self.app.route("/exportar/<tabla>")
+        def exportar(tabla):
+            # Descarga la tabla producto o proveedor completa (?formato=csv o jsonl),
+            # generada fila por fila mientras se lee de MySQL.
+            formato = request.args.get("formato", "csv")
+            if tabla not in importacion.EXPORTABLES or formato not in ("csv", "jsonl"):
+                return "Exportación no disponible", 404
+
+            respuesta = Response(
+                stream_with_context(importacion.exportar(self.db_lectura, tabla, formato,
+                                                         envolver=self.metricas.envolver)),
+                mimetype="text/csv" if formato == "csv" else "application/x-ndjson",
+            )
+            respuesta.headers["Content-Disposition"] = 'attachment; filename="%s.%s"' % (tabla, formato)
+            return respuesta
+
         @self.app.route("/producto/editar/<int:id>", methods=["GET", "POST"])
         def editar_producto(id):
             # Editar producto por id
             if request.method == "GET":
                 # GET -> cargar datos actuales del producto y mostrarlos en el formulario
-                self.cursor.execute("SELECT * FROM producto WHERE Id_Producto=%s", (id,))
-                producto = self.cursor.fetchone()
+                producto = self.catalogo.por_id(id)
                 return render_template("editar_producto.html", producto=producto)
 
             # Si es POST → guardar cambios enviados desde el formulario
@@ -289,31 +654,19 @@ class PaginaWeb:
             stock = request.form["stock"]
             fecha = request.form["fecha"]
 
-            # Query para actualizar el producto
-            query = """
-                UPDATE producto SET 
-                    Nombre_Producto=%s,
-                    Descripcion=%s,
-                    Imagen=%s,
-                    Precio=%s,
-                    Stock=%s,
-                    Fecha_Vencimiento=%s
-                WHERE Id_Producto=%s
-            """
-
-            valores = (nombre, descripcion, imagen, precio, stock, fecha, id)
-
-            self.cursor.execute(query, valores)
-            self.db.commit()
+            # Actualiza el producto
+            self.productos.actualizar(id, nombre, descripcion, imagen, precio, stock, fecha)
+            self.confirmar()
+            self.invalidar_catalogo()
 
             return redirect("/gestion_productos")
         
         @self.app.route("/producto/eliminar/<int:id>")
         def eliminar_producto(id):
             # Elimina un producto por id
-            query = "DELETE FROM producto WHERE Id_Producto=%s"
-            self.cursor.execute(query, (id,))
-            self.db.commit()
+            self.productos.eliminar(id)
+            self.confirmar()
+            self.invalidar_catalogo()
             return redirect("/gestion_productos")
         
         # --------------------------
@@ -321,10 +674,8 @@ class PaginaWeb:
         # --------------------------
         @self.app.route("/proveedor")
         def proveedor():
-            # Lista todos los proveedores
-            self.cursor.execute("SELECT * FROM proveedor")
-            proveedores = self.cursor.fetchall()
-            return render_template("proveedor.html", proveedores=proveedores)
+            # Lista todos los proveedores (se leen de la DB mientras se envía la página)
+            return self.renderizar_por_partes("proveedor.html", proveedores=self.proveedores.iterar())
 
         @self.app.route("/proveedor/agregar", methods=["GET","POST"])
         def proveedor_agregar():
@@ -337,15 +688,11 @@ class PaginaWeb:
             direccion = request.form["direccion"]
             tipo = request.form["tipo"]
 
-            query = """
-                INSERT INTO proveedor (Nombre, Telefono, Correo, Direccion, Tipo_Producto, Usuario_D_Creacion, Fecha_Hora_Creacion)
-                VALUES (%s, %s, %s, %s, %s, %s, NOW())
-            """
             usuario = session.get("usuario", "admin")
 
             # Ejecuta el insert con el usuario que realiza la acción
-            self.cursor.execute(query, (nombre, telefono, correo, direccion, tipo, usuario))
-            self.db.commit()
+            self.proveedores.crear(nombre, telefono, correo, direccion, tipo, usuario)
+            self.confirmar()
 
             return redirect("/proveedor")
         
@@ -353,8 +700,7 @@ class PaginaWeb:
         def proveedor_editar(id):
             # GET → mostrar formulario con datos existentes
             if request.method == "GET":
-                self.cursor.execute("SELECT * FROM proveedor WHERE Id_Proveedor=%s", (id,))
-                proveedor = self.cursor.fetchone()
+                proveedor = self.proveedores.obtener(id)
                 return render_template("editar_proveedor.html", proveedor=proveedor)
 
             # POST → actualizar datos del proveedor
@@ -364,26 +710,16 @@ class PaginaWeb:
             direccion = request.form["direccion"]
             tipo = request.form["tipo"]
 
-            query = """
-                UPDATE proveedor SET 
-                    Nombre=%s, 
-                    Telefono=%s, 
-                    Correo=%s, 
-                    Direccion=%s, 
-                    Tipo_Producto=%s
-                WHERE Id_Proveedor=%s
-            """
-
-            self.cursor.execute(query, (nombre, telefono, correo, direccion, tipo, id))
-            self.db.commit()
+            self.proveedores.actualizar(id, nombre, telefono, correo, direccion, tipo)
+            self.confirmar()
 
             return redirect("/proveedor")
 
         @self.app.route("/proveedor/eliminar/<int:id>")
         def proveedor_eliminar(id):
             # Borra un proveedor por id
-            self.cursor.execute("DELETE FROM proveedor WHERE Id_Proveedor=%s", (id,))
-            self.db.commit()
+            self.proveedores.eliminar(id)
+            self.confirmar()
             return redirect("/proveedor")
         
         @self.app.route("/guardar_compra", methods=["POST"])
@@ -396,75 +732,66 @@ class PaginaWeb:
 
             # Usuario actual que realiza la compra (por defecto 'admin' si no hay sesión)
             usuario = session.get("usuario", "admin")
-            carrito = session.get("carrito", [])
-
-            # -------------------------------
-            # 1️⃣ GUARDAR COMPRADOR
-            # -------------------------------
-            query_comprador = """
-                INSERT INTO comprador (Nombre, Correo, Telefono, Direccion, Usuario_D_Creacion, Fecha_Hora_Creacion)
-                VALUES (%s, %s, %s, %s, %s, NOW())
-            """
-            valores = (nombre, correo, telefono, direccion, usuario)
-
-            # Inserta comprador y hace commit
-            self.cursor.execute(query_comprador, valores)
-            self.db.commit()
-
-            # id_comprador: id auto-increment generado por MySQL para la fila recién insertada
-            id_comprador = self.cursor.lastrowid   # ← AQUÍ USAMOS OPCIÓN 1
-
-            # -------------------------------
-            # 2️⃣ CALCULAR TOTAL DE LA VENTA
-            # -------------------------------
-            # Suma (precio * cantidad) para cada ítem en el carrito
-            total = sum(item["precio"] * item["cantidad"] for item in carrito)
-
-            # -------------------------------
-            # 3️⃣ GUARDAR VENTA
-            # -------------------------------
-            query_venta = """
-                INSERT INTO venta (Id_Comprador, Fecha_Venta, Total, Usuario_D_Creacion, Fecha_Hora_Creacion)
-                VALUES (%s, CURDATE(), %s, %s, NOW())
-            """
-            self.cursor.execute(query_venta, (id_comprador, total, usuario))
-            self.db.commit()
-
-            # id_venta: id de la venta recién creada
-            id_venta = self.cursor.lastrowid   # ← ID DE LA VENTA
-
-            # -------------------------------
-            # 4️⃣ GUARDAR DETALLE DE LA VENTA
-            # -------------------------------
-            for item in carrito:
-                subtotal = item["precio"] * item["cantidad"]
-
-                # Inserta una fila en venta_detalle.
-                # Nota: Id_Producto se busca por nombre con una subconsulta (LIMIT 1).
-                query_detalle = """
-                    INSERT INTO venta_detalle 
-                    (Id_Venta, Id_Producto, Cantidad, Precio_Unitario, Subtotal, Usuario_D_Creacion, Fecha_Hora_Creacion)
-                    VALUES (%s, 
-                            (SELECT Id_Producto FROM producto WHERE Nombre_Producto = %s LIMIT 1), 
-                            %s, %s, %s, %s, NOW())
-                """
-
-                # Ejecuta la inserción del detalle con los valores correspondientes
-                self.cursor.execute(query_detalle, (
-                    id_venta,
-                    item["titulo"],
-                    item["cantidad"],
-                    item["precio"],
-                    subtotal,
-                    usuario
-                ))
-
-            # Finalmente confirma todas las inserciones del detalle
-            self.db.commit()
-
-            # limpiar carrito de la sesión una vez guardada la compra
-            session["carrito"] = []
-            session.modified = True
+            id_carrito = self.id_carrito()
+            carrito = list(self.carritos.obtener(id_carrito).values())
+
+            datos = {
+                "nombre": nombre,
+                "correo": correo,
+                "telefono": telefono,
+                "direccion": direccion,
+                "usuario": usuario,
+                "carrito": carrito,
+            }
+
+            if self.app.config["CHECKOUT_MODO"] == "grupal":
+                # Modo horas pico: el pedido se encola y un hilo escritor lo guarda junto con otros
+                # en un solo commit; aquí se espera hasta que el lote sea durable (ver cola_compras.py).
+                try:
+                    self.cola_compras.enviar(
+                        datos,
+                        espera_cola=self.app.config["CHECKOUT_ESPERA_COLA"],
+                        espera_resultado=self.app.config["CHECKOUT_ESPERA_RESULTADO"],
+                    )
+                except (ColaLlena, TimeoutError):
+                    # El pedido no se guardó (ni se guardará): el carrito se conserva para reintentar
+                    return "Hay muchas compras en proceso, intenta de nuevo en unos segundos", 503
+                except CompraPendiente:
+                    # Se está guardando y puede confirmarse en cualquier momento: se vacía el carrito
+                    # para que un reintento no registre la misma compra dos veces
+                    self.carritos.vaciar(id_carrito)
+                    self.enrutador.marcar_escritura()
+                    self.invalidar_catalogo()   # el stock puede haber cambiado ya
+                    return "Tu compra se está registrando, no es necesario repetirla", 202
+                except SinStock as error:
+                    return self.respuesta_sin_stock(error)
+                self.enrutador.marcar_escritura()
+            else:
+                # Las tablas resumen se crean (si hace falta) antes de abrir la transacción,
+                # porque en MySQL un CREATE TABLE hace commit implícito.
+                self.asegurar_resumenes()
+
+                # Toda la compra (comprador, venta y detalle) se guarda en UNA sola transacción:
+                # si algo falla a mitad de camino se hace rollback y no quedan compradores ni ventas huérfanos.
+                try:
+                    self.insertar_compra(self.db, self.cursor, datos)
+                    # Un solo commit para toda la compra
+                    self.confirmar()
+                except SinStock as error:
+                    # Deshace comprador y venta (el stock no se llegó a descontar)
+                    self.db.rollback()
+                    return self.respuesta_sin_stock(error)
+                except Exception:
+                    # Deshace comprador, venta y detalle si cualquier paso falló
+                    self.db.rollback()
+                    raise
+
+            # La compra descontó stock: el catálogo en memoria, la búsqueda ("disponible")
+            # y las páginas cacheadas deben mostrar el stock nuevo
+            self.invalidar_catalogo()
+
+            # limpiar carrito una vez guardada la compra
+            self.carritos.vaciar(id_carrito)
 
             return redirect("/compra_realizada")
 
@@ -477,50 +804,425 @@ class PaginaWeb:
 
         @self.app.route("/ventas")
         def ventas():
-            # Consulta que devuelve ventas con datos del comprador (join)
-            query = """
-                SELECT v.Id_Venta AS id,
-                    c.Nombre AS comprador,
-                    v.Fecha_Venta AS fecha,
-                    v.Total AS total,
-                    v.Usuario_D_Creacion AS usuario_creacion,
-                    v.Fecha_Hora_Creacion AS fecha_creacion
-                FROM venta v
-                INNER JOIN comprador c ON v.Id_Comprador = c.Id_Comprador
-                ORDER BY v.Id_Venta DESC
-            """
-
-            self.cursor.execute(query)
-            ventas = self.cursor.fetchall()  # lista de ventas como diccionarios
-
-            return render_template("ventas.html", ventas=ventas)
-        
+            # Lista de ventas paginada por cursor (keyset): solo se trae una página a la vez.
+            try:
+                ventas, siguiente, filtros = self.consultar_ventas(request.args)
+            except ValueError as error:
+                return str(error), 400
+
+            return self.renderizar_por_partes("ventas.html", ventas=ventas, siguiente=siguiente, filtros=filtros,
+                                              lote_max=self.app.config["VENTAS_LOTE_MAX"])
+
+        @self.app.route("/api/ventas")
+        def api_ventas():
+            # Misma consulta que /ventas pero en JSON, para que la tabla cargue páginas de forma incremental.
+            # Parámetros: antes (cursor), desde, hasta (AAAA-MM-DD), comprador, limite
+            try:
+                ventas, siguiente, filtros = self.consultar_ventas(request.args)
+            except ValueError as error:
+                return jsonify({"ok": False, "error": str(error)}), 400
+
+            return jsonify({
+                "ok": True,
+                "ventas": [
+                    {
+                        "id": v["id"],
+                        "comprador": v["comprador"],
+                        "fecha": v["fecha"].isoformat() if v["fecha"] else None,
+                        "total": float(v["total"]) if v["total"] is not None else None,
+                        "usuario_creacion": v["usuario_creacion"],
+                        "fecha_creacion": v["fecha_creacion"].isoformat() if v["fecha_creacion"] else None,
+                    }
+                    for v in ventas
+                ],
+                "siguiente": siguiente,   # valor para el parámetro 'antes' de la próxima página (None si no hay más)
+                "limite": filtros["limite"],
+            })
+
         @self.app.route("/ventas/detalle/<int:id_venta>")
         def venta_detalle(id_venta):
-            # Consulta que devuelve el detalle de una venta dada (productos, cantidad, precio, subtotal)
-            query = """
-                SELECT 
-                    p.Nombre_Producto AS producto,
-                    d.Cantidad AS cantidad,
-                    d.Precio_Unitario AS precio,
-                    d.Subtotal AS subtotal
-                FROM venta_detalle d
-                INNER JOIN producto p ON d.Id_Producto = p.Id_Producto
-                WHERE d.Id_Venta = %s
-            """
-
-            self.cursor.execute(query, (id_venta,))
-            detalle = self.cursor.fetchall()
+            # Detalle de una venta dada (productos, cantidad, precio, subtotal)
+            detalle = self.detalles.por_venta(id_venta)
 
             return render_template("detalle_venta.html", detalle=detalle, id_venta=id_venta)
 
+        @self.app.route("/ventas/detalles")
+        def ventas_detalles():
+            # Detalle de varias ventas a la vez, con una sola consulta para todas.
+            # Parámetros: ids=1,2,3 o desde_id y hasta_id; formato=json (por defecto), csv o recibos.
+            formato = request.args.get("formato", "json")
+            if formato not in ("json", "csv", "recibos"):
+                return "Formato no disponible (json, csv o recibos)", 400
+            try:
+                ids, desde_id, hasta_id = self.lote_ventas(request.args)
+            except ValueError as error:
+                if formato == "json":
+                    return jsonify({"ok": False, "error": str(error)}), 400
+                return str(error), 400
+
+            lineas = self.detalles.iterar_lote(ids=ids, desde_id=desde_id, hasta_id=hasta_id)
+
+            if formato == "csv":
+                # Una fila por línea de venta, generada mientras se lee de MySQL
+                respuesta = Response(
+                    stream_with_context(importacion.a_csv(LineaVenta._fields, lineas)),
+                    mimetype="text/csv",
+                )
+                respuesta.headers["Content-Disposition"] = 'attachment; filename="ventas_detalle.csv"'
+                return respuesta
+
+            if formato == "recibos":
+                # Un recibo imprimible por venta (salto de página entre cada uno), enviado por partes
+                return self.renderizar_por_partes("recibos.html", ventas=agrupar_por_venta(lineas))
+
+            ventas = []
+            for venta in agrupar_por_venta(lineas):
+                ventas.append({
+                    "id": venta["id"],
+                    "fecha": venta["fecha"].isoformat() if venta["fecha"] else None,
+                    "comprador": venta["comprador"],
+                    "total": float(venta["total"]) if venta["total"] is not None else None,
+                    "lineas": [
+                        {
+                            "producto": d.producto,
+                            "cantidad": d.cantidad,
+                            "precio": float(d.precio) if d.precio is not None else None,
+                            "subtotal": float(d.subtotal) if d.subtotal is not None else None,
+                        }
+                        for d in venta["lineas"]
+                    ],
+                })
+            encontradas = {venta["id"] for venta in ventas}
+            return jsonify({
+                "ok": True,
+                "ventas": ventas,
+                # Ids pedidos que no existen (solo con 'ids'; en un rango los huecos son normales)
+                "no_encontradas": [i for i in ids if i not in encontradas] if ids else [],
+            })
+
+        @self.app.route("/reportes")
+        def reportes():
+            # Tablero de ventas: ingresos por día, productos más vendidos y mejores compradores.
+            # Solo lee las tablas resumen (ver reportes.py).
+            try:
+                desde, hasta = self.rango_reportes(request.args)
+            except ValueError as error:
+                return str(error), 400
+            self.asegurar_resumenes()
+            datos = self.resumenes.consultar(self.cursor_lectura, desde, hasta)
+            return render_template("reportes.html", desde=desde, hasta=hasta, **datos)
+
+        @self.app.route("/api/reportes")
+        def api_reportes():
+            # Mismos datos del tablero en JSON. Parámetros: desde, hasta (AAAA-MM-DD)
+            try:
+                desde, hasta = self.rango_reportes(request.args)
+            except ValueError as error:
+                return jsonify({"ok": False, "error": str(error)}), 400
+            self.asegurar_resumenes()
+            datos = self.resumenes.consultar(self.cursor_lectura, desde, hasta)
+            return jsonify({
+                "ok": True,
+                "desde": desde.isoformat(),
+                "hasta": hasta.isoformat(),
+                "total": datos["total"],
+                "ventas": datos["ventas"],
+                "por_dia": [
+                    {"fecha": d["fecha"].isoformat(), "ventas": d["ventas"], "total": float(d["total"])}
+                    for d in datos["por_dia"]
+                ],
+                "productos": [
+                    {"id": p["id"], "producto": p["producto"], "unidades": int(p["unidades"]), "total": float(p["total"])}
+                    for p in datos["productos"]
+                ],
+                "compradores": [
+                    {
+                        "correo": c["correo"],
+                        "nombre": c["nombre"],
+                        "compras": c["compras"],
+                        "total": float(c["total"]),
+                        "ultima_compra": c["ultima_compra"].isoformat() if c["ultima_compra"] else None,
+                    }
+                    for c in datos["compradores"]
+                ],
+            })
+
+        @self.app.route("/estado/pool")
+        def estado_pool():
+            # Estadísticas del pool de conexiones (tamaño, conexiones en uso, tiempos de espera)
+            return jsonify(self.pool.estadisticas())
+
+        @self.app.route("/metrics")
+        def metrics():
+            # Métricas en formato Prometheus (latencia por ruta, consultas SQL, pool, caché)
+            return Response(self.metricas.prometheus(), mimetype="text/plain; version=0.0.4")
+
+        @self.app.route("/estado/consultas_lentas")
+        def consultas_lentas():
+            # Últimas consultas más lentas que METRICAS_CONSULTA_LENTA, con su SQL
+            return jsonify(list(self.metricas.lentas))
+
+        @self.app.route("/estado/checkout")
+        def estado_checkout():
+            # Estadísticas de la cola de compras (modo grupal): pedidos, lotes, pedidos por commit
+            return jsonify(dict(self.cola_compras.estadisticas(), modo=self.app.config["CHECKOUT_MODO"]))
+
+        @self.app.route("/estado/catalogo")
+        def estado_catalogo():
+            # Aciertos/fallos de la caché del catálogo (fallos = lecturas que sí llegaron a MySQL)
+            return jsonify(self.catalogo.estadisticas())
+
+        @self.app.route("/estado/paginas")
+        def estado_paginas():
+            # Aciertos/fallos/304 de la caché de páginas (aciertos = páginas servidas sin renderizar)
+            if self.paginas is None:
+                return jsonify({"activa": False})
+            return jsonify(dict(self.paginas.estadisticas(), activa=True))
+
+        @self.app.route("/estado/replicas")
+        def estado_replicas():
+            # Lecturas enviadas al primario y a las réplicas, y estado de cada pool de réplica
+            return jsonify(dict(
+                self.enrutador.estadisticas(),
+                pools={r.nombre: r.estadisticas() for r in self.enrutador.replicas},
+            ))
+
+        @self.app.errorhandler(PoolAgotado)
+        def pool_agotado(error):
+            # Si todas las conexiones están ocupadas se responde 503 en lugar de colgar la petición
+            return "Servidor ocupado, intenta de nuevo en unos segundos", 503
+
+
+    def id_carrito(self):
+        # Id del carrito de este usuario (se genera la primera vez). La cookie de sesión solo guarda
+        # este id, con tamaño constante; los ítems viven en self.carritos.
+        carrito_id = session.get("carrito_id")
+        if carrito_id is None:
+            carrito_id = session["carrito_id"] = uuid.uuid4().hex
+        return carrito_id
+
+    def totales_carrito(self, items):
+        # Totales del carrito para las respuestas JSON: total a pagar, unidades y número de productos.
+        return {
+            "total": round(sum(i["precio"] * i["cantidad"] for i in items.values()), 2),
+            "unidades": sum(i["cantidad"] for i in items.values()),
+            "productos": len(items),
+        }
+
+    def producto_para_carrito(self, id_producto, titulo=None):
+        # Datos del producto que se guardan en el carrito, tomados del catálogo (no del formulario),
+        # para que el precio no se pueda alterar desde el navegador. None si el producto no existe.
+        producto = None
+        if id_producto:
+            try:
+                producto = self.catalogo.por_id(int(id_producto))
+            except ValueError:
+                return None
+        elif titulo:
+            producto = self.catalogo.por_nombre(titulo)
+        if producto is None:
+            return None
+        return {
+            "id": producto["Id_Producto"],
+            "titulo": producto["Nombre_Producto"],
+            "precio": float(producto["Precio"] or 0),
+            "imagen": producto["Imagen"],
+        }
+
+    def invalidar_catalogo(self):
+        # Después de cualquier cambio en la tabla producto: descarta el catálogo en memoria
+        # y las páginas cacheadas que lo muestran.
+        self.catalogo.invalidar()
+        self._catalogo_modificado = time.monotonic()
+        if self.paginas is not None:
+            self.paginas.purgar("catalogo")
+
+    def respuesta_sin_stock(self, error):
+        # 409 con las líneas del carrito que piden más unidades de las disponibles.
+        # El carrito no se vacía: el comprador puede ajustar cantidades y volver a intentar.
+        return jsonify({
+            "ok": False,
+            "error": "No hay stock suficiente para algunos productos del carrito",
+            "sin_stock": error.lineas,
+        }), 409
+
+    def cargar_productos(self):
+        # Lee el catálogo completo desde MySQL (solo lo llama la caché cuando no está vigente).
+        # Justo después de un cambio se lee del primario: una réplica atrasada dejaría
+        # el catálogo viejo en caché hasta que venza el TTL.
+        reciente = time.monotonic() - self._catalogo_modificado < self.enrutador.pegajosa
+        return self.productos.listar(primario=reciente)
+
+    def insertar_compra(self, db, cursor, datos):
+        # Ejecuta los INSERT de una compra (comprador, venta, stock, detalle y resúmenes) SIN hacer commit:
+        # quien llama decide cuándo confirmar (una compra sola, o un lote en modo grupal).
+        # Devuelve el Id_Venta generado.
+        nombre = datos["nombre"]
+        correo = datos["correo"]
+        telefono = datos["telefono"]
+        direccion = datos["direccion"]
+        usuario = datos["usuario"]
+        carrito = datos["carrito"]
+
+        # -------------------------------
+        # 1️⃣ GUARDAR COMPRADOR
+        # -------------------------------
+        # id_comprador: id auto-increment generado por MySQL para la fila recién insertada
+        id_comprador = self.compradores.crear(nombre, correo, telefono, direccion, usuario, conexion=db)
+
+        # -------------------------------
+        # 2️⃣ CALCULAR TOTAL DE LA VENTA
+        # -------------------------------
+        # Suma (precio * cantidad) para cada ítem en el carrito
+        total = sum(item["precio"] * item["cantidad"] for item in carrito)
+
+        # -------------------------------
+        # 3️⃣ GUARDAR VENTA
+        # -------------------------------
+        # id_venta: id de la venta recién creada
+        id_venta = self.ventas.crear(id_comprador, total, usuario, conexion=db)
+
+        # -------------------------------
+        # 4️⃣ DESCONTAR STOCK
+        # -------------------------------
+        # Bloquea las filas de producto en orden de Id_Producto y las descuenta con un solo UPDATE;
+        # si alguna no alcanza lanza SinStock y quien llama deshace la compra. Va después de
+        # comprador y venta para que las filas de producto (las más disputadas) queden
+        # bloqueadas el menor tiempo posible antes del commit.
+        descontar_stock(cursor, carrito)
+
+        # -------------------------------
+        # 5️⃣ GUARDAR DETALLE DE LA VENTA
+        # -------------------------------
+        # Cada ítem del carrito ya trae su Id_Producto (el carrito está indexado por id);
+        # todas las líneas van en un único INSERT de varias filas
+        self.detalles.crear(id_venta, carrito, usuario, conexion=db)
+
+        # -------------------------------
+        # 6️⃣ ACTUALIZAR RESÚMENES DE REPORTES
+        # -------------------------------
+        self.resumenes.registrar_compra(
+            cursor, correo, nombre, total,
+            [(item["id"], item["cantidad"], item["precio"] * item["cantidad"]) for item in carrito]
+        )
+
+        return id_venta
+
+    def rango_reportes(self, args):
+        # Rango de fechas del tablero: 'desde'/'hasta' (AAAA-MM-DD); por defecto los últimos REPORTES_DIAS días.
+        try:
+            hasta = date.fromisoformat(args["hasta"]) if args.get("hasta") else date.today()
+            desde = (date.fromisoformat(args["desde"]) if args.get("desde")
+                     else hasta - timedelta(days=self.app.config["REPORTES_DIAS"] - 1))
+        except ValueError:
+            raise ValueError("Fecha inválida (formato AAAA-MM-DD)")
+        if desde > hasta:
+            raise ValueError("'desde' no puede ser posterior a 'hasta'")
+        return desde, hasta
+
+    def consultar_ventas(self, args):
+        # Consulta paginada de ventas (keyset sobre Id_Venta, de la más reciente a la más antigua).
+        # En lugar de OFFSET se usa "Id_Venta < cursor": MySQL salta directo a la página
+        # usando la llave primaria, sin importar cuántas ventas haya en total.
+        # Devuelve (ventas, siguiente_cursor, filtros). Lanza ValueError si algún parámetro es inválido.
+        filtros = {
+            "antes": None,
+            "desde": None,
+            "hasta": None,
+            "comprador": (args.get("comprador") or "").strip(),
+            "limite": self.app.config["VENTAS_POR_PAGINA"],
+        }
+
+        if args.get("antes"):
+            try:
+                filtros["antes"] = int(args["antes"])
+            except ValueError:
+                raise ValueError("Parámetro 'antes' inválido")
+
+        for campo in ("desde", "hasta"):
+            if args.get(campo):
+                try:
+                    filtros[campo] = date.fromisoformat(args[campo])
+                except ValueError:
+                    raise ValueError("Fecha '%s' inválida (formato AAAA-MM-DD)" % campo)
+
+        if args.get("limite"):
+            try:
+                limite = int(args["limite"])
+            except ValueError:
+                raise ValueError("Parámetro 'limite' inválido")
+            # Nunca menos de 1 ni más del máximo configurado
+            filtros["limite"] = max(1, min(limite, self.app.config["VENTAS_LIMITE_MAX"]))
+
+        # Se pide una fila de más para saber si existe una página siguiente
+        ventas = self.ventas.listar(
+            antes=filtros["antes"],
+            desde=filtros["desde"],
+            hasta=filtros["hasta"],
+            comprador=filtros["comprador"],
+            limite=filtros["limite"] + 1,
+        )
+
+        siguiente = None
+        if len(ventas) > filtros["limite"]:
+            ventas = ventas[:filtros["limite"]]
+            siguiente = ventas[-1]["id"]
+
+        return ventas, siguiente, filtros
+
+    def lote_ventas(self, args):
+        # Ventas pedidas a /ventas/detalles: ids=1,2,3 o un rango desde_id/hasta_id (inclusive).
+        # Devuelve (ids, desde_id, hasta_id); ids es None si se pidió un rango.
+        # Lanza ValueError si los parámetros son inválidos o piden más de VENTAS_LOTE_MAX ventas.
+        maximo = self.app.config["VENTAS_LOTE_MAX"]
+
+        if args.get("ids"):
+            try:
+                ids = sorted({int(valor) for valor in args["ids"].split(",") if valor.strip()})
+            except ValueError:
+                raise ValueError("Parámetro 'ids' inválido (ejemplo: ids=1,2,3)")
+            if not ids:
+                raise ValueError("Parámetro 'ids' vacío")
+            if len(ids) > maximo:
+                raise ValueError("Se permiten como máximo %d ventas por petición" % maximo)
+            return ids, None, None
+
+        try:
+            desde_id = int(args["desde_id"])
+            hasta_id = int(args["hasta_id"])
+        except (KeyError, ValueError):
+            raise ValueError("Indica 'ids' (1,2,3) o 'desde_id' y 'hasta_id'")
+        if desde_id > hasta_id:
+            raise ValueError("'desde_id' no puede ser mayor que 'hasta_id'")
+        if hasta_id - desde_id + 1 > maximo:
+            raise ValueError("Se permiten como máximo %d ventas por petición" % maximo)
+        return None, desde_id, hasta_id
 
     def ejecutar(self):
         # Método que ejecuta el servidor Flask en modo debug (útil para desarrollo).
         # ⚠️ En producción, NO uses debug=True; utiliza un servidor WSGI (gunicorn/uwsgi) y configura logging.
         self.app.run(debug=True)
 
+
+def crear_app(config=None, archivo_config=None):
+    # Fábrica de la aplicación para servidores WSGI. Ejemplo con gunicorn:
+    #   PAGINAWEB_CONFIG=produccion.py gunicorn --preload -w 4 "app:crear_app()"
+    # Con --preload la app (plantillas compiladas, assets, configuración) se crea una sola vez
+    # en el proceso maestro; cada worker abre sus conexiones MySQL recién con su primera consulta.
+    # Con varios workers, CARRITO_BACKEND debe ser "sqlite" (el valor por defecto) y no "memoria".
+    # La instancia de PaginaWeb queda en app.extensions["paginaweb"].
+    return PaginaWeb(__name__, config=config, archivo_config=archivo_config).app
+
+
 if __name__ == '__main__':
     # Punto de entrada del script: crea la app y la ejecuta.
     web = PaginaWeb(__name__)
-    web.ejecutar()
+
+    if sys.argv[1:] == ["reconstruir-resumenes"]:
+        # python app.py reconstruir-resumenes
+        # Recalcula las tablas de reportes desde todo el historial de ventas (backfill).
+        with web.app.app_context():
+            web.resumenes.reconstruir(web.db, web.cursor)
+        print("Resúmenes de ventas reconstruidos")
+    else:
+        web.ejecutar()
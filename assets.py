@@ -0,0 +1,231 @@
+# assets.py
+# Pipeline de archivos estáticos (CSS e imágenes de /static).
+# Al arrancar la app (o con "python assets.py") se genera la carpeta static/dist con:
+# - copias con el hash del contenido en el nombre (style.3f2a9c1b0d4e.css), para poder cachearlas "para siempre";
+# - versiones WebP y redimensionadas de las imágenes (si Pillow está instalado);
+# - versiones precomprimidas .gz y .br del CSS (brotli solo si el paquete está instalado);
+# - manifest.json, que traduce el nombre original al nombre con hash.
+# Las plantillas usan asset_url('style.css') y los archivos se sirven en /assets/ con Cache-Control immutable.
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import sys
+
+from flask import request, send_from_directory, url_for
+
+try:
+    from PIL import Image
+except ImportError:   # Pillow es opcional: sin él solo se generan las copias con hash
+    Image = None
+
+try:
+    import brotli
+except ImportError:   # brotli es opcional: sin él solo se genera .gz
+    brotli = None
+
+
+EXT_IMAGEN = {".png", ".jpg", ".jpeg"}
+EXT_COMPRIMIBLE = {".css", ".js", ".svg"}
+ANCHOS = (480, 960, 1600)           # anchos (px) de las variantes redimensionadas
+UN_ANO = 365 * 24 * 3600
+
+# url("fondo.png") / url('fondo.png') / url(fondo.png) dentro del CSS
+RE_URL_CSS = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+
+
+def _hash(datos):
+    return hashlib.sha256(datos).hexdigest()[:12]
+
+
+class Assets:
+    def __init__(self, carpeta_static, subcarpeta="dist"):
+        self.carpeta_static = carpeta_static
+        self.carpeta_salida = os.path.join(carpeta_static, subcarpeta)
+        self.ruta_manifest = os.path.join(self.carpeta_salida, "manifest.json")
+        self.manifest = {"fuentes": {}, "archivos": {}, "comprimidos": {}}
+
+    # --------------------------
+    # Construcción
+    # --------------------------
+    def _fuentes(self):
+        # Archivos de /static que procesa el pipeline: {nombre: bytes}
+        fuentes = {}
+        for nombre in sorted(os.listdir(self.carpeta_static)):
+            ruta = os.path.join(self.carpeta_static, nombre)
+            ext = os.path.splitext(nombre)[1].lower()
+            if os.path.isfile(ruta) and (ext in EXT_IMAGEN or ext in EXT_COMPRIMIBLE):
+                with open(ruta, "rb") as archivo:
+                    fuentes[nombre] = archivo.read()
+        return fuentes
+
+    def preparar(self):
+        # Usa el manifest existente si los archivos fuente no cambiaron; si no, reconstruye.
+        fuentes = self._fuentes()
+        hashes = {nombre: _hash(datos) for nombre, datos in fuentes.items()}
+        try:
+            with open(self.ruta_manifest, encoding="utf-8") as archivo:
+                manifest = json.load(archivo)
+            if manifest.get("fuentes") == hashes:
+                self.manifest = manifest
+                return self.manifest
+        except (OSError, ValueError):
+            pass
+        return self.construir(fuentes)
+
+    def construir(self, fuentes=None):
+        # Genera static/dist y manifest.json desde cero.
+        if fuentes is None:
+            fuentes = self._fuentes()
+        os.makedirs(self.carpeta_salida, exist_ok=True)
+        archivos = {}
+        comprimidos = {}
+
+        # 1) Imágenes primero, porque el CSS las referencia
+        for nombre, datos in fuentes.items():
+            base, ext = os.path.splitext(nombre)
+            if ext.lower() not in EXT_IMAGEN:
+                continue
+            h = _hash(datos)
+            archivos[nombre] = self._escribir("%s.%s%s" % (base, h, ext), datos)
+            if Image is not None:
+                archivos.update(self._variantes(nombre, base, h))
+
+        # 2) CSS/JS: se reescriben las url(...) a los nombres con hash y luego se comprimen
+        for nombre, datos in fuentes.items():
+            base, ext = os.path.splitext(nombre)
+            if ext.lower() not in EXT_COMPRIMIBLE:
+                continue
+            if ext.lower() == ".css":
+                datos = self._reescribir_css(datos, archivos)
+            final = self._escribir("%s.%s%s" % (base, _hash(datos), ext), datos)
+            archivos[nombre] = final
+            comprimidos[final] = self._precomprimir(final, datos)
+
+        self.manifest = {
+            "fuentes": {nombre: _hash(datos) for nombre, datos in fuentes.items()},
+            "archivos": archivos,
+            "comprimidos": comprimidos,
+        }
+        with open(self.ruta_manifest, "w", encoding="utf-8") as archivo:
+            json.dump(self.manifest, archivo, indent=2, sort_keys=True)
+        return self.manifest
+
+    def _escribir(self, nombre, datos):
+        ruta = os.path.join(self.carpeta_salida, nombre)
+        if not os.path.exists(ruta):   # con hash en el nombre, si ya existe es idéntico
+            with open(ruta, "wb") as archivo:
+                archivo.write(datos)
+        return nombre
+
+    def _variantes(self, nombre, base, h):
+        # WebP a tamaño completo + uno por cada ancho de ANCHOS menor al original.
+        # Claves del manifest: "logo.png@webp" y "logo.png@480w".
+        variantes = {}
+        with Image.open(os.path.join(self.carpeta_static, nombre)) as imagen:
+            imagen.load()
+            if imagen.mode not in ("RGB", "RGBA"):
+                imagen = imagen.convert("RGBA")
+            variantes[nombre + "@webp"] = self._guardar_webp(imagen, "%s.%s.webp" % (base, h))
+            for ancho in ANCHOS:
+                if ancho >= imagen.width:
+                    break
+                alto = round(imagen.height * ancho / imagen.width)
+                reducida = imagen.resize((ancho, alto), Image.LANCZOS)
+                variantes["%s@%dw" % (nombre, ancho)] = self._guardar_webp(
+                    reducida, "%s.%s.%dw.webp" % (base, h, ancho))
+        return variantes
+
+    def _guardar_webp(self, imagen, nombre):
+        ruta = os.path.join(self.carpeta_salida, nombre)
+        if not os.path.exists(ruta):
+            imagen.save(ruta, "WEBP", quality=80, method=6)
+        return nombre
+
+    def _reescribir_css(self, datos, archivos):
+        # url("fondo.png") -> url("fondo.<hash>.webp") (o la copia con hash si no hay WebP).
+        # Las URLs absolutas (http..., /...) y data: se dejan igual.
+        def reemplazar(coincidencia):
+            ref = coincidencia.group(2).strip()
+            destino = archivos.get(ref + "@webp") or archivos.get(ref)
+            if destino is None:
+                return coincidencia.group(0)
+            return 'url("%s")' % destino
+        return RE_URL_CSS.sub(reemplazar, datos.decode("utf-8")).encode("utf-8")
+
+    def _precomprimir(self, nombre, datos):
+        # Escribe nombre.gz y nombre.br (solo si quedan más pequeños). Devuelve las codificaciones generadas.
+        codificaciones = []
+        if brotli is not None:
+            comprimido = brotli.compress(datos, quality=11)
+            if len(comprimido) < len(datos):
+                self._escribir(nombre + ".br", comprimido)
+                codificaciones.append("br")
+        comprimido = gzip.compress(datos, compresslevel=9, mtime=0)
+        if len(comprimido) < len(datos):
+            self._escribir(nombre + ".gz", comprimido)
+            codificaciones.append("gzip")
+        return codificaciones
+
+    # --------------------------
+    # Uso desde Flask
+    # --------------------------
+    def url(self, nombre, ancho=None, webp=False):
+        # URL con hash para un archivo de /static. Con webp=True usa la versión WebP y,
+        # si se pasa 'ancho', la variante más pequeña que cubra ese ancho.
+        # Si el archivo no está en el manifest se usa la ruta normal de /static.
+        archivos = self.manifest["archivos"]
+        final = None
+        if webp or ancho:
+            if ancho:
+                for candidato in ANCHOS:
+                    if candidato >= ancho and "%s@%dw" % (nombre, candidato) in archivos:
+                        final = archivos["%s@%dw" % (nombre, candidato)]
+                        break
+            final = final or archivos.get(nombre + "@webp")
+        final = final or archivos.get(nombre)
+        if final is None:
+            return url_for("static", filename=nombre)
+        return url_for("assets", archivo=final)
+
+    def registrar(self, app):
+        # Ruta /assets/<archivo> y helper asset_url(...) para las plantillas.
+        app.add_url_rule("/assets/<path:archivo>", "assets", self.servir)
+        app.jinja_env.globals["asset_url"] = self.url
+
+    def servir(self, archivo):
+        # Sirve el archivo con hash con caché de un año (immutable: el nombre cambia si cambia el contenido).
+        # Si el navegador acepta br/gzip y existe la versión precomprimida, se envía esa.
+        codificaciones = self.manifest["comprimidos"].get(archivo, [])
+        # accept_encodings devuelve la calidad de cada codificación: 0 si no se menciona o
+        # si viene con q=0 (por ejemplo "gzip;q=0" o solo "identity")
+        aceptadas = request.accept_encodings
+        enviar = archivo
+        codificacion = None
+        for cod in codificaciones:
+            if aceptadas[cod]:
+                enviar = archivo + (".br" if cod == "br" else ".gz")
+                codificacion = cod
+                break
+
+        respuesta = send_from_directory(
+            self.carpeta_salida, enviar,
+            mimetype=mimetypes.guess_type(archivo)[0],
+            max_age=UN_ANO,
+        )
+        respuesta.headers["Cache-Control"] = "public, max-age=%d, immutable" % UN_ANO
+        if codificaciones:
+            respuesta.headers["Vary"] = "Accept-Encoding"
+        if codificacion:
+            respuesta.headers["Content-Encoding"] = codificacion
+        return respuesta
+
+
+if __name__ == "__main__":
+    # Construcción manual (por ejemplo en el despliegue): python assets.py [carpeta_static]
+    carpeta = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+    manifest = Assets(carpeta).construir()
+    print("%d archivos generados en %s" % (len(manifest["archivos"]), os.path.join(carpeta, "dist")))
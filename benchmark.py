@@ -0,0 +1,421 @@
+# benchmark.py
+# Pruebas de carga reproducibles para PaginaWeb.
+# Levanta la app (en el mismo proceso, con el cliente de pruebas de Flask) contra una base de datos
+# MySQL/MariaDB local de prueba, la llena con datos generados y reproduce una mezcla de tráfico realista
+# (catálogo, carrito, compras, reportes) a distintos niveles de concurrencia.
+# El resultado es un JSON con peticiones/segundo y latencias p50/p95/p99 por ruta, para comparar commits.
+#
+# Uso:
+#   python benchmark.py --sembrar --productos 200 --ventas 20000 --concurrencia 1,8,32 --salida antes.json
+#   python benchmark.py --concurrencia 1,8,32 --salida despues.json
+#   python benchmark.py --comparar antes.json despues.json
+#
+# ⚠️ Usa su propia base de datos (por defecto "postres_bench"); --sembrar BORRA sus tablas.
+
+import argparse
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from datetime import date, timedelta
+
+import mysql.connector
+
+ESQUEMA = (
+    """
+    CREATE TABLE usuario (
+        Id_Usuario INT PRIMARY KEY,
+        Nombre VARCHAR(100),
+        Contraseña VARCHAR(100)
+    )
+    """,
+    """
+    CREATE TABLE producto (
+        Id_Producto INT AUTO_INCREMENT PRIMARY KEY,
+        Nombre_Producto VARCHAR(150),
+        Descripcion TEXT,
+        Imagen VARCHAR(255),
+        Precio DECIMAL(10, 2),
+        Stock INT,
+        Fecha_Vencimiento DATE,
+        Usuario_D_Creacion VARCHAR(100),
+        Fecha_Hora_Creacion DATETIME
+    )
+    """,
+    """
+    CREATE TABLE proveedor (
+        Id_Proveedor INT AUTO_INCREMENT PRIMARY KEY,
+        Nombre VARCHAR(150),
+        Telefono VARCHAR(50),
+        Correo VARCHAR(150),
+        Direccion VARCHAR(255),
+        Tipo_Producto VARCHAR(100),
+        Usuario_D_Creacion VARCHAR(100),
+        Fecha_Hora_Creacion DATETIME
+    )
+    """,
+    """
+    CREATE TABLE comprador (
+        Id_Comprador INT AUTO_INCREMENT PRIMARY KEY,
+        Nombre VARCHAR(150),
+        Correo VARCHAR(150),
+        Telefono VARCHAR(50),
+        Direccion VARCHAR(255),
+        Usuario_D_Creacion VARCHAR(100),
+        Fecha_Hora_Creacion DATETIME
+    )
+    """,
+    """
+    CREATE TABLE venta (
+        Id_Venta INT AUTO_INCREMENT PRIMARY KEY,
+        Id_Comprador INT,
+        Fecha_Venta DATE,
+        Total DECIMAL(12, 2),
+        Usuario_D_Creacion VARCHAR(100),
+        Fecha_Hora_Creacion DATETIME,
+        INDEX (Fecha_Venta)
+    )
+    """,
+    """
+    CREATE TABLE venta_detalle (
+        Id_Detalle INT AUTO_INCREMENT PRIMARY KEY,
+        Id_Venta INT,
+        Id_Producto INT,
+        Cantidad INT,
+        Precio_Unitario DECIMAL(10, 2),
+        Subtotal DECIMAL(12, 2),
+        Usuario_D_Creacion VARCHAR(100),
+        Fecha_Hora_Creacion DATETIME,
+        INDEX (Id_Venta)
+    )
+    """,
+)
+
+TABLAS = ("venta_detalle", "venta", "comprador", "proveedor", "producto", "usuario",
+          "resumen_venta_dia", "resumen_producto_dia", "resumen_comprador_dia")
+
+PALABRAS = ("torta", "chocolate", "vainilla", "fresa", "crème", "brûlée", "pie", "limón", "cheesecake",
+            "brownie", "galleta", "arequipe", "maracuyá", "tres", "leches", "mousse", "café", "coco")
+
+
+# --------------------------
+# Datos de prueba
+# --------------------------
+def _insertar(cursor, tabla, columnas, filas, lote=1000):
+    # INSERT de varias filas por sentencia, en bloques de 'lote'
+    marcador = "(" + ", ".join(["%s"] * len(columnas)) + ")"
+    for i in range(0, len(filas), lote):
+        bloque = filas[i:i + lote]
+        cursor.execute(
+            "INSERT INTO %s (%s) VALUES %s" % (tabla, ", ".join(columnas), ", ".join([marcador] * len(bloque))),
+            [valor for fila in bloque for valor in fila]
+        )
+
+
+def sembrar(config_db, productos, proveedores, compradores, ventas, detalles, semilla):
+    # Crea las tablas desde cero y las llena con datos generados (reproducibles con la misma semilla).
+    azar = random.Random(semilla)
+    db = mysql.connector.connect(**config_db)
+    cursor = db.cursor()
+    for tabla in TABLAS:
+        cursor.execute("DROP TABLE IF EXISTS %s" % tabla)
+    for ddl in ESQUEMA:
+        cursor.execute(ddl)
+
+    ahora = "2025-01-01 00:00:00"
+    _insertar(cursor, "usuario", ("Id_Usuario", "Nombre", "Contraseña"), [(1, "admin", "admin")])
+
+    filas = []
+    precios = {}
+    for i in range(1, productos + 1):
+        nombre = " ".join(azar.sample(PALABRAS, 2)).title() + " %d" % i
+        precio = round(azar.uniform(2, 60), 2)
+        precios[i] = precio
+        filas.append((nombre, " ".join(azar.choices(PALABRAS, k=12)), "/static/producto_%d.png" % (i % 4 + 1),
+                      precio, azar.randint(0, 500), "2026-12-31", "bench", ahora))
+    _insertar(cursor, "producto", ("Nombre_Producto", "Descripcion", "Imagen", "Precio", "Stock",
+                                   "Fecha_Vencimiento", "Usuario_D_Creacion", "Fecha_Hora_Creacion"), filas)
+
+    _insertar(cursor, "proveedor", ("Nombre", "Telefono", "Correo", "Direccion", "Tipo_Producto",
+                                    "Usuario_D_Creacion", "Fecha_Hora_Creacion"),
+              [("Proveedor %d" % i, "300%07d" % i, "prov%d@bench.test" % i, "Calle %d" % i, "insumos", "bench", ahora)
+               for i in range(1, proveedores + 1)])
+
+    _insertar(cursor, "comprador", ("Nombre", "Correo", "Telefono", "Direccion", "Usuario_D_Creacion",
+                                    "Fecha_Hora_Creacion"),
+              [("Comprador %d" % i, "c%d@bench.test" % (i % max(1, compradores // 3)), "310%07d" % i,
+                "Carrera %d" % i, "bench", ahora) for i in range(1, compradores + 1)])
+
+    inicio = date.today() - timedelta(days=365)
+    filas_venta = []
+    filas_detalle = []
+    for id_venta in range(1, ventas + 1):
+        lineas = [(azar.randint(1, productos), azar.randint(1, 5)) for _ in range(azar.randint(1, detalles * 2 - 1))]
+        total = sum(precios[p] * c for p, c in lineas)
+        filas_venta.append((azar.randint(1, compradores), inicio + timedelta(days=azar.randint(0, 365)),
+                            round(total, 2), "bench", ahora))
+        for id_producto, cantidad in lineas:
+            filas_detalle.append((id_venta, id_producto, cantidad, precios[id_producto],
+                                  round(precios[id_producto] * cantidad, 2), "bench", ahora))
+    _insertar(cursor, "venta", ("Id_Comprador", "Fecha_Venta", "Total", "Usuario_D_Creacion",
+                                "Fecha_Hora_Creacion"), filas_venta)
+    _insertar(cursor, "venta_detalle", ("Id_Venta", "Id_Producto", "Cantidad", "Precio_Unitario", "Subtotal",
+                                        "Usuario_D_Creacion", "Fecha_Hora_Creacion"), filas_detalle)
+    db.commit()
+    cursor.close()
+    db.close()
+    return {"productos": productos, "proveedores": proveedores, "compradores": compradores,
+            "ventas": ventas, "detalles": len(filas_detalle)}
+
+
+# --------------------------
+# Tráfico
+# --------------------------
+# (peso, nombre de la acción) — la mezcla imita una tienda: mucho catálogo, algo de carrito, pocas compras
+MEZCLA = (
+    (35, "catalogo"),
+    (10, "detalle"),
+    (10, "buscar"),
+    (15, "agregar_carrito"),
+    (5, "actualizar_cantidad"),
+    (5, "ver_carrito"),
+    (6, "comprar"),
+    (6, "ventas"),
+    (3, "api_ventas"),
+    (3, "reportes"),
+    (2, "detalle_venta"),
+)
+
+
+class Usuario:
+    # Un usuario virtual: su propio cliente de pruebas (y por lo tanto su propia cookie de sesión).
+    def __init__(self, app, azar, productos, ventas):
+        self.cliente = app.test_client()
+        self.azar = azar
+        self.productos = productos
+        self.ventas = ventas
+        self.en_carrito = []
+
+    def ejecutar(self, accion):
+        # Devuelve (ruta, código HTTP). 'ruta' es el patrón, para agrupar resultados.
+        azar = self.azar
+        c = self.cliente
+        if accion == "catalogo":
+            return "/producto", c.get("/producto").status_code
+        if accion == "detalle":
+            id_producto = azar.randint(1, self.productos)
+            return "/producto_detalle", c.get("/producto_detalle?id=%d&titulo=x&precio=1" % id_producto).status_code
+        if accion == "buscar":
+            q = azar.choice(("choc", "torta fre", "creme", "limon", "pie"))
+            return "/api/productos/buscar", c.get("/api/productos/buscar?q=" + q).status_code
+        if accion == "agregar_carrito":
+            id_producto = azar.randint(1, self.productos)
+            self.en_carrito.append(id_producto)
+            return "/agregar_carrito", c.post("/agregar_carrito", data={"id_producto": id_producto}).status_code
+        if accion == "actualizar_cantidad":
+            if not self.en_carrito:
+                return self.ejecutar("agregar_carrito")
+            return "/actualizar_cantidad", c.post(
+                "/actualizar_cantidad",
+                data={"id": azar.choice(self.en_carrito), "cantidad": azar.randint(1, 6)},
+                headers={"X-Requested-With": "XMLHttpRequest"},
+            ).status_code
+        if accion == "ver_carrito":
+            return "/carrito", c.get("/carrito").status_code
+        if accion == "comprar":
+            if not self.en_carrito:
+                return self.ejecutar("agregar_carrito")
+            self.en_carrito = []
+            return "/guardar_compra", c.post("/guardar_compra", data={
+                "nombre": "Bench", "correo": "bench%d@bench.test" % azar.randint(1, 500),
+                "telefono": "3000000000", "direccion": "Calle 1",
+            }).status_code
+        if accion == "ventas":
+            return "/ventas", c.get("/ventas").status_code
+        if accion == "api_ventas":
+            return "/api/ventas", c.get("/api/ventas?antes=%d" % azar.randint(1, max(1, self.ventas))).status_code
+        if accion == "reportes":
+            return "/api/reportes", c.get("/api/reportes").status_code
+        if accion == "detalle_venta":
+            return "/ventas/detalle/<id>", c.get("/ventas/detalle/%d" % azar.randint(1, max(1, self.ventas))).status_code
+        raise ValueError(accion)
+
+
+def percentil(ordenados, p):
+    # Percentil por rango más cercano sobre una lista ya ordenada
+    if not ordenados:
+        return None
+    indice = max(0, min(len(ordenados) - 1, math.ceil(p / 100.0 * len(ordenados)) - 1))
+    return ordenados[indice]
+
+
+def correr_nivel(app, concurrencia, duracion, calentamiento, productos, ventas, semilla):
+    # Ejecuta 'concurrencia' usuarios virtuales durante 'duracion' segundos y agrupa latencias por ruta.
+    acciones = [nombre for peso, nombre in MEZCLA for _ in range(peso)]
+    muestras = {}        # ruta -> [latencias en segundos]
+    errores = {}         # ruta -> número de respuestas >= 500
+    lock = threading.Lock()
+    medir_desde = time.monotonic() + calentamiento
+    fin = medir_desde + duracion
+
+    def trabajador(numero):
+        azar = random.Random(semilla * 1000 + numero)
+        usuario = Usuario(app, azar, productos, ventas)
+        propias = {}
+        propios_errores = {}
+        while True:
+            inicio = time.monotonic()
+            if inicio >= fin:
+                break
+            ruta, estado = usuario.ejecutar(azar.choice(acciones))
+            final = time.monotonic()
+            if inicio >= medir_desde:
+                propias.setdefault(ruta, []).append(final - inicio)
+                if estado >= 500:
+                    propios_errores[ruta] = propios_errores.get(ruta, 0) + 1
+        with lock:
+            for ruta, lista in propias.items():
+                muestras.setdefault(ruta, []).extend(lista)
+            for ruta, total in propios_errores.items():
+                errores[ruta] = errores.get(ruta, 0) + total
+
+    hilos = [threading.Thread(target=trabajador, args=(i,)) for i in range(concurrencia)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    rutas = {}
+    total = 0
+    for ruta, lista in sorted(muestras.items()):
+        lista.sort()
+        total += len(lista)
+        rutas[ruta] = {
+            "peticiones": len(lista),
+            "errores": errores.get(ruta, 0),
+            "rps": round(len(lista) / duracion, 2),
+            "media_ms": round(sum(lista) / len(lista) * 1000, 3),
+            "p50_ms": round(percentil(lista, 50) * 1000, 3),
+            "p95_ms": round(percentil(lista, 95) * 1000, 3),
+            "p99_ms": round(percentil(lista, 99) * 1000, 3),
+        }
+    return {"concurrencia": concurrencia, "rps_total": round(total / duracion, 2), "rutas": rutas}
+
+
+# --------------------------
+# Comparación de resultados
+# --------------------------
+def comparar(antes, despues):
+    # Imprime la diferencia de p50/p95/rps por ruta entre dos archivos de resultados.
+    with open(antes, encoding="utf-8") as archivo:
+        a = json.load(archivo)
+    with open(despues, encoding="utf-8") as archivo:
+        b = json.load(archivo)
+    niveles_a = {n["concurrencia"]: n for n in a["niveles"]}
+    print("%-8s %-26s %12s %12s %12s %12s" % ("conc.", "ruta", "p50 antes", "p50 después", "p95 Δ%", "rps Δ%"))
+    for nivel in b["niveles"]:
+        previo = niveles_a.get(nivel["concurrencia"])
+        if previo is None:
+            continue
+        for ruta, datos in nivel["rutas"].items():
+            base = previo["rutas"].get(ruta)
+            if base is None:
+                continue
+            delta_p95 = (datos["p95_ms"] - base["p95_ms"]) / base["p95_ms"] * 100 if base["p95_ms"] else 0
+            delta_rps = (datos["rps"] - base["rps"]) / base["rps"] * 100 if base["rps"] else 0
+            print("%-8d %-26s %12.2f %12.2f %+11.1f%% %+11.1f%%" % (
+                nivel["concurrencia"], ruta, base["p50_ms"], datos["p50_ms"], delta_p95, delta_rps))
+
+
+def _commit_actual():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pruebas de carga de PaginaWeb contra una base de datos local")
+    parser.add_argument("--host", default=os.environ.get("BENCH_DB_HOST", "localhost"))
+    parser.add_argument("--puerto", type=int, default=int(os.environ.get("BENCH_DB_PORT", 3306)))
+    parser.add_argument("--usuario", default=os.environ.get("BENCH_DB_USER", "root"))
+    parser.add_argument("--password", default=os.environ.get("BENCH_DB_PASSWORD", ""))
+    parser.add_argument("--base", default=os.environ.get("BENCH_DB_NAME", "postres_bench"))
+    parser.add_argument("--sembrar", action="store_true", help="borra y vuelve a llenar la base de prueba")
+    parser.add_argument("--productos", type=int, default=200)
+    parser.add_argument("--proveedores", type=int, default=50)
+    parser.add_argument("--compradores", type=int, default=5000)
+    parser.add_argument("--ventas", type=int, default=20000)
+    parser.add_argument("--detalles", type=int, default=3, help="líneas promedio por venta")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--concurrencia", default="1,8,32", help="niveles separados por coma")
+    parser.add_argument("--duracion", type=float, default=20, help="segundos medidos por nivel")
+    parser.add_argument("--calentamiento", type=float, default=3, help="segundos sin medir al inicio de cada nivel")
+    parser.add_argument("--pool", type=int, default=None, help="tamaño del pool (por defecto, la concurrencia)")
+    parser.add_argument("--checkout-modo", choices=("directo", "grupal"), default=None)
+    parser.add_argument("--salida", default=None, help="archivo JSON de resultados")
+    parser.add_argument("--comparar", nargs=2, metavar=("ANTES", "DESPUES"))
+    args = parser.parse_args(argv)
+
+    if args.comparar:
+        comparar(*args.comparar)
+        return
+
+    if args.base == "postres":
+        parser.error("la base de benchmark no puede ser 'postres' (la de la aplicación)")
+
+    config_db = {"host": args.host, "port": args.puerto, "user": args.usuario, "password": args.password}
+    servidor = mysql.connector.connect(**config_db)
+    servidor.cursor().execute("CREATE DATABASE IF NOT EXISTS `%s` CHARACTER SET utf8mb4" % args.base)
+    servidor.close()
+    config_db["database"] = args.base
+
+    datos = None
+    if args.sembrar:
+        print("Sembrando %s..." % args.base)
+        datos = sembrar(config_db, args.productos, args.proveedores, args.compradores,
+                        args.ventas, args.detalles, args.semilla)
+
+    from app import PaginaWeb
+    config = {"CHECKOUT_MODO": args.checkout_modo} if args.checkout_modo else None
+    web = PaginaWeb("app", config_db=config_db, config=config)
+    if args.sembrar:
+        with web.app.app_context():
+            web.resumenes.reconstruir(web.db, web.cursor)
+
+    resultados = {
+        "commit": _commit_actual(),
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "parametros": {k: v for k, v in vars(args).items() if k != "password"},
+        "datos": datos,
+        "niveles": [],
+    }
+    for concurrencia in [int(n) for n in args.concurrencia.split(",") if n.strip()]:
+        web.pool.tamano = args.pool or max(concurrencia, 1)
+        print("Concurrencia %d (%.0f s)..." % (concurrencia, args.duracion))
+        nivel = correr_nivel(web.app, concurrencia, args.duracion, args.calentamiento,
+                             args.productos, args.ventas, args.semilla)
+        nivel["pool"] = web.pool.estadisticas()
+        resultados["niveles"].append(nivel)
+        for ruta, r in nivel["rutas"].items():
+            print("  %-26s %7d pet. %8.1f rps  p50 %8.2f  p95 %8.2f  p99 %8.2f ms  errores %d" % (
+                ruta, r["peticiones"], r["rps"], r["p50_ms"], r["p95_ms"], r["p99_ms"], r["errores"]))
+
+    texto = json.dumps(resultados, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as archivo:
+            archivo.write(texto)
+        print("Resultados guardados en %s" % args.salida)
+    else:
+        print(texto)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# busqueda.py
+# Índice invertido en memoria para buscar productos por nombre y descripción.
+# - Búsqueda sin tildes ni mayúsculas: "crème brûlée" encuentra "creme brulee" y viceversa.
+# - Cada palabra de la consulta funciona como prefijo: "choc" encuentra "chocolate".
+# - El índice se sincroniza con el catálogo (cache_productos.py) de forma incremental:
+#   solo se vuelven a indexar los productos que se agregaron, cambiaron o se eliminaron.
+
+import bisect
+import re
+import threading
+import unicodedata
+
+RE_PALABRA = re.compile(r"\w+")
+
+
+def normalizar(texto):
+    # Minúsculas y sin acentos/diacríticos (á -> a, ü -> u, ñ -> n).
+    descompuesto = unicodedata.normalize("NFKD", (texto or "").lower())
+    return "".join(c for c in descompuesto if not unicodedata.combining(c))
+
+
+def palabras(texto):
+    return RE_PALABRA.findall(normalizar(texto))
+
+
+class IndiceProductos:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings = {}     # palabra -> set(Id_Producto)
+        self._docs = {}         # Id_Producto -> (firma, palabras del nombre, todas las palabras, producto)
+        self._terminos = []     # palabras ordenadas (para buscar prefijos con bisect)
+        self._terminos_sucios = False
+        self._origen = None     # última lista del catálogo sincronizada
+
+    # --------------------------
+    # Mantenimiento del índice
+    # --------------------------
+    def sincronizar(self, productos):
+        # Pone el índice al día con la lista del catálogo. Si es la misma lista que la última vez
+        # no hace nada; si no, reindexa solo los productos nuevos o modificados y quita los eliminados.
+        if productos is self._origen:
+            return
+        with self._lock:
+            if productos is self._origen:
+                return
+            vistos = set()
+            for p in productos:
+                id_producto = p["Id_Producto"]
+                vistos.add(id_producto)
+                firma = (p["Nombre_Producto"], p["Descripcion"], p["Precio"], p["Stock"], p["Imagen"])
+                actual = self._docs.get(id_producto)
+                if actual is not None and actual[0] == firma:
+                    continue
+                if actual is not None:
+                    self._quitar(id_producto)
+                self._agregar(id_producto, firma, p)
+            for id_producto in [i for i in self._docs if i not in vistos]:
+                self._quitar(id_producto)
+            self._origen = productos
+
+    def _agregar(self, id_producto, firma, producto):
+        nombre = set(palabras(producto["Nombre_Producto"]))
+        todas = nombre | set(palabras(producto["Descripcion"]))
+        self._docs[id_producto] = (firma, nombre, todas, producto)
+        for palabra in todas:
+            ids = self._postings.get(palabra)
+            if ids is None:
+                ids = self._postings[palabra] = set()
+                self._terminos_sucios = True
+            ids.add(id_producto)
+
+    def _quitar(self, id_producto):
+        _, _, todas, _ = self._docs.pop(id_producto)
+        for palabra in todas:
+            ids = self._postings[palabra]
+            ids.discard(id_producto)
+            if not ids:
+                del self._postings[palabra]
+                self._terminos_sucios = True
+
+    # --------------------------
+    # Consultas
+    # --------------------------
+    def _con_prefijo(self, prefijo):
+        # Ids de los productos que tienen alguna palabra que empieza con 'prefijo'. Llamar con el lock tomado.
+        if self._terminos_sucios:
+            self._terminos = sorted(self._postings)
+            self._terminos_sucios = False
+        ids = set()
+        i = bisect.bisect_left(self._terminos, prefijo)
+        while i < len(self._terminos) and self._terminos[i].startswith(prefijo):
+            ids |= self._postings[self._terminos[i]]
+            i += 1
+        return ids
+
+    def buscar(self, consulta="", precio_min=None, precio_max=None, stock_min=None):
+        # Devuelve la lista de productos que contienen TODAS las palabras de la consulta (como prefijo)
+        # y cumplen los filtros. Orden: primero los que coinciden en el nombre, luego por nombre.
+        terminos = palabras(consulta)
+        with self._lock:
+            if terminos:
+                ids = None
+                for termino in terminos:
+                    encontrados = self._con_prefijo(termino)
+                    ids = encontrados if ids is None else ids & encontrados
+                    if not ids:
+                        return []
+            else:
+                ids = set(self._docs)
+
+            resultados = []
+            for id_producto in ids:
+                _, nombre, _, p = self._docs[id_producto]
+                precio = float(p["Precio"] or 0)
+                if precio_min is not None and precio < precio_min:
+                    continue
+                if precio_max is not None and precio > precio_max:
+                    continue
+                if stock_min is not None and (p["Stock"] or 0) < stock_min:
+                    continue
+                # Cuántas palabras de la consulta aparecen (como prefijo) en el nombre
+                en_nombre = sum(1 for t in terminos if any(n.startswith(t) for n in nombre))
+                resultados.append((-en_nombre, normalizar(p["Nombre_Producto"]), id_producto, p))
+
+        resultados.sort(key=lambda r: r[:3])
+        return [r[3] for r in resultados]
@@ -0,0 +1,256 @@
+# cache_paginas.py
+# Caché de páginas completas para visitantes anónimos.
+# index, nosotros, contacto, login, producto y producto_detalle generan el mismo HTML para todos
+# los visitantes sin sesión con la misma query string, así que el HTML ya renderizado se guarda
+# (en memoria o en disco) y las visitas siguientes lo reciben sin pasar por Jinja ni por MySQL.
+# Cada página lleva ETag y Last-Modified: si el navegador ya la tiene responde 304 sin cuerpo.
+#
+# Invalidación por etiquetas: las páginas que dependen del catálogo se guardan con la etiqueta
+# "catalogo". Cada etiqueta tiene un número de generación que forma parte de la clave;
+# purgar("catalogo") avanza la generación y las páginas viejas dejan de encontrarse
+# (el límite de tamaño las termina borrando, primero las menos usadas).
+
+import functools
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from flask import make_response, request, session
+
+from imagenes import CacheDisco
+
+
+class Pagina:
+    # Respuesta guardada: cuerpo ya renderizado y sus encabezados de validación.
+    __slots__ = ("cuerpo", "mimetype", "etag", "modificada", "expira")
+
+    def __init__(self, cuerpo, mimetype, etag, modificada, expira):
+        self.cuerpo = cuerpo            # bytes
+        self.mimetype = mimetype
+        self.etag = etag
+        self.modificada = modificada    # segundos desde epoch (Last-Modified)
+        self.expira = expira            # segundos desde epoch
+
+    def a_bytes(self):
+        # Formato en disco: una línea JSON con los metadatos y luego el cuerpo tal cual.
+        cabecera = json.dumps([self.mimetype, self.etag, self.modificada, self.expira])
+        return cabecera.encode("utf-8") + b"\n" + self.cuerpo
+
+    @classmethod
+    def desde_bytes(cls, datos):
+        cabecera, cuerpo = datos.split(b"\n", 1)
+        mimetype, etag, modificada, expira = json.loads(cabecera)
+        return cls(cuerpo, mimetype, etag, modificada, expira)
+
+
+class BackendMemoria:
+    # LRU en memoria del proceso con límite de bytes (cada worker tiene la suya).
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._paginas = OrderedDict()   # clave -> Pagina, de la menos a la más recientemente usada
+        self._total = 0
+        self._generaciones = {}
+
+    def obtener(self, clave):
+        with self._lock:
+            pagina = self._paginas.get(clave)
+            if pagina is not None:
+                self._paginas.move_to_end(clave)
+            return pagina
+
+    def guardar(self, clave, pagina):
+        with self._lock:
+            anterior = self._paginas.pop(clave, None)
+            if anterior is not None:
+                self._total -= len(anterior.cuerpo)
+            self._paginas[clave] = pagina
+            self._total += len(pagina.cuerpo)
+            while self._total > self.max_bytes and len(self._paginas) > 1:
+                _, vieja = self._paginas.popitem(last=False)
+                self._total -= len(vieja.cuerpo)
+
+    def generacion(self, etiqueta):
+        return self._generaciones.get(etiqueta, 0)
+
+    def avanzar(self, etiqueta):
+        with self._lock:
+            self._generaciones[etiqueta] = self._generaciones.get(etiqueta, 0) + 1
+
+    def estadisticas(self):
+        with self._lock:
+            return {"paginas": len(self._paginas), "bytes": self._total, "max_bytes": self.max_bytes}
+
+
+class BackendDisco:
+    # Archivos en una carpeta compartida por todos los workers de la máquina (LRU por tamaño,
+    # ver CacheDisco). Las generaciones también están en disco, así una purga hecha por un
+    # worker la ven todos.
+    # El límite 'max_bytes' es para la carpeta entera: cada worker vuelve a leerla
+    # (CacheDisco.sincronizar) cada vez que escribió una décima parte del límite, así que
+    # la carpeta puede pasarse como mucho en esa décima parte por worker.
+    def __init__(self, carpeta, max_bytes):
+        self.cache = CacheDisco(os.path.join(carpeta, "paginas"), max_bytes)
+        self.carpeta_generaciones = os.path.join(carpeta, "generaciones")
+        os.makedirs(self.carpeta_generaciones, exist_ok=True)
+        self._lock = threading.Lock()
+        self._escritos = 0   # bytes guardados por este worker desde la última sincronización
+
+    def obtener(self, clave):
+        # Puede haberla guardado otro worker: se lee directo del disco (y no del índice de
+        # este proceso) y se marca como recién usada en el propio archivo, que ven todos.
+        self.cache.obtener(clave)
+        ruta = os.path.join(self.cache.carpeta, clave)
+        try:
+            with open(ruta, "rb") as archivo:
+                datos = archivo.read()
+            os.utime(ruta)
+            return Pagina.desde_bytes(datos)
+        except (OSError, ValueError):
+            return None
+
+    def guardar(self, clave, pagina):
+        datos = pagina.a_bytes()
+        self.cache.guardar(clave, datos)
+        with self._lock:
+            self._escritos += len(datos)
+            sincronizar = self._escritos >= self.cache.max_bytes // 10
+            if sincronizar:
+                self._escritos = 0
+        if sincronizar:
+            self.cache.sincronizar()
+
+    def _ruta_generacion(self, etiqueta):
+        return os.path.join(self.carpeta_generaciones, etiqueta)
+
+    def generacion(self, etiqueta):
+        try:
+            with open(self._ruta_generacion(etiqueta), encoding="ascii") as archivo:
+                return int(archivo.read() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def avanzar(self, etiqueta):
+        # Escritura atómica (.tmp + replace) para que nadie lea un número a medio escribir.
+        # Si dos workers purgan a la vez puede quedar un solo incremento: basta con que cambie.
+        ruta = self._ruta_generacion(etiqueta)
+        temporal = "%s.%d.%d.tmp" % (ruta, os.getpid(), threading.get_ident())
+        with open(temporal, "w", encoding="ascii") as archivo:
+            archivo.write(str(self.generacion(etiqueta) + 1))
+        os.replace(temporal, ruta)
+
+    def estadisticas(self):
+        return self.cache.estadisticas()
+
+
+def crear_backend(tipo, carpeta, max_bytes):
+    if tipo == "memoria":
+        return BackendMemoria(max_bytes)
+    if tipo == "disco":
+        return BackendDisco(carpeta, max_bytes)
+    raise ValueError("Backend de caché de páginas desconocido: %r" % tipo)
+
+
+class CachePaginas:
+    def __init__(self, backend, ttl=300):
+        # backend: BackendMemoria o BackendDisco. ttl: segundos que una página se sirve sin renderizar.
+        self.backend = backend
+        self.ttl = ttl
+        self._lock = threading.Lock()
+
+        # Estadísticas (por proceso)
+        self.aciertos = 0
+        self.fallos = 0
+        self.no_modificadas = 0   # respuestas 304
+        self.purgas = 0
+
+    def cachear(self, etiquetas=()):
+        # Decorador para vistas GET. Se aplica debajo de @app.route:
+        #   @app.route("/producto")
+        #   @paginas.cachear(etiquetas=("catalogo",))
+        #   def producto(): ...
+        def decorador(vista):
+            @functools.wraps(vista)
+            def envoltura(*args, **kwargs):
+                # Solo visitantes anónimos y solo GET (el POST de contacto pasa directo)
+                if request.method != "GET" or session.get("usuario"):
+                    return vista(*args, **kwargs)
+
+                clave = self._clave(etiquetas)
+                pagina = self.backend.obtener(clave)
+                if pagina is not None and pagina.expira > time.time():
+                    self._contar("aciertos")
+                else:
+                    self._contar("fallos")
+                    respuesta = make_response(vista(*args, **kwargs))
+                    if not _guardable(respuesta):
+                        return respuesta
+                    pagina = self._crear(respuesta)
+                    self.backend.guardar(clave, pagina)
+                return self._responder(pagina)
+            return envoltura
+        return decorador
+
+    def purgar(self, etiqueta):
+        # Las páginas con esa etiqueta se vuelven a renderizar en su próxima visita.
+        self.backend.avanzar(etiqueta)
+        self._contar("purgas")
+
+    def _clave(self, etiquetas):
+        # Ruta + query string ordenada (?a=1&b=2 y ?b=2&a=1 comparten entrada) + generaciones.
+        args = sorted(request.args.items(multi=True))
+        generaciones = [(e, self.backend.generacion(e)) for e in etiquetas]
+        texto = json.dumps([request.path, args, generaciones], ensure_ascii=False)
+        return hashlib.sha1(texto.encode("utf-8")).hexdigest()
+
+    def _crear(self, respuesta):
+        cuerpo = respuesta.get_data()
+        ahora = time.time()
+        return Pagina(
+            cuerpo,
+            respuesta.mimetype,
+            hashlib.sha1(cuerpo).hexdigest()[:20],
+            int(ahora),
+            ahora + self.ttl,
+        )
+
+    def _responder(self, pagina):
+        respuesta = make_response(pagina.cuerpo)
+        respuesta.mimetype = pagina.mimetype
+        respuesta.set_etag(pagina.etag)
+        respuesta.last_modified = datetime.fromtimestamp(pagina.modificada, timezone.utc)
+        # El navegador puede guardarla pero debe revalidar (If-None-Match -> 304) antes de usarla
+        respuesta.cache_control.no_cache = True
+        respuesta.make_conditional(request)
+        if respuesta.status_code == 304:
+            self._contar("no_modificadas")
+        return respuesta
+
+    def _contar(self, contador):
+        with self._lock:
+            setattr(self, contador, getattr(self, contador) + 1)
+
+    def estadisticas(self):
+        total = self.aciertos + self.fallos
+        return dict(
+            self.backend.estadisticas(),
+            aciertos=self.aciertos,
+            fallos=self.fallos,
+            tasa_aciertos=round(self.aciertos / total, 4) if total else 0.0,
+            no_modificadas=self.no_modificadas,
+            purgas=self.purgas,
+            ttl=self.ttl,
+        )
+
+
+def _guardable(respuesta):
+    # Solo respuestas 200 completas que no fijan cookies (nada propio de un visitante).
+    return (
+        respuesta.status_code == 200
+        and not respuesta.is_streamed
+        and "Set-Cookie" not in respuesta.headers
+    )
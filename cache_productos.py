@@ -0,0 +1,98 @@
+# cache_productos.py
+# Caché en memoria del catálogo de productos.
+# El catálogo cambia poco y se lee en casi todas las páginas, así que se guarda completo
+# en memoria (indexado por id y por nombre) y solo se vuelve a leer de MySQL cuando
+# vence el TTL o cuando una ruta de escritura (agregar/editar/eliminar) lo invalida.
+
+import threading
+import time
+
+
+class CacheProductos:
+    def __init__(self, cargar, ttl=300):
+        # cargar: función sin argumentos que devuelve la lista de productos (dicts) desde la DB.
+        # ttl: segundos que el catálogo se considera vigente.
+        self.cargar = cargar
+        self.ttl = ttl
+
+        self._lock = threading.Lock()    # protege _snapshot y _version (se toma solo por un instante)
+        self._carga = threading.Lock()   # una sola recarga desde MySQL a la vez
+        self._snapshot = None   # (expira_en, lista, por_id, por_nombre) o None si está invalidado
+        self._version = 0       # cambia en cada invalidación (evita guardar una carga que quedó vieja)
+
+        # Contadores para confirmar que el tráfico del catálogo ya no llega a MySQL
+        self.aciertos = 0
+        self.fallos = 0
+        self.invalidaciones = 0
+
+    def _vigente(self):
+        # Devuelve el snapshot actual si sigue vigente; si no, recarga el catálogo.
+        # Solo un hilo recarga a la vez (_carga); los demás esperan y reutilizan el resultado.
+        # La carga desde MySQL se hace SIN tomar _lock: invalidar() nunca espera a una carga lenta.
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot[0] > time.monotonic():
+            self.aciertos += 1
+            return snapshot
+
+        with self._carga:
+            snapshot = self._snapshot
+            if snapshot is not None and snapshot[0] > time.monotonic():
+                self.aciertos += 1
+                return snapshot
+
+            self.fallos += 1
+            with self._lock:
+                version = self._version
+            productos = list(self.cargar())
+
+            por_id = {}
+            por_nombre = {}
+            for p in productos:
+                por_id[p["Id_Producto"]] = p
+                # Si hay nombres repetidos se conserva el primero (igual que un LIMIT 1)
+                por_nombre.setdefault(p["Nombre_Producto"], p)
+
+            snapshot = (time.monotonic() + self.ttl, productos, por_id, por_nombre)
+            # Si alguien invalidó mientras se cargaba, no se guarda (pero sí se usa en esta petición):
+            # la próxima lectura vuelve a cargar e incluye ese cambio
+            with self._lock:
+                if version == self._version:
+                    self._snapshot = snapshot
+            return snapshot
+
+    # --------------------------
+    # Lecturas (los dicts devueltos son compartidos: no modificarlos)
+    # --------------------------
+    def todos(self):
+        # Lista completa de productos, en el orden de la consulta.
+        return self._vigente()[1]
+
+    def por_id(self, id_producto):
+        # Producto con ese Id_Producto, o None.
+        return self._vigente()[2].get(id_producto)
+
+    def por_nombre(self, nombre):
+        # Producto con ese Nombre_Producto, o None.
+        return self._vigente()[3].get(nombre)
+
+    # --------------------------
+    # Invalidación y estadísticas
+    # --------------------------
+    def invalidar(self):
+        # Descarta el catálogo en memoria; la siguiente lectura lo vuelve a cargar desde MySQL.
+        with self._lock:
+            self._version += 1
+            self._snapshot = None
+            self.invalidaciones += 1
+
+    def estadisticas(self):
+        snapshot = self._snapshot
+        total = self.aciertos + self.fallos
+        return {
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "tasa_aciertos": round(self.aciertos / total, 4) if total else 0.0,
+            "invalidaciones": self.invalidaciones,
+            "productos": len(snapshot[1]) if snapshot else 0,
+            "ttl": self.ttl,
+        }
@@ -0,0 +1,235 @@
+# carrito_store.py
+# Almacenamiento del carrito de compras del lado del servidor.
+# La cookie de sesión solo guarda el id del carrito (session["carrito_id"]); los ítems viven aquí,
+# en un dict indexado por Id_Producto, así cada operación es O(1) y la cookie no crece con el carrito.
+#
+# Hay dos implementaciones con la misma interfaz:
+# - CarritoMemoria: dict en memoria del proceso (rápido, pero cada worker tiene el suyo).
+# - CarritoSQLite: archivo SQLite compartido por todos los workers de la máquina.
+
+import os
+import sqlite3
+import threading
+import time
+
+
+class CarritoMemoria:
+    # Carritos en memoria: {carrito_id: {id_producto: item}}.
+    # Los carritos que no se tocan en 'max_inactivo' segundos se descartan.
+    def __init__(self, max_inactivo=7 * 24 * 3600):
+        self.max_inactivo = max_inactivo
+        self._carritos = {}
+        self._tocado = {}        # carrito_id -> última vez que se usó (time.monotonic)
+        self._lock = threading.Lock()
+        self._proxima_limpieza = time.monotonic() + 3600
+
+    def _items(self, carrito_id):
+        # Devuelve (creando si hace falta) el dict de ítems del carrito. Llamar con el lock tomado.
+        ahora = time.monotonic()
+        if ahora >= self._proxima_limpieza:
+            self._limpiar(ahora)
+        self._tocado[carrito_id] = ahora
+        return self._carritos.setdefault(carrito_id, {})
+
+    def _limpiar(self, ahora):
+        # Elimina carritos abandonados (se ejecuta como máximo una vez por hora).
+        self._proxima_limpieza = ahora + 3600
+        for carrito_id, tocado in list(self._tocado.items()):
+            if ahora - tocado > self.max_inactivo:
+                self._carritos.pop(carrito_id, None)
+                del self._tocado[carrito_id]
+
+    def obtener(self, carrito_id):
+        # Copia de los ítems del carrito: {id_producto: {"id", "titulo", "precio", "imagen", "cantidad"}}
+        with self._lock:
+            return {id_producto: dict(item) for id_producto, item in self._items(carrito_id).items()}
+
+    def agregar(self, carrito_id, producto, cantidad=1):
+        # Suma 'cantidad' unidades del producto (lo crea si no estaba). Devuelve la nueva cantidad.
+        with self._lock:
+            items = self._items(carrito_id)
+            item = items.get(producto["id"])
+            if item is None:
+                item = items[producto["id"]] = dict(producto, cantidad=0)
+            item["cantidad"] += cantidad
+            return item["cantidad"]
+
+    def sumar(self, carrito_id, id_producto, delta):
+        # Ajusta la cantidad en 'delta' (puede ser negativo). Si queda en 0 o menos, se quita el ítem.
+        # Devuelve la nueva cantidad, o None si el producto no estaba en el carrito.
+        with self._lock:
+            items = self._items(carrito_id)
+            item = items.get(id_producto)
+            if item is None:
+                return None
+            item["cantidad"] += delta
+            if item["cantidad"] <= 0:
+                del items[id_producto]
+                return 0
+            return item["cantidad"]
+
+    def fijar(self, carrito_id, id_producto, cantidad):
+        # Fija la cantidad exacta (0 o menos quita el ítem). Devuelve la nueva cantidad o None si no estaba.
+        with self._lock:
+            items = self._items(carrito_id)
+            item = items.get(id_producto)
+            if item is None:
+                return None
+            if cantidad <= 0:
+                del items[id_producto]
+                return 0
+            item["cantidad"] = cantidad
+            return cantidad
+
+    def eliminar(self, carrito_id, id_producto):
+        with self._lock:
+            self._items(carrito_id).pop(id_producto, None)
+
+    def vaciar(self, carrito_id):
+        with self._lock:
+            self._carritos.pop(carrito_id, None)
+            self._tocado.pop(carrito_id, None)
+
+
+class CarritoSQLite:
+    # Carritos en un archivo SQLite (una fila por ítem, llave primaria (carrito_id, id_producto)).
+    # Cada hilo usa su propia conexión porque sqlite3 no permite compartirlas entre hilos.
+    # Igual que en CarritoMemoria, los carritos sin cambios en 'max_inactivo' segundos se borran.
+    def __init__(self, ruta="carritos.db", max_inactivo=7 * 24 * 3600):
+        self.ruta = ruta
+        self.max_inactivo = max_inactivo
+        self._local = threading.local()
+        self._proxima_limpieza = time.monotonic() + 3600
+        # La tabla se crea con una conexión temporal: así no queda ninguna abierta si la app
+        # se crea en el proceso maestro antes del fork (una conexión SQLite no debe cruzar un fork).
+        conexion = sqlite3.connect(self.ruta, timeout=10)
+        try:
+            with conexion:
+                conexion.execute("""
+                    CREATE TABLE IF NOT EXISTS carrito_item (
+                        carrito_id TEXT NOT NULL,
+                        id_producto INTEGER NOT NULL,
+                        titulo TEXT,
+                        precio REAL,
+                        imagen TEXT,
+                        cantidad INTEGER NOT NULL,
+                        actualizado REAL NOT NULL,
+                        PRIMARY KEY (carrito_id, id_producto)
+                    )
+                """)
+        finally:
+            conexion.close()
+        if hasattr(os, "register_at_fork"):
+            # Si el padre ya había abierto conexiones, el hijo abre las suyas
+            os.register_at_fork(after_in_child=self._despues_de_fork)
+
+    def _despues_de_fork(self):
+        self._local = threading.local()
+
+    def _conexion(self):
+        conexion = getattr(self._local, "conexion", None)
+        if conexion is None:
+            # timeout: espera si otro proceso está escribiendo; WAL permite leer mientras se escribe
+            conexion = sqlite3.connect(self.ruta, timeout=10)
+            conexion.row_factory = sqlite3.Row
+            conexion.execute("PRAGMA journal_mode=WAL")
+            conexion.execute("PRAGMA synchronous=NORMAL")
+            self._local.conexion = conexion
+        return conexion
+
+    def obtener(self, carrito_id):
+        filas = self._conexion().execute(
+            "SELECT id_producto, titulo, precio, imagen, cantidad FROM carrito_item WHERE carrito_id = ? ORDER BY rowid",
+            (carrito_id,)
+        ).fetchall()
+        return {
+            f["id_producto"]: {
+                "id": f["id_producto"],
+                "titulo": f["titulo"],
+                "precio": f["precio"],
+                "imagen": f["imagen"],
+                "cantidad": f["cantidad"],
+            }
+            for f in filas
+        }
+
+    def _limpiar(self):
+        # Borra los carritos abandonados: aquellos cuyo ítem modificado más recientemente
+        # es más viejo que 'max_inactivo'. Cada proceso lo hace como máximo una vez por hora.
+        ahora = time.monotonic()
+        if ahora < self._proxima_limpieza:
+            return
+        self._proxima_limpieza = ahora + 3600
+        with self._conexion() as conexion:
+            conexion.execute("""
+                DELETE FROM carrito_item WHERE carrito_id IN (
+                    SELECT carrito_id FROM carrito_item
+                    GROUP BY carrito_id
+                    HAVING MAX(actualizado) < ?
+                )
+            """, (time.time() - self.max_inactivo,))
+
+    def agregar(self, carrito_id, producto, cantidad=1):
+        # UPSERT: una sola sentencia inserta el ítem o suma a la cantidad existente
+        self._limpiar()
+        with self._conexion() as conexion:
+            fila = conexion.execute("""
+                INSERT INTO carrito_item (carrito_id, id_producto, titulo, precio, imagen, cantidad, actualizado)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (carrito_id, id_producto)
+                DO UPDATE SET cantidad = cantidad + excluded.cantidad, actualizado = excluded.actualizado
+                RETURNING cantidad
+            """, (carrito_id, producto["id"], producto["titulo"], producto["precio"],
+                  producto["imagen"], cantidad, time.time())).fetchone()
+        return fila["cantidad"]
+
+    def sumar(self, carrito_id, id_producto, delta):
+        with self._conexion() as conexion:
+            fila = conexion.execute("""
+                UPDATE carrito_item SET cantidad = cantidad + ?, actualizado = ?
+                WHERE carrito_id = ? AND id_producto = ?
+                RETURNING cantidad
+            """, (delta, time.time(), carrito_id, id_producto)).fetchone()
+            if fila is None:
+                return None
+            if fila["cantidad"] <= 0:
+                conexion.execute(
+                    "DELETE FROM carrito_item WHERE carrito_id = ? AND id_producto = ?",
+                    (carrito_id, id_producto)
+                )
+                return 0
+        return fila["cantidad"]
+
+    def fijar(self, carrito_id, id_producto, cantidad):
+        with self._conexion() as conexion:
+            if cantidad <= 0:
+                cursor = conexion.execute(
+                    "DELETE FROM carrito_item WHERE carrito_id = ? AND id_producto = ?",
+                    (carrito_id, id_producto)
+                )
+                return 0 if cursor.rowcount else None
+            cursor = conexion.execute(
+                "UPDATE carrito_item SET cantidad = ?, actualizado = ? WHERE carrito_id = ? AND id_producto = ?",
+                (cantidad, time.time(), carrito_id, id_producto)
+            )
+        return cantidad if cursor.rowcount else None
+
+    def eliminar(self, carrito_id, id_producto):
+        with self._conexion() as conexion:
+            conexion.execute(
+                "DELETE FROM carrito_item WHERE carrito_id = ? AND id_producto = ?",
+                (carrito_id, id_producto)
+            )
+
+    def vaciar(self, carrito_id):
+        with self._conexion() as conexion:
+            conexion.execute("DELETE FROM carrito_item WHERE carrito_id = ?", (carrito_id,))
+
+
+def crear_store(tipo, **opciones):
+    # Crea el almacenamiento de carritos según la configuración CARRITO_BACKEND ("memoria" o "sqlite").
+    if tipo == "memoria":
+        return CarritoMemoria(**opciones)
+    if tipo == "sqlite":
+        return CarritoSQLite(**opciones)
+    raise ValueError("CARRITO_BACKEND desconocido: %r (usa 'memoria' o 'sqlite')" % tipo)
@@ -0,0 +1,197 @@
+# cola_compras.py
+# Modo de checkout con "group commit" para horas pico.
+# Cada petición de /guardar_compra deja su pedido (ya validado) en una cola acotada y espera.
+# Un hilo escritor toma varios pedidos a la vez, los guarda en UNA transacción (un solo commit,
+# un solo fsync en MySQL) y avisa a cada petición con su Id_Venta cuando el lote ya es durable.
+# Si la cola está llena la petición no espera indefinidamente: recibe ColaLlena (back-pressure).
+
+import queue
+import threading
+import time
+
+
+class ColaLlena(Exception):
+    # La cola de pedidos está llena: el servidor está saturado y conviene reintentar más tarde.
+    pass
+
+
+class CompraPendiente(Exception):
+    # El pedido no se confirmó a tiempo, pero el escritor ya lo está guardando:
+    # puede quedar registrado en cualquier momento, así que NO debe reintentarse.
+    pass
+
+
+class Pedido:
+    # Un pedido en espera: sus datos y el resultado que completa el hilo escritor.
+    def __init__(self, datos):
+        self.datos = datos
+        self.listo = threading.Event()
+        self.id_venta = None
+        self.error = None
+        self._lock = threading.Lock()
+        self._tomado = False      # el escritor empezó a guardarlo
+        self._cancelado = False   # la petición dejó de esperarlo antes de eso
+
+    def tomar(self):
+        # Lo llama el escritor antes de guardar. False si la petición ya lo canceló.
+        with self._lock:
+            if self._cancelado:
+                return False
+            self._tomado = True
+            return True
+
+    def cancelar(self):
+        # Lo llama la petición al agotar la espera. False si el escritor ya lo tomó.
+        with self._lock:
+            if self._tomado:
+                return False
+            self._cancelado = True
+            return True
+
+
+class ColaCompras:
+    def __init__(self, pool, guardar, preparar=None, max_cola=1000, max_lote=50, espera_lote=0.005):
+        # pool: PoolConexiones del que el escritor toma su conexión.
+        # guardar(db, cursor, datos): ejecuta los INSERT de un pedido (sin commit) y devuelve el Id_Venta.
+        # preparar(db, cursor): se llama antes de cada lote, fuera de la transacción (opcional).
+        # max_lote: pedidos como máximo por commit; espera_lote: segundos que se espera a que lleguen más.
+        self.pool = pool
+        self.guardar = guardar
+        self.preparar = preparar
+        self.max_lote = max_lote
+        self.espera_lote = espera_lote
+        self._cola = queue.Queue(maxsize=max_cola)
+        self._lock = threading.Lock()
+        self._hilo = None
+
+        # Estadísticas
+        self.pedidos = 0
+        self.lotes = 0
+        self.fallidos = 0
+        self.rechazados = 0
+        self.cancelados = 0
+
+    def _iniciar(self):
+        # El hilo escritor se crea con el primer pedido (y no al importar el módulo),
+        # así es seguro crear la app antes de hacer fork de los workers.
+        with self._lock:
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(target=self._escribir, name="cola-compras", daemon=True)
+                self._hilo.start()
+
+    def enviar(self, datos, espera_cola=2.0, espera_resultado=30.0):
+        # Encola el pedido y espera a que su lote se confirme. Devuelve el Id_Venta.
+        # Lanza ColaLlena si no hay espacio en 'espera_cola' segundos, o el error que ocurrió al guardar.
+        # Si el resultado no llega en 'espera_resultado' segundos: TimeoutError si el pedido se canceló
+        # sin guardarse (se puede reintentar) o CompraPendiente si ya se estaba guardando.
+        self._iniciar()
+        pedido = Pedido(datos)
+        try:
+            self._cola.put(pedido, timeout=espera_cola)
+        except queue.Full:
+            with self._lock:
+                self.rechazados += 1
+            raise ColaLlena("La cola de compras está llena")
+
+        if not pedido.listo.wait(espera_resultado):
+            if pedido.cancelar():
+                # Sigue en la cola: el escritor lo descartará, así que reintentar no duplica la venta
+                with self._lock:
+                    self.cancelados += 1
+                raise TimeoutError("La compra no se procesó a tiempo")
+            # El escritor ya lo tomó: su lote termina pronto con commit o rollback
+            if not pedido.listo.wait(espera_resultado):
+                raise CompraPendiente("La compra se está registrando")
+        if pedido.error is not None:
+            raise pedido.error
+        return pedido.id_venta
+
+    def _escribir(self):
+        # Bucle del hilo escritor: junta un lote y lo guarda con un solo commit.
+        while True:
+            lote = [self._cola.get()]
+            try:
+                limite = time.monotonic() + self.espera_lote
+                while len(lote) < self.max_lote:
+                    restante = limite - time.monotonic()
+                    try:
+                        lote.append(self._cola.get(timeout=restante) if restante > 0 else self._cola.get_nowait())
+                    except queue.Empty:
+                        break
+                self._guardar_lote(lote)
+            except Exception as error:
+                # El hilo no debe morir: si muere, ningún pedido posterior recibe respuesta.
+                # Los pedidos de este lote que aún esperan reciben el error.
+                self._terminar([p for p in lote if not p.listo.is_set()], error)
+
+    def _guardar_lote(self, lote):
+        # Se descartan los pedidos cuya petición ya dejó de esperar (ver enviar)
+        lote = [pedido for pedido in lote if pedido.tomar()]
+        if not lote:
+            return
+        try:
+            db = self.pool.obtener()
+        except Exception as error:
+            self._terminar(lote, error)
+            return
+
+        cursor = None
+        try:
+            cursor = db.cursor(dictionary=True)
+            if self.preparar is not None:
+                self.preparar(db, cursor)
+
+            confirmados = []
+            for pedido in lote:
+                # Un SAVEPOINT por pedido: si uno falla solo se deshace ese, el resto del lote sigue
+                cursor.execute("SAVEPOINT pedido")
+                try:
+                    pedido.id_venta = self.guardar(db, cursor, pedido.datos)
+                    confirmados.append(pedido)
+                except Exception as error:
+                    cursor.execute("ROLLBACK TO SAVEPOINT pedido")
+                    pedido.error = error
+
+            db.commit()   # un solo commit (y un solo fsync) para todo el lote
+        except Exception as error:
+            try:
+                db.rollback()
+            except Exception:
+                pass
+            for pedido in lote:
+                pedido.id_venta = None
+                pedido.error = pedido.error or error
+        finally:
+            if cursor is not None:
+                try:
+                    cursor.close()
+                except Exception:
+                    pass
+            self.pool.devolver(db)
+
+        with self._lock:
+            self.lotes += 1
+            self.pedidos += len(lote)
+            self.fallidos += sum(1 for p in lote if p.error is not None)
+        for pedido in lote:
+            pedido.listo.set()
+
+    def _terminar(self, lote, error):
+        with self._lock:
+            self.fallidos += len(lote)
+        for pedido in lote:
+            pedido.error = error
+            pedido.listo.set()
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                "en_cola": self._cola.qsize(),
+                "max_cola": self._cola.maxsize,
+                "pedidos": self.pedidos,
+                "lotes": self.lotes,
+                "pedidos_por_lote": round(self.pedidos / self.lotes, 2) if self.lotes else 0.0,
+                "fallidos": self.fallidos,
+                "rechazados": self.rechazados,
+                "cancelados": self.cancelados,
+            }
@@ -0,0 +1,108 @@
+# compresion.py
+# Compresión de respuestas (HTML, JSON, CSV, texto) según lo que acepte el navegador.
+# - Se negocia con Accept-Encoding: brotli si el paquete está instalado y el navegador lo acepta,
+#   si no gzip. Las respuestas más pequeñas que 'minimo' bytes se envían tal cual
+#   (comprimirlas cuesta más de lo que ahorra).
+# - Las respuestas por partes (streaming) se comprimen parte por parte con un flush en cada una,
+#   así el navegador recibe y muestra cada bloque apenas se genera.
+# - No se tocan las que ya traen Content-Encoding (los /assets/ precomprimidos) ni las imágenes.
+
+import zlib
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:   # brotli es opcional: sin él solo se usa gzip
+    brotli = None
+
+
+TIPOS_COMPRIMIBLES = {
+    "text/html",
+    "text/plain",
+    "text/css",
+    "text/csv",
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "image/svg+xml",
+}
+
+
+class Compresor:
+    def __init__(self, minimo=1024, nivel_gzip=6, nivel_br=4):
+        self.minimo = minimo            # bytes: por debajo de esto no se comprime
+        self.nivel_gzip = nivel_gzip    # 1 (rápido) a 9 (más chico)
+        self.nivel_br = nivel_br        # 0 a 11; 4-5 ya supera a gzip 6 y sigue siendo rápido
+
+    def registrar(self, app):
+        app.after_request(self.comprimir)
+
+    def _elegir(self):
+        # Codificación a usar según Accept-Encoding ("br", "gzip" o None).
+        aceptadas = request.accept_encodings
+        if brotli is not None and aceptadas["br"]:
+            return "br"
+        if aceptadas["gzip"]:
+            return "gzip"
+        return None
+
+    def comprimir(self, respuesta):
+        if (respuesta.status_code != 200
+                or respuesta.direct_passthrough           # archivos (send_file)
+                or "Content-Encoding" in respuesta.headers
+                or respuesta.mimetype not in TIPOS_COMPRIMIBLES
+                or request.method == "HEAD"):
+            return respuesta
+
+        # El contenido depende de Accept-Encoding: los proxies/cachés deben separar las variantes
+        respuesta.vary.add("Accept-Encoding")
+        codificacion = self._elegir()
+        if codificacion is None:
+            return respuesta
+
+        if respuesta.is_streamed:
+            original = respuesta.response
+            respuesta.response = self._por_partes(respuesta.iter_encoded(), original, codificacion)
+            respuesta.headers.pop("Content-Length", None)
+        else:
+            datos = respuesta.get_data()
+            if len(datos) < self.minimo:
+                return respuesta
+            respuesta.set_data(self._comprimir_todo(datos, codificacion))
+
+        respuesta.headers["Content-Encoding"] = codificacion
+        # El ETag describe el contenido sin comprimir: se marca como débil (W/"...") para no
+        # afirmar que los bytes son idénticos; If-None-Match lo sigue reconociendo (comparación débil).
+        etag, debil = respuesta.get_etag()
+        if etag and not debil:
+            respuesta.set_etag(etag, weak=True)
+        return respuesta
+
+    def _comprimir_todo(self, datos, codificacion):
+        if codificacion == "br":
+            return brotli.compress(datos, quality=self.nivel_br)
+        compresor = zlib.compressobj(self.nivel_gzip, zlib.DEFLATED, 31)   # 31 = formato gzip
+        return compresor.compress(datos) + compresor.flush()
+
+    def _por_partes(self, partes, original, codificacion):
+        # Comprime cada parte y la envía de inmediato (flush), sin esperar al resto.
+        if codificacion == "br":
+            compresor = brotli.Compressor(quality=self.nivel_br)
+            comprimir, vaciar, terminar = compresor.process, compresor.flush, compresor.finish
+        else:
+            compresor = zlib.compressobj(self.nivel_gzip, zlib.DEFLATED, 31)
+            comprimir = compresor.compress
+            vaciar = lambda: compresor.flush(zlib.Z_SYNC_FLUSH)
+            terminar = compresor.flush
+        try:
+            for parte in partes:
+                if parte:
+                    bloque = comprimir(parte) + vaciar()
+                    if bloque:
+                        yield bloque
+            yield terminar()
+        finally:
+            # Cierra el generador original (libera la conexión y el contexto de la petición)
+            if hasattr(original, "close"):
+                original.close()
@@ -0,0 +1,236 @@
+# conexion.py
+# Pool de conexiones MySQL usado por PaginaWeb.
+# Cada petición toma su propia conexión (y su propio cursor) del pool y la devuelve
+# al terminar, así los hilos del servidor WSGI nunca comparten el mismo cursor.
+
+import os
+import queue
+import threading
+import time
+
+from flask import g
+# g: objeto de Flask que vive solo durante la petición actual (ahí guardamos la conexión prestada)
+
+import mysql.connector
+
+
+class PoolAgotado(Exception):
+    # Se lanza cuando todas las conexiones están en uso y no se libera ninguna
+    # dentro del tiempo de espera configurado.
+    pass
+
+
+class PoolConexiones:
+    # Pool de tamaño fijo. Las conexiones se crean bajo demanda hasta llegar a 'tamano';
+    # a partir de ahí las peticiones esperan (como máximo 'espera_max' segundos) a que otra termine.
+    def __init__(self, config_db, tamano=5, espera_max=10.0, max_inactiva=300, nombre="db"):
+        self.config_db = dict(config_db)   # parámetros para mysql.connector.connect
+        self.nombre = nombre               # prefijo en g: cada pool (primario, réplicas) guarda ahí su conexión
+        self.tamano = tamano               # número máximo de conexiones abiertas
+        self.espera_max = espera_max       # segundos que una petición espera por una conexión libre
+        self.max_inactiva = max_inactiva   # segundos ociosa antes de verificarla con ping al prestarla
+        self.envolver_cursor = None        # función opcional que envuelve el cursor de cada petición (métricas)
+
+        # LIFO: se reutiliza primero la conexión usada más recientemente
+        # (es la que menos probabilidad tiene de haber sido cerrada por MySQL por inactividad).
+        self._libres = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._creadas = 0
+        self._preparados = {}   # conexión -> {sql: (cursor preparado, sql)} (ver preparado())
+
+        # Estadísticas (se leen con estadisticas())
+        self._prestamos = 0
+        self._espera_total = 0.0
+        self._espera_max_observada = 0.0
+        self._reconexiones = 0
+        self._agotado = 0
+
+        # Conexiones que quedaron en el proceso padre al hacer fork (ver _despues_de_fork)
+        self._heredadas = []
+        if hasattr(os, "register_at_fork"):   # no existe en Windows
+            os.register_at_fork(after_in_child=self._despues_de_fork)
+
+    def _despues_de_fork(self):
+        # En el worker recién creado el pool empieza vacío: un socket MySQL no se puede
+        # compartir entre procesos. Las conexiones copiadas del padre no se cierran (eso le
+        # cerraría la sesión al padre); solo se guardan para que nunca se usen ni se recolecten.
+        self._heredadas.extend(conexion for conexion, _ in list(self._libres.queue))
+        self._libres = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._creadas = 0
+        self._preparados = {}
+
+    # --------------------------
+    # Préstamo y devolución
+    # --------------------------
+    def obtener(self, espera=None):
+        # Devuelve una conexión lista para usar. Primero intenta una libre; si no hay
+        # y aún no se llegó al tamaño máximo, abre una nueva; si no, espera
+        # ('espera' segundos, por defecto espera_max; con 0 lanza PoolAgotado de inmediato).
+        inicio = time.perf_counter()
+        try:
+            conexion, ultima_vez = self._libres.get_nowait()
+        except queue.Empty:
+            conexion, ultima_vez = self._crear_o_esperar(self.espera_max if espera is None else espera)
+
+        conexion = self._validar(conexion, ultima_vez)
+
+        espera = time.perf_counter() - inicio
+        with self._lock:
+            self._prestamos += 1
+            self._espera_total += espera
+            self._espera_max_observada = max(self._espera_max_observada, espera)
+        return conexion
+
+    def _crear_o_esperar(self, espera):
+        with self._lock:
+            puede_crear = self._creadas < self.tamano
+            if puede_crear:
+                self._creadas += 1   # se reserva el cupo antes de conectar (fuera del lock)
+
+        if puede_crear:
+            try:
+                return mysql.connector.connect(**self.config_db), time.monotonic()
+            except Exception:
+                with self._lock:
+                    self._creadas -= 1
+                raise
+
+        try:
+            return self._libres.get(timeout=espera)
+        except queue.Empty:
+            with self._lock:
+                self._agotado += 1
+            raise PoolAgotado(
+                "No hay conexiones libres después de %s segundos (tamaño del pool: %s)"
+                % (espera, self.tamano)
+            )
+
+    def _validar(self, conexion, ultima_vez):
+        # MySQL cierra las conexiones que pasan más de 'wait_timeout' sin usarse.
+        # Si la conexión estuvo ociosa mucho tiempo se verifica con un ping y, si se cayó, se reconecta.
+        if time.monotonic() - ultima_vez < self.max_inactiva:
+            return conexion
+        try:
+            conexion.ping(reconnect=False)
+            return conexion
+        except mysql.connector.Error:
+            pass
+
+        with self._lock:
+            self._reconexiones += 1
+            # Las sentencias preparadas viven en la sesión del servidor: se pierden al reconectar
+            self._preparados.pop(conexion, None)
+        try:
+            conexion.reconnect(attempts=3, delay=0)
+            return conexion
+        except mysql.connector.Error:
+            # No se pudo recuperar: se libera el cupo para que la próxima petición abra una nueva.
+            self._descartar(conexion)
+            raise
+
+    def devolver(self, conexion, rota=False):
+        # Devuelve la conexión al pool. Si quedó una transacción abierta (por ejemplo, por un
+        # error a mitad de la petición) se deshace para que el siguiente usuario la reciba limpia.
+        # rota=True (la petición terminó con un error de MySQL) o una conexión que ya no responde
+        # se cierra y no vuelve al pool: 'in_transaction' solo lee una marca y nunca falla, así que
+        # sin esta comprobación una conexión caída volvería como la más reciente (LIFO) y la
+        # recibiría la próxima petición.
+        try:
+            if rota or not conexion.is_connected():
+                raise mysql.connector.Error("Conexión caída")
+            if conexion.in_transaction:
+                conexion.rollback()
+        except mysql.connector.Error:
+            # La conexión está rota: se cierra, no vuelve al pool y se olvidan sus sentencias preparadas.
+            self._descartar(conexion)
+            return
+        self._libres.put((conexion, time.monotonic()))
+
+    def _descartar(self, conexion):
+        try:
+            conexion.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._creadas -= 1
+            self._preparados.pop(conexion, None)
+
+    # --------------------------
+    # Conexión por petición (Flask)
+    # --------------------------
+    def registrar(self, app):
+        # Conecta el pool con la app: al terminar cada petición se devuelve la conexión prestada.
+        app.teardown_appcontext(self.liberar)
+
+    def conexion(self, espera=None):
+        # Conexión de la petición actual. Se pide al pool solo la primera vez que se usa,
+        # así las rutas que no tocan la base de datos no ocupan ninguna conexión.
+        # 'espera': como en obtener().
+        clave = self.nombre + "_conexion"
+        if clave not in g:
+            setattr(g, clave, self.obtener(espera))
+        return getattr(g, clave)
+
+    def cursor(self):
+        # Cursor (dictionary=True) de la petición actual, ligado a su conexión.
+        clave = self.nombre + "_cursor"
+        if clave not in g:
+            cursor = self.conexion().cursor(dictionary=True)
+            if self.envolver_cursor is not None:
+                cursor = self.envolver_cursor(cursor)
+            setattr(g, clave, cursor)
+        return getattr(g, clave)
+
+    def preparado(self, sql, conexion=None):
+        # (cursor, sql) con 'sql' preparado en el servidor, para la conexión indicada
+        # (por defecto, la de la petición actual). Se guarda un cursor por (conexión, SQL) y se
+        # reutiliza mientras la conexión siga en el pool.
+        # Hay que ejecutar el 'sql' DEVUELTO y no el recibido: mysql-connector solo evita volver
+        # a preparar si recibe el mismo objeto str que la vez anterior (compara con 'is', no con ==),
+        # y los SQL armados con % son un objeto nuevo en cada llamada aunque el texto sea igual.
+        # Así MySQL analiza cada consulta una sola vez por conexión y después solo recibe los parámetros.
+        if conexion is None:
+            conexion = self.conexion()
+        with self._lock:
+            sentencias = self._preparados.setdefault(conexion, {})
+        guardado = sentencias.get(sql)
+        if guardado is None:
+            cursor = conexion.cursor(prepared=True)
+            if self.envolver_cursor is not None:
+                cursor = self.envolver_cursor(cursor)
+            guardado = sentencias[sql] = (cursor, sql)
+        return guardado
+
+    def liberar(self, error=None):
+        # Se ejecuta en el teardown de cada petición. 'error': la excepción que terminó la petición.
+        cursor = g.pop(self.nombre + "_cursor", None)
+        conexion = g.pop(self.nombre + "_conexion", None)
+        if cursor is not None:
+            try:
+                cursor.close()
+            except mysql.connector.Error:
+                pass
+        if conexion is not None:
+            self.devolver(conexion, rota=isinstance(error, mysql.connector.Error))
+
+    # --------------------------
+    # Estadísticas
+    # --------------------------
+    def estadisticas(self):
+        # Resumen del estado del pool (para el endpoint /estado/pool).
+        with self._lock:
+            libres = self._libres.qsize()
+            prestamos = self._prestamos
+            return {
+                "tamano": self.tamano,
+                "creadas": self._creadas,
+                "libres": libres,
+                "en_uso": self._creadas - libres,
+                "prestamos": prestamos,
+                "espera_promedio_ms": round(self._espera_total / prestamos * 1000, 3) if prestamos else 0.0,
+                "espera_max_ms": round(self._espera_max_observada * 1000, 3),
+                "agotado": self._agotado,
+                "reconexiones": self._reconexiones,
+                "sentencias_preparadas": sum(len(s) for s in self._preparados.values()),
+            }
@@ -0,0 +1,174 @@
+# configuracion.py
+# Configuración de PaginaWeb. Los valores se aplican en este orden (el último gana):
+#   1. POR_DEFECTO (este archivo)
+#   2. Archivo de configuración: .py (variables en MAYÚSCULAS) o .json.
+#      Se indica con el argumento archivo_config o con la variable de entorno PAGINAWEB_CONFIG.
+#   3. Variables de entorno con prefijo PAGINAWEB_ (por ejemplo PAGINAWEB_DB_PASSWORD=secreto).
+#   4. El diccionario 'config' que se pase a PaginaWeb / crear_app (usado por benchmark.py).
+
+import json
+import os
+
+PREFIJO_ENTORNO = "PAGINAWEB_"
+
+POR_DEFECTO = {
+    # Clave secreta para sesiones (cookies firmadas). En producción debe venir del entorno.
+    "SECRET_KEY": "superclave",
+
+    # 🔹 CONEXIÓN A MYSQL (POOL)
+    # ⚠️ La contraseña está vacía: en producción usa PAGINAWEB_DB_PASSWORD.
+    "DB_HOST": "localhost",
+    "DB_PORT": 3306,
+    "DB_USER": "root",
+    "DB_PASSWORD": "",
+    "DB_NAME": "postres",
+    "DB_POOL_SIZE": 5,              # conexiones máximas abiertas a la vez
+    "DB_POOL_TIMEOUT": 10,          # segundos que una petición espera por una conexión libre
+    "DB_POOL_MAX_INACTIVA": 300,    # segundos ociosa antes de verificarla con ping
+
+    # 🔹 RÉPLICAS DE LECTURA (ver replicas.py)
+    # "host:puerto,host:puerto" (mismo usuario, contraseña y base que el primario).
+    # En un archivo de configuración también se acepta una lista de dicts con parámetros de conexión.
+    "DB_REPLICAS": "",
+    "DB_REPLICA_PEGAJOSA": 5,       # segundos que una sesión lee del primario después de escribir
+    "DB_REPLICA_REINTENTO": 30,     # segundos que una réplica caída queda fuera de la rotación
+
+    # Paginación de /ventas y /api/ventas
+    "VENTAS_POR_PAGINA": 50,        # ventas por página si no se envía 'limite'
+    "VENTAS_LIMITE_MAX": 200,       # máximo permitido para 'limite'
+    "VENTAS_LOTE_MAX": 1000,        # máximo de ventas por petición en /ventas/detalles
+
+    # 🔹 MÉTRICAS
+    "METRICAS_CONSULTA_LENTA": 0.2, # segundos: a partir de aquí se guarda el SQL
+    "PERFILADO_HABILITADO": False,  # permite perfilar con el encabezado X-Perfil: 1
+
+    # 🔹 CACHÉ DEL CATÁLOGO Y BÚSQUEDA
+    "CATALOGO_TTL": 300,
+    "BUSQUEDA_POR_PAGINA": 20,
+    "BUSQUEDA_LIMITE_MAX": 100,
+
+    # 🔹 RESÚMENES DE VENTAS (reportes)
+    "REPORTES_DIAS": 30,            # rango por defecto del tablero
+
+    # 🔹 IMPORTACIÓN MASIVA
+    "IMPORTACION_TAMANO_LOTE": 500, # filas por INSERT/commit
+
+    # 🔹 MODO DE CHECKOUT
+    # "directo": cada compra hace su propio commit.
+    # "grupal": las compras se encolan y se guardan por lotes con un solo commit (horas pico).
+    "CHECKOUT_MODO": "directo",
+    "CHECKOUT_MAX_COLA": 1000,       # pedidos en espera como máximo
+    "CHECKOUT_MAX_LOTE": 50,         # pedidos por commit como máximo
+    "CHECKOUT_ESPERA_LOTE": 0.005,   # segundos que el escritor espera a que lleguen más
+    "CHECKOUT_ESPERA_COLA": 2,       # segundos que una compra espera lugar en la cola
+    "CHECKOUT_ESPERA_RESULTADO": 30, # segundos que una compra espera su confirmación
+
+    # 🔹 CARRITO EN EL SERVIDOR
+    # "sqlite" (archivo compartido entre workers) o "memoria" (un dict por proceso: solo sirve
+    # con un único proceso, como el servidor de desarrollo; con varios workers el carrito
+    # "se vacía" cada vez que la petición cae en otro).
+    "CARRITO_BACKEND": "sqlite",
+    "CARRITO_SQLITE_RUTA": "carritos.db",
+    "CARRITO_CANTIDAD_MAX": 999,     # unidades como máximo por producto en /actualizar_cantidad
+
+    # 🔹 IMÁGENES DE PRODUCTOS REDIMENSIONADAS
+    "IMAGENES_CACHE_DIR": "cache_imagenes",
+    "IMAGENES_CACHE_MAX_MB": 200,
+    "IMAGENES_MAX_AGE": 3600,        # segundos que el navegador reutiliza la imagen sin preguntar
+
+    # 🔹 CACHÉ DE PÁGINAS (visitantes anónimos)
+    # "memoria" (por worker), "disco" (compartida entre workers, también las purgas) o "" (desactivada).
+    "PAGINAS_CACHE_BACKEND": "memoria",
+    "PAGINAS_CACHE_DIR": "cache_paginas",
+    "PAGINAS_CACHE_MAX_MB": 50,
+    "PAGINAS_CACHE_TTL": 300,        # segundos que una página se sirve sin volver a renderizarla
+
+    # 🔹 COMPRESIÓN DE RESPUESTAS (ver compresion.py)
+    "COMPRESION_HABILITADA": True,
+    "COMPRESION_MINIMO": 1024,       # bytes: las respuestas más chicas se envían sin comprimir
+    "COMPRESION_NIVEL_GZIP": 6,
+    "COMPRESION_NIVEL_BR": 4,
+
+    # 🔹 PLANTILLAS
+    # Las plantillas se compilan al crear la app y el bytecode se guarda en disco,
+    # así los workers nuevos (o reiniciados) no vuelven a compilar nada.
+    "PLANTILLAS_CACHE_DIR": "cache_plantillas",   # "" desactiva la caché de bytecode
+    "PLANTILLAS_PRECOMPILAR": True,
+    "PLANTILLAS_STREAM_BUFFER": 20,  # fragmentos de plantilla por parte en las páginas enviadas por partes
+}
+
+
+def _convertir(valor, ejemplo):
+    # Las variables de entorno siempre son texto: se convierten al tipo del valor por defecto.
+    if isinstance(ejemplo, bool):
+        return valor.strip().lower() in ("1", "true", "si", "sí", "yes", "on")
+    if isinstance(ejemplo, int):
+        return int(valor)
+    if isinstance(ejemplo, float):
+        return float(valor)
+    return valor
+
+
+def leer_archivo(ruta):
+    # Devuelve las claves en MAYÚSCULAS de un archivo .py o .json.
+    if ruta.endswith(".json"):
+        with open(ruta, encoding="utf-8") as archivo:
+            datos = json.load(archivo)
+    else:
+        datos = {}
+        with open(ruta, encoding="utf-8") as archivo:
+            exec(compile(archivo.read(), ruta, "exec"), datos)
+    return {clave: valor for clave, valor in datos.items() if clave.isupper()}
+
+
+def leer_entorno(entorno=None):
+    # Variables PAGINAWEB_<CLAVE> para las claves conocidas (con el tipo de su valor por defecto).
+    entorno = os.environ if entorno is None else entorno
+    valores = {}
+    for clave, ejemplo in POR_DEFECTO.items():
+        texto = entorno.get(PREFIJO_ENTORNO + clave)
+        if texto is not None:
+            try:
+                valores[clave] = _convertir(texto, ejemplo)
+            except ValueError:
+                raise ValueError("%s%s no es válido: %r" % (PREFIJO_ENTORNO, clave, texto))
+    return valores
+
+
+def cargar(app, archivo_config=None, config=None):
+    # Aplica la configuración completa a app.config (ver el orden al inicio del archivo).
+    app.config.update(POR_DEFECTO)
+    archivo_config = archivo_config or os.environ.get(PREFIJO_ENTORNO + "CONFIG")
+    if archivo_config:
+        app.config.update(leer_archivo(archivo_config))
+    app.config.update(leer_entorno())
+    if config:
+        app.config.update(config)
+    return app.config
+
+
+def config_db(config):
+    # Parámetros de mysql.connector.connect a partir de las claves DB_*.
+    return {
+        "host": config["DB_HOST"],
+        "port": config["DB_PORT"],
+        "user": config["DB_USER"],
+        "password": config["DB_PASSWORD"],
+        "database": config["DB_NAME"],
+    }
+
+
+def config_replicas(config, primario):
+    # Lista de parámetros de conexión de cada réplica, a partir de DB_REPLICAS.
+    # primario: parámetros del primario, de los que se copian usuario, contraseña y base.
+    replicas = config["DB_REPLICAS"]
+    if isinstance(replicas, str):
+        lista = []
+        for direccion in replicas.split(","):
+            direccion = direccion.strip()
+            if not direccion:
+                continue
+            host, _, puerto = direccion.partition(":")
+            lista.append({"host": host, "port": int(puerto) if puerto else 3306})
+        replicas = lista
+    return [dict(primario, **replica) for replica in replicas]
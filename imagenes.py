@@ -0,0 +1,165 @@
+# imagenes.py
+# Redimensionado de imágenes de productos bajo demanda.
+# /imagen/<id_producto>?ancho=480 devuelve la imagen del producto reducida a ese ancho (en WebP),
+# guardada en una caché en disco con tamaño máximo (se borran primero las menos usadas, LRU).
+
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+from werkzeug.security import safe_join
+
+try:
+    from PIL import Image
+except ImportError:   # Pillow es opcional: sin él se redirige a la imagen original
+    Image = None
+
+
+# Anchos permitidos: el pedido se redondea hacia arriba al más cercano,
+# así la caché no se llena con una variante por cada ancho posible.
+ANCHOS = (160, 320, 480, 640, 960, 1280)
+
+
+def ancho_permitido(ancho):
+    # Ancho de ANCHOS más cercano por arriba (o el mayor). Lanza ValueError si no es positivo.
+    if ancho <= 0:
+        raise ValueError("El ancho debe ser mayor que 0")
+    for candidato in ANCHOS:
+        if ancho <= candidato:
+            return candidato
+    return ANCHOS[-1]
+
+
+class CacheDisco:
+    # Caché LRU de archivos en una carpeta, con un límite total de bytes.
+    def __init__(self, carpeta, max_bytes):
+        self.carpeta = carpeta
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._archivos = OrderedDict()   # nombre -> tamaño, del menos al más recientemente usado
+        self._total = 0
+
+        os.makedirs(carpeta, exist_ok=True)
+        # Al arrancar se recupera lo que ya estaba en disco
+        self.sincronizar()
+
+    def sincronizar(self):
+        # Vuelve a leer la carpeta (ordenada por último uso) y borra lo que sobre del límite.
+        # Sirve cuando varios procesos escriben en la misma carpeta: cada uno solo conoce lo
+        # que guardó él, así que el límite total se aplica leyendo lo que hay realmente en disco.
+        existentes = []
+        for entrada in os.scandir(self.carpeta):
+            if entrada.name.endswith(".tmp"):
+                continue
+            try:
+                info = entrada.stat()
+            except OSError:   # otro proceso lo borró mientras se recorría la carpeta
+                continue
+            if entrada.is_file():
+                existentes.append((max(info.st_atime, info.st_mtime), entrada.name, info.st_size))
+        with self._lock:
+            self._archivos = OrderedDict((nombre, tamano) for _, nombre, tamano in sorted(existentes))
+            self._total = sum(self._archivos.values())
+            self._recortar()
+
+    def obtener(self, nombre):
+        # Ruta del archivo si está en caché (y lo marca como recién usado), o None.
+        with self._lock:
+            if nombre not in self._archivos:
+                return None
+            self._archivos.move_to_end(nombre)
+        return os.path.join(self.carpeta, nombre)
+
+    def guardar(self, nombre, datos):
+        # Escribe el archivo (de forma atómica: .tmp + replace) y libera espacio si se pasa del límite.
+        ruta = os.path.join(self.carpeta, nombre)
+        temporal = "%s.%d.tmp" % (ruta, threading.get_ident())
+        with open(temporal, "wb") as archivo:
+            archivo.write(datos)
+        os.replace(temporal, ruta)
+        with self._lock:
+            self._total += len(datos) - self._archivos.pop(nombre, 0)
+            self._archivos[nombre] = len(datos)
+            self._recortar()
+        return ruta
+
+    def _recortar(self):
+        # Borra los archivos menos usados hasta quedar bajo max_bytes. Llamar con el lock tomado.
+        while self._total > self.max_bytes and len(self._archivos) > 1:
+            nombre, tamano = self._archivos.popitem(last=False)
+            self._total -= tamano
+            try:
+                os.remove(os.path.join(self.carpeta, nombre))
+            except OSError:
+                pass
+
+    def estadisticas(self):
+        with self._lock:
+            return {"archivos": len(self._archivos), "bytes": self._total, "max_bytes": self.max_bytes}
+
+
+class Redimensionador:
+    def __init__(self, carpeta_static, cache):
+        self.carpeta_static = carpeta_static
+        self.cache = cache
+
+    def ruta_local(self, imagen):
+        # Traduce el valor de producto.Imagen a un archivo dentro de /static, o None si es externo.
+        # Acepta "/static/producto_1.png", "static/producto_1.png" o "producto_1.png".
+        if not imagen:
+            return None
+        url = urlparse(imagen)
+        if url.scheme or url.netloc:
+            return None
+        ruta = url.path.lstrip("/")
+        if ruta.startswith("static/"):
+            ruta = ruta[len("static/"):]
+        ruta = safe_join(self.carpeta_static, ruta)
+        if ruta is None or not os.path.isfile(ruta):
+            return None
+        return ruta
+
+    def obtener(self, imagen, ancho):
+        # Devuelve (archivo_abierto, etag) de la imagen reducida, o None si no se puede procesar
+        # (imagen externa, archivo inexistente o Pillow no instalado).
+        # Se devuelve el archivo ya abierto y no su ruta: otro worker o hilo puede sacarlo de la
+        # caché en cualquier momento, y un archivo abierto se sigue pudiendo leer aunque se borre.
+        if Image is None:
+            return None
+        origen = self.ruta_local(imagen)
+        if origen is None:
+            return None
+
+        # La clave depende del archivo original (ruta, fecha y tamaño) y del ancho:
+        # si la imagen cambia, cambia la clave y por lo tanto el ETag.
+        info = os.stat(origen)
+        clave = hashlib.sha1(
+            ("%s|%s|%s|%s" % (origen, info.st_mtime_ns, info.st_size, ancho)).encode("utf-8")
+        ).hexdigest()[:20]
+        nombre = clave + ".webp"
+
+        ruta = self.cache.obtener(nombre)
+        if ruta is not None:
+            try:
+                return open(ruta, "rb"), clave
+            except FileNotFoundError:
+                pass   # se borró entre obtener() y open(): se vuelve a generar
+
+        with Image.open(origen) as original:
+            original.load()
+            if original.mode not in ("RGB", "RGBA"):
+                original = original.convert("RGBA")
+            # thumbnail nunca agranda: si la original es más pequeña se deja igual
+            original.thumbnail((ancho, ancho * 4), Image.LANCZOS)
+            salida = io.BytesIO()
+            original.save(salida, "WEBP", quality=80, method=4)
+        ruta = self.cache.guardar(nombre, salida.getvalue())
+        try:
+            return open(ruta, "rb"), clave
+        except FileNotFoundError:
+            # Otro proceso la desalojó apenas se guardó: se envía desde memoria
+            salida.seek(0)
+            return salida, clave
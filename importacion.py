@@ -0,0 +1,297 @@
+# importacion.py
+# Importación y exportación masiva de productos/proveedores en CSV o JSON Lines.
+# - La importación lee el archivo subido fila por fila (sin cargarlo completo en memoria),
+#   valida cada fila y guarda por lotes: un solo INSERT ... ON DUPLICATE KEY UPDATE y un commit por lote.
+# - La exportación genera el archivo fila por fila mientras lo lee de MySQL, así la memoria queda constante.
+
+import csv
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+# Nombres de columna aceptados en el archivo -> campo interno
+# (sirven tanto los nombres del formulario como los de la tabla producto)
+ALIAS_PRODUCTO = {
+    "id": "id", "id_producto": "id",
+    "nombre": "nombre", "nombre_producto": "nombre",
+    "descripcion": "descripcion",
+    "imagen": "imagen",
+    "precio": "precio",
+    "stock": "stock",
+    "fecha": "fecha", "fecha_vencimiento": "fecha",
+}
+
+# Límites de las columnas de producto: Precio DECIMAL(10, 2) y Stock INT
+PRECIO_MAX = Decimal("99999999.99")
+STOCK_MAX = 2147483647
+
+# Tablas que se pueden exportar y sus columnas (explícitas, en este orden)
+EXPORTABLES = {
+    "producto": ("Id_Producto", "Nombre_Producto", "Descripcion", "Imagen", "Precio", "Stock", "Fecha_Vencimiento"),
+    "proveedor": ("Id_Proveedor", "Nombre", "Telefono", "Correo", "Direccion", "Tipo_Producto"),
+}
+
+
+# --------------------------
+# Lectura del archivo subido
+# --------------------------
+def leer_filas(archivo, formato):
+    # Generador de (numero_de_linea, dict) a partir del archivo subido (FileStorage.stream).
+    texto = io.TextIOWrapper(archivo, encoding="utf-8-sig", newline="")
+    if formato == "csv":
+        lector = csv.DictReader(texto)
+        for fila in lector:
+            yield lector.line_num, fila
+    elif formato == "jsonl":
+        for numero, linea in enumerate(texto, start=1):
+            if linea.strip():
+                try:
+                    fila = json.loads(linea)
+                except ValueError:
+                    yield numero, None   # se reporta como error de validación
+                    continue
+                yield numero, fila
+    else:
+        raise ValueError("Formato no soportado: %r (usa csv o jsonl)" % formato)
+
+
+def validar_producto(fila):
+    # Convierte una fila del archivo en un dict de producto válido. Lanza ValueError con el motivo.
+    if not isinstance(fila, dict):
+        raise ValueError("fila con formato inválido")
+    datos = {}
+    for columna, valor in fila.items():
+        campo = ALIAS_PRODUCTO.get((columna or "").strip().lower())
+        if campo:
+            datos[campo] = valor.strip() if isinstance(valor, str) else valor
+
+    if not datos.get("nombre"):
+        raise ValueError("falta el nombre")
+
+    id_producto = datos.get("id")
+    if id_producto in ("", None):
+        id_producto = None
+    else:
+        try:
+            id_producto = int(id_producto)
+        except (TypeError, ValueError):
+            raise ValueError("id inválido")
+
+    try:
+        precio = Decimal(str(datos.get("precio") or 0))
+    except InvalidOperation:
+        raise ValueError("precio inválido")
+    # "NaN" e "Infinity" son Decimal válidos, pero no se pueden comparar ni guardar en la columna
+    if not precio.is_finite():
+        raise ValueError("precio inválido")
+    if precio < 0:
+        raise ValueError("precio negativo")
+    if precio > PRECIO_MAX:
+        raise ValueError("precio demasiado grande (máximo %s)" % PRECIO_MAX)
+
+    try:
+        stock = int(datos.get("stock") or 0)
+    except (TypeError, ValueError):
+        raise ValueError("stock inválido")
+    if stock < 0:
+        raise ValueError("stock negativo")
+    if stock > STOCK_MAX:
+        raise ValueError("stock demasiado grande")
+
+    fecha = datos.get("fecha") or None
+    if fecha is not None:
+        try:
+            fecha = date.fromisoformat(str(fecha))
+        except ValueError:
+            raise ValueError("fecha inválida (AAAA-MM-DD)")
+
+    return {
+        "id": id_producto,
+        "nombre": str(datos["nombre"]),
+        "descripcion": datos.get("descripcion") or "",
+        "imagen": datos.get("imagen") or "",
+        "precio": precio,
+        "stock": stock,
+        "fecha": fecha,
+    }
+
+
+# --------------------------
+# Importación por lotes
+# --------------------------
+def guardar_lote(db, cursor, productos, usuario):
+    # Guarda un lote de productos validados con una sola sentencia y un commit.
+    # Los productos sin id se buscan por nombre y los que traen id se comprueban
+    # (una sola consulta para todo el lote): si ya existen se actualizan, si no se insertan.
+    # Devuelve (insertados, actualizados).
+    por_nombre = {}
+    for p in productos:
+        por_nombre[p["nombre"]] = p   # importar_productos ya rechaza los nombres repetidos del lote
+
+    sin_id = [nombre for nombre, p in por_nombre.items() if p["id"] is None]
+    con_id = [p["id"] for p in por_nombre.values() if p["id"] is not None]
+    existentes = set()
+    condiciones = []
+    if sin_id:
+        condiciones.append("Nombre_Producto IN (%s)" % ", ".join(["%s"] * len(sin_id)))
+    if con_id:
+        # Un id del archivo que no existe se inserta con ese id: no cuenta como actualización
+        condiciones.append("Id_Producto IN (%s)" % ", ".join(["%s"] * len(con_id)))
+    if condiciones:
+        cursor.execute(
+            "SELECT Id_Producto, Nombre_Producto FROM producto WHERE " + " OR ".join(condiciones),
+            sin_id + con_id
+        )
+        for fila in cursor.fetchall():
+            existentes.add(fila["Id_Producto"])
+            p = por_nombre.get(fila["Nombre_Producto"])
+            if p is not None and p["id"] is None:
+                p["id"] = fila["Id_Producto"]
+
+    filas = list(por_nombre.values())
+    actualizados = sum(1 for p in filas if p["id"] in existentes)
+    valores = []
+    for p in filas:
+        valores.extend((p["id"], p["nombre"], p["descripcion"], p["imagen"], p["precio"], p["stock"], p["fecha"], usuario))
+
+    # Id_Producto NULL -> MySQL asigna uno nuevo (AUTO_INCREMENT); con id existente -> se actualiza
+    try:
+        cursor.execute("""
+            INSERT INTO producto
+            (Id_Producto, Nombre_Producto, Descripcion, Imagen, Precio, Stock, Fecha_Vencimiento, Usuario_D_Creacion, Fecha_Hora_Creacion)
+            VALUES %s
+            ON DUPLICATE KEY UPDATE
+                Nombre_Producto = VALUES(Nombre_Producto),
+                Descripcion = VALUES(Descripcion),
+                Imagen = VALUES(Imagen),
+                Precio = VALUES(Precio),
+                Stock = VALUES(Stock),
+                Fecha_Vencimiento = VALUES(Fecha_Vencimiento)
+        """ % ", ".join(["(%s, %s, %s, %s, %s, %s, %s, %s, NOW())"] * len(filas)), valores)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return len(filas) - actualizados, actualizados
+
+
+def importar_productos(db, cursor, filas, usuario, tamano_lote=500, max_errores=100):
+    # Generador: procesa las filas por lotes y produce un dict de progreso después de cada lote,
+    # y un resumen final con "fin": True. Si un lote falla (error de MySQL, archivo ilegible)
+    # la importación se detiene y el resumen final trae además "error"; los lotes anteriores
+    # ya quedaron guardados y se reflejan en los contadores.
+    progreso = {"lote": 0, "procesadas": 0, "insertadas": 0, "actualizadas": 0, "con_error": 0, "errores": []}
+    lote = []
+
+    # Nombre e id -> línea, de las filas del lote actual: dos filas con el mismo nombre (o id)
+    # se juntarían en una sola al guardar, así que la segunda se rechaza como error de validación
+    nombres = {}
+    ids = {}
+
+    def vaciar():
+        insertadas, actualizadas = guardar_lote(db, cursor, lote, usuario)
+        progreso["lote"] += 1
+        progreso["insertadas"] += insertadas
+        progreso["actualizadas"] += actualizadas
+        lote.clear()
+        nombres.clear()
+        ids.clear()
+
+    def validar(numero, fila):
+        producto = validar_producto(fila)
+        if producto["nombre"] in nombres:
+            raise ValueError("nombre repetido (ya está en la línea %d)" % nombres[producto["nombre"]])
+        if producto["id"] is not None and producto["id"] in ids:
+            raise ValueError("id repetido (ya está en la línea %d)" % ids[producto["id"]])
+        nombres[producto["nombre"]] = numero
+        if producto["id"] is not None:
+            ids[producto["id"]] = numero
+        return producto
+
+    try:
+        for numero, fila in filas:
+            progreso["procesadas"] += 1
+            try:
+                lote.append(validar(numero, fila))
+            except ValueError as error:
+                progreso["con_error"] += 1
+                if len(progreso["errores"]) < max_errores:
+                    progreso["errores"].append({"linea": numero, "error": str(error)})
+                continue
+            if len(lote) >= tamano_lote:
+                vaciar()
+                yield dict(progreso, errores=len(progreso["errores"]))
+
+        if lote:
+            vaciar()
+    except Exception as error:
+        yield dict(progreso, fin=True, error="Importación interrumpida en el lote %d: %s" % (progreso["lote"] + 1, error))
+        return
+    yield dict(progreso, fin=True)
+
+
+# --------------------------
+# Exportación en streaming
+# --------------------------
+def _valor(valor):
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return str(valor)
+    return valor
+
+
+def exportar(db, tabla, formato, tamano_bloque=500, envolver=None):
+    # Generador de texto (CSV o JSON Lines) con todas las filas de la tabla.
+    # Usa su propio cursor sin buffer y lee de a 'tamano_bloque' filas.
+    # envolver: función opcional que envuelve el cursor (Metricas.envolver, para /metrics).
+    columnas = EXPORTABLES[tabla]
+    cursor = db.cursor()
+    if envolver is not None:
+        cursor = envolver(cursor)
+    try:
+        cursor.execute("SELECT %s FROM %s ORDER BY %s" % (", ".join(columnas), tabla, columnas[0]))
+        salida = io.StringIO()
+        escritor = csv.writer(salida)
+        if formato == "csv":
+            escritor.writerow(columnas)
+            yield salida.getvalue()
+
+        while True:
+            filas = cursor.fetchmany(tamano_bloque)
+            if not filas:
+                break
+            salida.seek(0)
+            salida.truncate()
+            for fila in filas:
+                if formato == "csv":
+                    escritor.writerow([_valor(v) for v in fila])
+                else:
+                    salida.write(json.dumps(dict(zip(columnas, map(_valor, fila))), ensure_ascii=False))
+                    salida.write("\n")
+            yield salida.getvalue()
+    finally:
+        # Si el cliente corta la descarga a mitad quedan filas sin leer: se descartan (como en
+        # RepoProveedor.iterar) para que close() no falle con "Unread result found" y la
+        # conexión vuelva al pool sin resultados pendientes.
+        try:
+            cursor.fetchall()
+            cursor.close()
+        except Exception:
+            pass   # conexión rota: el pool la descarta al devolverla (is_connected)
+
+
+def a_csv(columnas, filas, tamano_bloque=500):
+    # Generador de texto CSV para filas que ya vienen de otra consulta (por ejemplo,
+    # RepoVentaDetalle.iterar_lote): encabezado y después un bloque cada 'tamano_bloque' filas.
+    salida = io.StringIO()
+    escritor = csv.writer(salida)
+    escritor.writerow(columnas)
+    for numero, fila in enumerate(filas, 1):
+        escritor.writerow([_valor(v) for v in fila])
+        if numero % tamano_bloque == 0:
+            yield salida.getvalue()
+            salida.seek(0)
+            salida.truncate()
+    yield salida.getvalue()
@@ -0,0 +1,58 @@
+# inventario.py
+# Descuento de stock al confirmar una compra, dentro de la transacción de la compra.
+# 1. Un SELECT ... ORDER BY Id_Producto FOR UPDATE bloquea las filas de producto del carrito
+#    en orden de llave primaria: dos compras con productos en común siempre las bloquean en el
+#    mismo orden y no se producen deadlocks entre ellas (un UPDATE con JOIN no garantiza
+#    ningún orden: lo decide el optimizador).
+# 2. Con el stock ya bloqueado se sabe exactamente qué líneas no alcanzan (SinStock).
+# 3. Un solo UPDATE descuenta todas las líneas; las filas ya son nuestras, así que no puede fallar
+#    por otra compra. Los bloqueos duran hasta el commit de la compra.
+
+class SinStock(Exception):
+    # Una o más líneas del carrito piden más unidades de las que hay.
+    # 'lineas': lista de dicts {"id", "titulo", "pedido", "disponible"}.
+    def __init__(self, lineas):
+        super().__init__("Sin stock suficiente para %d producto(s)" % len(lineas))
+        self.lineas = lineas
+
+
+def descontar_stock(cursor, items):
+    # items: ítems del carrito ({"id", "titulo", "cantidad", ...}).
+    # Descuenta el stock de todos o lanza SinStock con las líneas que no alcanzan
+    # (en ese caso no descuenta nada; quien llama deshace la compra).
+    if not items:
+        return
+    items = sorted(items, key=lambda item: item["id"])
+    ids = [item["id"] for item in items]
+
+    cursor.execute(
+        "SELECT Id_Producto, Stock FROM producto WHERE Id_Producto IN (%s) ORDER BY Id_Producto FOR UPDATE"
+        % ", ".join(["%s"] * len(ids)),
+        ids,
+    )
+    stock = {fila["Id_Producto"]: fila["Stock"] for fila in cursor.fetchall()}
+    faltantes = []
+    for item in items:
+        disponible = stock.get(item["id"]) or 0   # producto borrado o sin stock cargado
+        if disponible < item["cantidad"]:
+            faltantes.append({
+                "id": item["id"],
+                "titulo": item.get("titulo"),
+                "pedido": item["cantidad"],
+                "disponible": max(disponible, 0),
+            })
+    if faltantes:
+        raise SinStock(faltantes)
+
+    pedido = " UNION ALL ".join(["SELECT %s AS Id_Producto, %s AS Cantidad"] * len(items))
+    valores = []
+    for item in items:
+        valores.extend((item["id"], item["cantidad"]))
+    cursor.execute(
+        """
+        UPDATE producto p
+        JOIN (%s) AS pedido ON pedido.Id_Producto = p.Id_Producto
+        SET p.Stock = p.Stock - pedido.Cantidad
+        """ % pedido,
+        valores,
+    )
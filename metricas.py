@@ -0,0 +1,254 @@
+# metricas.py
+# Instrumentación de PaginaWeb: latencia por ruta, consultas SQL por petición y tiempo de cada consulta.
+# - Un wrapper del cursor mide cada execute/executemany.
+# - Hooks before/after_request miden la duración de cada petición.
+# - /metrics devuelve todo en formato de texto de Prometheus.
+# - Con el encabezado "X-Perfil: 1" (si PERFILADO_HABILITADO) se perfila la petición con cProfile
+#   y el resumen se escribe en el log de la app.
+
+import cProfile
+import io
+import pstats
+import threading
+import time
+from collections import deque
+
+from flask import current_app, g, request
+
+# Límites (en segundos) de los buckets de los histogramas
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_CONSULTAS = (1, 2, 5, 10, 20, 50, 100)   # consultas por petición
+
+
+class Histograma:
+    def __init__(self, limites):
+        self.limites = limites
+        self.cuentas = [0] * len(limites)
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        self.suma += valor
+        self.total += 1
+        for i, limite in enumerate(self.limites):
+            if valor <= limite:
+                self.cuentas[i] += 1
+                break
+
+    def lineas(self, nombre, etiquetas):
+        # Líneas Prometheus (_bucket acumulativos, _sum y _count)
+        acumulado = 0
+        for limite, cuenta in zip(self.limites, self.cuentas):
+            acumulado += cuenta
+            yield "%s_bucket{%s} %d" % (nombre, _etiquetas(etiquetas, le=_numero(limite)), acumulado)
+        yield "%s_bucket{%s} %d" % (nombre, _etiquetas(etiquetas, le="+Inf"), self.total)
+        yield "%s_sum{%s} %s" % (nombre, _etiquetas(etiquetas), _numero(self.suma))
+        yield "%s_count{%s} %d" % (nombre, _etiquetas(etiquetas), self.total)
+
+
+def _numero(valor):
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _etiquetas(etiquetas, **extra):
+    todas = list(etiquetas) + list(extra.items())
+    return ",".join('%s="%s"' % (clave, _escapar(valor)) for clave, valor in todas)
+
+
+def _operacion(sql):
+    # Primera palabra de la consulta (SELECT, INSERT, UPDATE...), para agrupar tiempos sin explotar etiquetas
+    palabras = sql.split(None, 1)
+    return palabras[0].upper() if palabras else "?"
+
+
+class CursorInstrumentado:
+    # Envuelve un cursor de mysql.connector y mide cada consulta. Todo lo demás
+    # (fetchall, lastrowid, rowcount, close...) se delega al cursor original.
+    def __init__(self, cursor, metricas):
+        self._cursor = cursor
+        self._metricas = metricas
+
+    def execute(self, sql, params=None, *args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return self._cursor.execute(sql, params, *args, **kwargs)
+        finally:
+            self._metricas.registrar_consulta(sql, time.perf_counter() - inicio)
+
+    def executemany(self, sql, secuencia, *args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return self._cursor.executemany(sql, secuencia, *args, **kwargs)
+        finally:
+            self._metricas.registrar_consulta(sql, time.perf_counter() - inicio)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, nombre):
+        return getattr(self._cursor, nombre)
+
+
+class Metricas:
+    def __init__(self, lenta=0.2, max_lentas=50):
+        self.lenta = lenta                        # segundos a partir de los que una consulta es "lenta"
+        self._lock = threading.Lock()
+        self._peticiones = {}                     # (ruta, método, estado) -> Histograma de duración
+        self._consultas_por_peticion = {}         # ruta -> Histograma de consultas por petición
+        self._consultas = {}                      # (ruta, operación) -> Histograma de duración
+        self._lentas_total = {}                   # ruta -> número de consultas lentas
+        self.lentas = deque(maxlen=max_lentas)    # muestras de consultas lentas (con el SQL)
+        self._fuentes = []                        # (prefijo, función) que devuelven dicts de números
+        self.perfilado = False
+        self._perfilando = threading.Lock()       # un solo perfil a la vez (cProfile es global en 3.12+)
+
+    # --------------------------
+    # Registro
+    # --------------------------
+    def envolver(self, cursor):
+        return CursorInstrumentado(cursor, self)
+
+    def registrar_fuente(self, prefijo, funcion):
+        # Agrega valores instantáneos (gauges) a /metrics, por ejemplo las estadísticas del pool.
+        self._fuentes.append((prefijo, funcion))
+
+    def registrar_consulta(self, sql, duracion):
+        ruta = _ruta_actual()
+        if g:
+            g.metricas_consultas = g.get("metricas_consultas", 0) + 1
+        with self._lock:
+            clave = (ruta, _operacion(sql))
+            if clave not in self._consultas:
+                self._consultas[clave] = Histograma(BUCKETS)
+            self._consultas[clave].observar(duracion)
+            if duracion >= self.lenta:
+                self._lentas_total[ruta] = self._lentas_total.get(ruta, 0) + 1
+                self.lentas.append({
+                    "ruta": ruta,
+                    "sql": " ".join(sql.split())[:2000],
+                    "duracion_ms": round(duracion * 1000, 3),
+                    "momento": time.time(),
+                })
+
+    def registrar(self, app):
+        # Instala los hooks de medición en la app.
+        app.before_request(self._antes)
+        app.after_request(self._despues)
+        # El perfil se cierra en el teardown, que corre también si la vista lanzó una excepción
+        app.teardown_request(self._terminar_perfil)
+
+    def _antes(self):
+        g.metricas_inicio = time.perf_counter()
+        g.metricas_consultas = 0
+        if self.perfilado and request.headers.get("X-Perfil") == "1":
+            # Si ya hay otra petición perfilándose, esta se atiende sin perfil (no se espera ni falla)
+            if not self._perfilando.acquire(blocking=False):
+                return
+            perfil = cProfile.Profile()
+            try:
+                perfil.enable()
+            except ValueError:   # otra herramienta de perfilado activa en el proceso
+                self._perfilando.release()
+                return
+            g.metricas_perfil = perfil
+            g.metricas_perfil_inicio = time.perf_counter()
+
+    def _terminar_perfil(self, error=None):
+        perfil = g.pop("metricas_perfil", None)
+        if perfil is None:
+            return
+        try:
+            perfil.disable()
+            duracion = time.perf_counter() - g.pop("metricas_perfil_inicio")
+            salida = io.StringIO()
+            pstats.Stats(perfil, stream=salida).sort_stats("cumulative").print_stats(25)
+            current_app.logger.warning("Perfil de %s %s (%.1f ms):\n%s",
+                                       request.method, request.path, duracion * 1000, salida.getvalue())
+        finally:
+            self._perfilando.release()
+
+    def _despues(self, respuesta):
+        inicio = g.get("metricas_inicio")
+        if inicio is None:
+            return respuesta
+        # Se guardan ahora los datos de la petición: en una respuesta por partes, cuando se
+        # termina de enviar el cuerpo ya no hay contexto de petición activo.
+        datos = g._get_current_object()
+        ruta = _ruta_actual()
+        metodo = request.method
+
+        def terminar():
+            duracion = time.perf_counter() - inicio
+            consultas = datos.get("metricas_consultas", 0)
+
+            with self._lock:
+                clave = (ruta, metodo, respuesta.status_code)
+                if clave not in self._peticiones:
+                    self._peticiones[clave] = Histograma(BUCKETS)
+                self._peticiones[clave].observar(duracion)
+                if ruta not in self._consultas_por_peticion:
+                    self._consultas_por_peticion[ruta] = Histograma(BUCKETS_CONSULTAS)
+                self._consultas_por_peticion[ruta].observar(consultas)
+            return duracion, consultas
+
+        if respuesta.is_streamed:
+            # after_request corre antes de generar el cuerpo, es decir, antes de las consultas de
+            # /proveedor, /ventas, /exportar, etc.: se mide al cerrar la respuesta, con todo enviado.
+            # (Sin encabezados X-Tiempo-Servidor-Ms / X-Consultas-SQL: ya se habrán enviado.)
+            respuesta.call_on_close(terminar)
+            return respuesta
+
+        duracion, consultas = terminar()
+        respuesta.headers["X-Tiempo-Servidor-Ms"] = "%.1f" % (duracion * 1000)
+        respuesta.headers["X-Consultas-SQL"] = str(consultas)
+        return respuesta
+
+    # --------------------------
+    # Exportación
+    # --------------------------
+    def prometheus(self):
+        # Texto en formato de exposición de Prometheus.
+        lineas = []
+        with self._lock:
+            lineas.append("# HELP http_peticion_duracion_segundos Duración de las peticiones por ruta.")
+            lineas.append("# TYPE http_peticion_duracion_segundos histogram")
+            for (ruta, metodo, estado), h in sorted(self._peticiones.items()):
+                lineas.extend(h.lineas("http_peticion_duracion_segundos",
+                                       [("ruta", ruta), ("metodo", metodo), ("estado", estado)]))
+
+            lineas.append("# HELP db_consultas_por_peticion Consultas SQL ejecutadas en cada petición.")
+            lineas.append("# TYPE db_consultas_por_peticion histogram")
+            for ruta, h in sorted(self._consultas_por_peticion.items()):
+                lineas.extend(h.lineas("db_consultas_por_peticion", [("ruta", ruta)]))
+
+            lineas.append("# HELP db_consulta_duracion_segundos Duración de cada consulta SQL.")
+            lineas.append("# TYPE db_consulta_duracion_segundos histogram")
+            for (ruta, operacion), h in sorted(self._consultas.items()):
+                lineas.extend(h.lineas("db_consulta_duracion_segundos",
+                                       [("ruta", ruta), ("operacion", operacion)]))
+
+            lineas.append("# HELP db_consultas_lentas_total Consultas más lentas que el umbral configurado.")
+            lineas.append("# TYPE db_consultas_lentas_total counter")
+            for ruta, total in sorted(self._lentas_total.items()):
+                lineas.append("db_consultas_lentas_total{%s} %d" % (_etiquetas([("ruta", ruta)]), total))
+
+        for prefijo, funcion in self._fuentes:
+            for clave, valor in sorted(funcion().items()):
+                if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+                    nombre = "%s_%s" % (prefijo, clave)
+                    lineas.append("# TYPE %s gauge" % nombre)
+                    lineas.append("%s %s" % (nombre, _numero(valor)))
+
+        return "\n".join(lineas) + "\n"
+
+
+def _ruta_actual():
+    # Patrón de la ruta (por ejemplo /ventas/detalle/<int:id_venta>) para no crear una serie por id.
+    if not request:
+        return "sin_peticion"
+    regla = request.url_rule
+    return regla.rule if regla is not None else "sin_ruta"
@@ -0,0 +1,134 @@
+# replicas.py
+# Separación de lecturas y escrituras.
+# Las consultas de solo lectura (listados de ventas, productos y proveedores, reportes,
+# exportaciones) se envían a réplicas de MySQL repartidas por turnos (round-robin);
+# las escrituras y el checkout siguen en el primario.
+# - Si una réplica no responde se marca como caída por unos segundos y se usa la siguiente;
+#   si no queda ninguna, la lectura va al primario. Una réplica con el pool lleno no está caída:
+#   se prueba la siguiente y, si todas están ocupadas, se espera por una como cualquier petición.
+# - Después de una escritura, las lecturas de esa misma sesión van al primario durante
+#   'pegajosa' segundos, así el usuario ve lo que acaba de guardar aunque la réplica vaya atrasada.
+#
+# Prueba local con dos instancias (por ejemplo, una réplica de MySQL en el puerto 3307):
+#   PAGINAWEB_DB_REPLICAS=127.0.0.1:3307 python app.py
+# /estado/replicas muestra cuántas lecturas fue a cada lado y qué réplicas están caídas.
+
+import threading
+import time
+
+from flask import g, session
+
+import mysql.connector
+
+from conexion import PoolAgotado
+
+
+class Enrutador:
+    def __init__(self, primario, replicas=(), pegajosa=5.0, reintento=30.0):
+        # primario: PoolConexiones del primario. replicas: lista de PoolConexiones (puede estar vacía).
+        # pegajosa: segundos que una sesión lee del primario después de escribir.
+        # reintento: segundos que una réplica caída queda fuera de la rotación.
+        self.primario = primario
+        self.replicas = list(replicas)
+        self.pegajosa = pegajosa
+        self.reintento = reintento
+        self._lock = threading.Lock()
+        self._turno = 0
+        self._caidas = {}   # nombre de la réplica -> momento (monotonic) en que se vuelve a probar
+
+        # Estadísticas
+        self.lecturas_primario = 0
+        self.lecturas_replica = 0
+        self.fallos_replica = 0
+
+    def registrar(self, app):
+        # Cada réplica devuelve su conexión al terminar la petición (el primario ya está registrado).
+        for replica in self.replicas:
+            replica.registrar(app)
+
+    # --------------------------
+    # Escrituras
+    # --------------------------
+    def marcar_escritura(self):
+        # Llamar después de confirmar una escritura hecha por la petición actual.
+        if self.replicas:
+            session["primario_hasta"] = time.time() + self.pegajosa
+
+    # --------------------------
+    # Lecturas
+    # --------------------------
+    def pool_lectura(self):
+        # Pool para las lecturas de la petición actual (se elige una vez por petición).
+        pool = g.get("lectura_pool")
+        if pool is None:
+            pool = self._elegir()
+            g.lectura_pool = pool
+        return pool
+
+    def _elegir(self):
+        if not self.replicas or session.get("primario_hasta", 0) > time.time():
+            return self._contar_primario()
+
+        with self._lock:
+            inicio = self._turno
+            self._turno = (self._turno + 1) % len(self.replicas)
+        ahora = time.monotonic()
+        ocupadas = []
+        for i in range(len(self.replicas)):
+            replica = self.replicas[(inicio + i) % len(self.replicas)]
+            if self._caidas.get(replica.nombre, 0) > ahora:
+                continue
+            try:
+                # La conexión se pide ya (y no con la primera consulta) para poder pasar
+                # a la siguiente réplica si esta no responde. Sin esperar: si su pool está
+                # lleno se prueba la siguiente, que puede tener conexiones libres.
+                replica.conexion(espera=0)
+            except PoolAgotado:
+                # Ocupada, no caída: sigue en la rotación
+                ocupadas.append(replica)
+                continue
+            except mysql.connector.Error:
+                self._marcar_caida(replica)
+                continue
+            return self._contar_replica(replica)
+
+        # Todas las réplicas vivas están ocupadas: se espera por la primera como cualquier
+        # otra petición (DB_POOL_TIMEOUT), en lugar de cargar al primario con las lecturas.
+        if ocupadas:
+            replica = ocupadas[0]
+            try:
+                replica.conexion()
+            except PoolAgotado:
+                return self._contar_primario()
+            except mysql.connector.Error:
+                self._marcar_caida(replica)
+                return self._contar_primario()
+            return self._contar_replica(replica)
+        return self._contar_primario()
+
+    def _marcar_caida(self, replica):
+        # La réplica no responde (error de conexión): queda fuera de la rotación 'reintento' segundos.
+        with self._lock:
+            self.fallos_replica += 1
+            self._caidas[replica.nombre] = time.monotonic() + self.reintento
+
+    def _contar_replica(self, replica):
+        with self._lock:
+            self.lecturas_replica += 1
+        return replica
+
+    def _contar_primario(self):
+        with self._lock:
+            self.lecturas_primario += 1
+        return self.primario
+
+    def estadisticas(self):
+        ahora = time.monotonic()
+        with self._lock:
+            return {
+                "replicas": len(self.replicas),
+                "caidas": sum(1 for hasta in self._caidas.values() if hasta > ahora),
+                "lecturas_primario": self.lecturas_primario,
+                "lecturas_replica": self.lecturas_replica,
+                "fallos_replica": self.fallos_replica,
+            }
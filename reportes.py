@@ -0,0 +1,175 @@
+# reportes.py
+# Tablas resumen de ventas, mantenidas de forma incremental.
+# En lugar de recorrer toda la tabla venta/venta_detalle para cada reporte, guardar_compra
+# suma cada compra a tres tablas pequeñas (dentro de la misma transacción de la compra):
+# - resumen_venta_dia:      ingresos y número de ventas por día
+# - resumen_producto_dia:   unidades e ingresos por producto y día
+# - resumen_comprador_dia:  ingresos y número de compras por comprador y día (identificado por
+#                           correo, porque cada compra crea una fila nueva en la tabla comprador;
+#                           las compras sin correo no entran en este resumen)
+# Los reportes solo leen estas tablas, así su costo no depende del total de ventas históricas.
+
+import threading
+
+TABLAS = (
+    """
+    CREATE TABLE IF NOT EXISTS resumen_venta_dia (
+        Fecha DATE NOT NULL PRIMARY KEY,
+        Ventas INT NOT NULL DEFAULT 0,
+        Total DECIMAL(14, 2) NOT NULL DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS resumen_producto_dia (
+        Fecha DATE NOT NULL,
+        Id_Producto INT NOT NULL,
+        Unidades INT NOT NULL DEFAULT 0,
+        Total DECIMAL(14, 2) NOT NULL DEFAULT 0,
+        PRIMARY KEY (Fecha, Id_Producto)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS resumen_comprador_dia (
+        Fecha DATE NOT NULL,
+        Correo VARCHAR(150) NOT NULL,
+        Nombre VARCHAR(150),
+        Compras INT NOT NULL DEFAULT 0,
+        Total DECIMAL(14, 2) NOT NULL DEFAULT 0,
+        PRIMARY KEY (Fecha, Correo)
+    )
+    """,
+)
+
+
+class Resumenes:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tablas_listas = False
+
+    @property
+    def tablas_listas(self):
+        # True cuando asegurar_tablas ya se ejecutó en este proceso: quien llama puede
+        # evitar pedir una conexión al primario solo para comprobarlo.
+        return self._tablas_listas
+
+    def asegurar_tablas(self, db, cursor):
+        # Crea las tablas resumen si no existen (una vez por proceso).
+        # ⚠️ Debe llamarse FUERA de una transacción: en MySQL un CREATE TABLE hace commit implícito.
+        if self._tablas_listas:
+            return
+        with self._lock:
+            if not self._tablas_listas:
+                for ddl in TABLAS:
+                    cursor.execute(ddl)
+                db.commit()
+                self._tablas_listas = True
+
+    def registrar_compra(self, cursor, correo, nombre, total, items):
+        # Suma una compra a las tablas resumen. Se ejecuta dentro de la transacción de guardar_compra
+        # (no hace commit): si la compra se deshace, el resumen también.
+        # items: lista de (Id_Producto, cantidad, subtotal)
+        cursor.execute("""
+            INSERT INTO resumen_venta_dia (Fecha, Ventas, Total)
+            VALUES (CURDATE(), 1, %s)
+            ON DUPLICATE KEY UPDATE Ventas = Ventas + 1, Total = Total + VALUES(Total)
+        """, (total,))
+
+        # Sin correo no se puede saber quién es: no entra al ranking de compradores
+        if correo:
+            cursor.execute("""
+                INSERT INTO resumen_comprador_dia (Fecha, Correo, Nombre, Compras, Total)
+                VALUES (CURDATE(), %s, %s, 1, %s)
+                ON DUPLICATE KEY UPDATE Nombre = VALUES(Nombre), Compras = Compras + 1,
+                    Total = Total + VALUES(Total)
+            """, (correo, nombre, total))
+
+        # Un solo INSERT de varias filas para todos los productos de la compra
+        filas = [i for i in items if i[0] is not None]
+        if filas:
+            marcadores = ", ".join(["(CURDATE(), %s, %s, %s)"] * len(filas))
+            valores = [valor for fila in filas for valor in fila]
+            cursor.execute("""
+                INSERT INTO resumen_producto_dia (Fecha, Id_Producto, Unidades, Total)
+                VALUES %s
+                ON DUPLICATE KEY UPDATE Unidades = Unidades + VALUES(Unidades), Total = Total + VALUES(Total)
+            """ % marcadores, valores)
+
+    def reconstruir(self, db, cursor):
+        # Vuelve a calcular las tablas resumen desde todo el historial (venta, venta_detalle, comprador).
+        # Se hace en una sola transacción con DELETE (no TRUNCATE, que haría commit implícito),
+        # así los reportes nunca ven las tablas a medio llenar.
+        self.asegurar_tablas(db, cursor)
+        try:
+            cursor.execute("DELETE FROM resumen_venta_dia")
+            cursor.execute("""
+                INSERT INTO resumen_venta_dia (Fecha, Ventas, Total)
+                SELECT Fecha_Venta, COUNT(*), COALESCE(SUM(Total), 0)
+                FROM venta
+                GROUP BY Fecha_Venta
+            """)
+
+            cursor.execute("DELETE FROM resumen_producto_dia")
+            cursor.execute("""
+                INSERT INTO resumen_producto_dia (Fecha, Id_Producto, Unidades, Total)
+                SELECT v.Fecha_Venta, d.Id_Producto, SUM(d.Cantidad), COALESCE(SUM(d.Subtotal), 0)
+                FROM venta_detalle d
+                INNER JOIN venta v ON d.Id_Venta = v.Id_Venta
+                WHERE d.Id_Producto IS NOT NULL
+                GROUP BY v.Fecha_Venta, d.Id_Producto
+            """)
+
+            cursor.execute("DELETE FROM resumen_comprador_dia")
+            cursor.execute("""
+                INSERT INTO resumen_comprador_dia (Fecha, Correo, Nombre, Compras, Total)
+                SELECT v.Fecha_Venta, c.Correo, MAX(c.Nombre), COUNT(*), COALESCE(SUM(v.Total), 0)
+                FROM venta v
+                INNER JOIN comprador c ON v.Id_Comprador = c.Id_Comprador
+                WHERE c.Correo IS NOT NULL AND c.Correo <> ''
+                GROUP BY v.Fecha_Venta, c.Correo
+            """)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+    def consultar(self, cursor, desde, hasta, limite=10):
+        # Datos del tablero entre dos fechas (incluidas), leyendo solo las tablas resumen.
+        cursor.execute("""
+            SELECT Fecha AS fecha, Ventas AS ventas, Total AS total
+            FROM resumen_venta_dia
+            WHERE Fecha BETWEEN %s AND %s
+            ORDER BY Fecha
+        """, (desde, hasta))
+        por_dia = cursor.fetchall()
+
+        cursor.execute("""
+            SELECT r.Id_Producto AS id, p.Nombre_Producto AS producto,
+                SUM(r.Unidades) AS unidades, SUM(r.Total) AS total
+            FROM resumen_producto_dia r
+            LEFT JOIN producto p ON p.Id_Producto = r.Id_Producto
+            WHERE r.Fecha BETWEEN %s AND %s
+            GROUP BY r.Id_Producto, p.Nombre_Producto
+            ORDER BY unidades DESC
+            LIMIT %s
+        """, (desde, hasta, limite))
+        productos = cursor.fetchall()
+
+        # Compras y total de cada comprador dentro del rango (no de toda su historia)
+        cursor.execute("""
+            SELECT Correo AS correo, MAX(Nombre) AS nombre, SUM(Compras) AS compras, SUM(Total) AS total,
+                MAX(Fecha) AS ultima_compra
+            FROM resumen_comprador_dia
+            WHERE Fecha BETWEEN %s AND %s
+            GROUP BY Correo
+            ORDER BY total DESC
+            LIMIT %s
+        """, (desde, hasta, limite))
+        compradores = cursor.fetchall()
+
+        return {
+            "por_dia": por_dia,
+            "total": sum(float(d["total"]) for d in por_dia),
+            "ventas": sum(int(d["ventas"]) for d in por_dia),
+            "productos": productos,
+            "compradores": compradores,
+        }
@@ -0,0 +1,324 @@
+# repositorios.py
+# Acceso a datos: una clase por tabla (usuario, producto, proveedor, comprador, venta, venta_detalle).
+# - Las consultas usan sentencias preparadas en el servidor (ver PoolConexiones.preparado):
+#   MySQL analiza cada SQL distinto una sola vez por conexión y después solo recibe los parámetros,
+#   siempre que se ejecute con el str que devuelve preparado() (ver Repositorio._ejecutar).
+# - Se piden columnas explícitas (nada de SELECT *), así viajan menos bytes por la red.
+# - Cada fila llega como una tupla con nombre (ver tipo_fila) en lugar de un dict: ocupa menos memoria
+#   y es más rápida de construir. Acepta fila.Columna y también fila["Columna"], como los dicts.
+#
+# Los métodos usan la conexión de la petición actual, salvo que se pase 'conexion'
+# (por ejemplo, la del hilo escritor de cola_compras.py). Ninguno hace commit.
+# Las lecturas de listados van a una réplica si hay un Enrutador (ver replicas.py);
+# con primario=True se leen del primario.
+
+from collections import namedtuple
+from itertools import groupby
+
+
+class _AccesoPorNombre:
+    __slots__ = ()
+
+    def __getitem__(self, clave):
+        if isinstance(clave, str):
+            try:
+                return getattr(self, clave)
+            except AttributeError:
+                raise KeyError(clave)
+        return tuple.__getitem__(self, clave)
+
+    def get(self, clave, defecto=None):
+        return getattr(self, clave, defecto)
+
+
+def tipo_fila(nombre, columnas):
+    # Tipo de fila para una consulta: namedtuple + acceso fila["Columna"].
+    return type(nombre, (_AccesoPorNombre, namedtuple(nombre, columnas)), {"__slots__": ()})
+
+
+def _escapar_like(texto):
+    # Escapa los comodines de LIKE ('%' y '_') y la barra invertida (el carácter de escape por
+    # defecto de MySQL): la búsqueda de "_" encuentra ese carácter, no cualquier nombre.
+    return texto.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+Usuario = tipo_fila("Usuario", "Id_Usuario Nombre")
+Producto = tipo_fila("Producto", "Id_Producto Nombre_Producto Descripcion Imagen Precio Stock Fecha_Vencimiento")
+Proveedor = tipo_fila("Proveedor", "Id_Proveedor Nombre Telefono Correo Direccion Tipo_Producto")
+Venta = tipo_fila("Venta", "id comprador fecha total usuario_creacion fecha_creacion")
+DetalleVenta = tipo_fila("DetalleVenta", "producto cantidad precio subtotal")
+LineaVenta = tipo_fila("LineaVenta", "id_venta fecha comprador total producto cantidad precio subtotal")
+
+
+class Repositorio:
+    def __init__(self, pool, enrutador=None):
+        self.pool = pool              # primario: escrituras y lecturas que deben ver lo último guardado
+        self.enrutador = enrutador    # reparte las lecturas entre réplicas (opcional)
+
+    def _lectura(self, primario=False):
+        # Pool para una consulta de solo lectura de la petición actual.
+        if primario or self.enrutador is None:
+            return self.pool
+        return self.enrutador.pool_lectura()
+
+    def _ejecutar(self, sql, valores=(), conexion=None, pool=None):
+        # Se ejecuta el SQL que devuelve preparado() (el mismo objeto de la primera vez):
+        # así el cursor reconoce la sentencia ya preparada y no la vuelve a enviar a MySQL.
+        cursor, sql = (pool or self.pool).preparado(sql, conexion)
+        cursor.execute(sql, tuple(valores))
+        return cursor
+
+    def _todos(self, tipo, sql, valores=(), conexion=None, pool=None):
+        return list(map(tipo._make, self._ejecutar(sql, valores, conexion, pool).fetchall()))
+
+    def _uno(self, tipo, sql, valores=(), conexion=None, pool=None):
+        # fetchall y no fetchone: un cursor preparado no puede volver a ejecutarse con filas sin leer
+        filas = self._todos(tipo, sql, valores, conexion, pool)
+        return filas[0] if filas else None
+
+
+class RepoUsuario(Repositorio):
+    def autenticar(self, id_usuario, contrasena):
+        # Usuario con ese id y contraseña, o None.
+        return self._uno(Usuario, """
+            SELECT Id_Usuario, Nombre FROM usuario
+            WHERE Id_Usuario = %s AND Contraseña = %s
+        """, (id_usuario, contrasena))
+
+
+class RepoProducto(Repositorio):
+    def listar(self, primario=False):
+        # Catálogo completo (lo lee CacheProductos cuando no está vigente).
+        return self._todos(Producto, """
+            SELECT Id_Producto, Nombre_Producto, Descripcion, Imagen, Precio, Stock, Fecha_Vencimiento
+            FROM producto
+        """, pool=self._lectura(primario))
+
+    def crear(self, nombre, descripcion, imagen, precio, stock, fecha, usuario="admin"):
+        cursor = self._ejecutar("""
+            INSERT INTO producto
+            (Nombre_Producto, Descripcion, Imagen, Precio, Stock, Fecha_Vencimiento, Usuario_D_Creacion, Fecha_Hora_Creacion)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, NOW())
+        """, (nombre, descripcion, imagen, precio, stock, fecha, usuario))
+        return cursor.lastrowid
+
+    def actualizar(self, id_producto, nombre, descripcion, imagen, precio, stock, fecha):
+        self._ejecutar("""
+            UPDATE producto SET
+                Nombre_Producto = %s,
+                Descripcion = %s,
+                Imagen = %s,
+                Precio = %s,
+                Stock = %s,
+                Fecha_Vencimiento = %s
+            WHERE Id_Producto = %s
+        """, (nombre, descripcion, imagen, precio, stock, fecha, id_producto))
+
+    def eliminar(self, id_producto):
+        self._ejecutar("DELETE FROM producto WHERE Id_Producto = %s", (id_producto,))
+
+
+class RepoProveedor(Repositorio):
+    def listar(self, primario=False):
+        return self._todos(Proveedor, """
+            SELECT Id_Proveedor, Nombre, Telefono, Correo, Direccion, Tipo_Producto
+            FROM proveedor
+        """, pool=self._lectura(primario))
+
+    def iterar(self, tamano=200, primario=False):
+        # Igual que listar(), pero entrega las filas a medida que llegan de MySQL (de a 'tamano'),
+        # para páginas que se envían por partes: nunca están todas en memoria a la vez.
+        cursor = self._ejecutar("""
+            SELECT Id_Proveedor, Nombre, Telefono, Correo, Direccion, Tipo_Producto
+            FROM proveedor
+        """, pool=self._lectura(primario))
+        try:
+            while True:
+                filas = cursor.fetchmany(tamano)
+                if not filas:
+                    break
+                for fila in filas:
+                    yield Proveedor._make(fila)
+        finally:
+            # Si el envío se corta a mitad, se descarta el resto: la conexión vuelve al pool
+            # sin resultados pendientes (si no, el próximo execute fallaría con "Unread result")
+            cursor.fetchall()
+
+    def obtener(self, id_proveedor):
+        # Del primario: se usa para editar, y el formulario debe mostrar lo último guardado
+        return self._uno(Proveedor, """
+            SELECT Id_Proveedor, Nombre, Telefono, Correo, Direccion, Tipo_Producto
+            FROM proveedor WHERE Id_Proveedor = %s
+        """, (id_proveedor,))
+
+    def crear(self, nombre, telefono, correo, direccion, tipo, usuario):
+        cursor = self._ejecutar("""
+            INSERT INTO proveedor (Nombre, Telefono, Correo, Direccion, Tipo_Producto, Usuario_D_Creacion, Fecha_Hora_Creacion)
+            VALUES (%s, %s, %s, %s, %s, %s, NOW())
+        """, (nombre, telefono, correo, direccion, tipo, usuario))
+        return cursor.lastrowid
+
+    def actualizar(self, id_proveedor, nombre, telefono, correo, direccion, tipo):
+        self._ejecutar("""
+            UPDATE proveedor SET
+                Nombre = %s,
+                Telefono = %s,
+                Correo = %s,
+                Direccion = %s,
+                Tipo_Producto = %s
+            WHERE Id_Proveedor = %s
+        """, (nombre, telefono, correo, direccion, tipo, id_proveedor))
+
+    def eliminar(self, id_proveedor):
+        self._ejecutar("DELETE FROM proveedor WHERE Id_Proveedor = %s", (id_proveedor,))
+
+
+class RepoComprador(Repositorio):
+    def crear(self, nombre, correo, telefono, direccion, usuario, conexion=None):
+        cursor = self._ejecutar("""
+            INSERT INTO comprador (Nombre, Correo, Telefono, Direccion, Usuario_D_Creacion, Fecha_Hora_Creacion)
+            VALUES (%s, %s, %s, %s, %s, NOW())
+        """, (nombre, correo, telefono, direccion, usuario), conexion)
+        return cursor.lastrowid
+
+
+class RepoVenta(Repositorio):
+    def crear(self, id_comprador, total, usuario, conexion=None):
+        cursor = self._ejecutar("""
+            INSERT INTO venta (Id_Comprador, Fecha_Venta, Total, Usuario_D_Creacion, Fecha_Hora_Creacion)
+            VALUES (%s, CURDATE(), %s, %s, NOW())
+        """, (id_comprador, total, usuario), conexion)
+        return cursor.lastrowid
+
+    def listar(self, antes=None, desde=None, hasta=None, comprador="", limite=50, primario=False):
+        # Una página de ventas, de la más reciente a la más antigua (keyset sobre Id_Venta).
+        # Cada combinación de filtros es un SQL distinto: como mucho 16 sentencias preparadas.
+        condiciones = []
+        valores = []
+        if antes is not None:
+            condiciones.append("v.Id_Venta < %s")
+            valores.append(antes)
+        if desde is not None:
+            condiciones.append("v.Fecha_Venta >= %s")
+            valores.append(desde)
+        if hasta is not None:
+            condiciones.append("v.Fecha_Venta <= %s")
+            valores.append(hasta)
+        if comprador:
+            condiciones.append("c.Nombre LIKE %s")
+            valores.append("%" + _escapar_like(comprador) + "%")
+        where = ("WHERE " + " AND ".join(condiciones)) if condiciones else ""
+        valores.append(limite)
+
+        return self._todos(Venta, """
+            SELECT v.Id_Venta AS id,
+                c.Nombre AS comprador,
+                v.Fecha_Venta AS fecha,
+                v.Total AS total,
+                v.Usuario_D_Creacion AS usuario_creacion,
+                v.Fecha_Hora_Creacion AS fecha_creacion
+            FROM venta v
+            INNER JOIN comprador c ON v.Id_Comprador = c.Id_Comprador
+            %s
+            ORDER BY v.Id_Venta DESC
+            LIMIT %%s
+        """ % where, valores, pool=self._lectura(primario))
+
+
+class RepoVentaDetalle(Repositorio):
+    def crear(self, id_venta, items, usuario, conexion=None):
+        # Todas las líneas en un único INSERT de varias filas (un executemany con sentencia
+        # preparada enviaría una ejecución por fila). Hay una sentencia preparada por
+        # cantidad de líneas distinta, y los carritos son cortos.
+        if not items:
+            return
+        marcador = "(%s, %s, %s, %s, %s, %s, NOW())"
+        valores = []
+        for item in items:
+            valores.extend((
+                id_venta,
+                item["id"],
+                item["cantidad"],
+                item["precio"],
+                item["precio"] * item["cantidad"],   # subtotal
+                usuario,
+            ))
+        self._ejecutar("""
+            INSERT INTO venta_detalle
+            (Id_Venta, Id_Producto, Cantidad, Precio_Unitario, Subtotal, Usuario_D_Creacion, Fecha_Hora_Creacion)
+            VALUES %s
+        """ % ", ".join([marcador] * len(items)), valores, conexion)
+
+    def por_venta(self, id_venta, primario=False):
+        # Productos, cantidad, precio y subtotal de una venta.
+        return self._todos(DetalleVenta, """
+            SELECT p.Nombre_Producto AS producto,
+                d.Cantidad AS cantidad,
+                d.Precio_Unitario AS precio,
+                d.Subtotal AS subtotal
+            FROM venta_detalle d
+            INNER JOIN producto p ON d.Id_Producto = p.Id_Producto
+            WHERE d.Id_Venta = %s
+        """, (id_venta,), pool=self._lectura(primario))
+
+    def iterar_lote(self, ids=None, desde_id=None, hasta_id=None, tamano=500, primario=False):
+        # Líneas de varias ventas en UNA sola consulta: las de la lista 'ids' o las del rango
+        # [desde_id, hasta_id]. Ordenadas por venta (ver agrupar_por_venta) y entregadas de a
+        # 'tamano' filas. Una venta sin líneas aparece una vez, con producto/cantidad en None.
+        if ids is not None:
+            # La cantidad de marcadores del IN se redondea a la siguiente potencia de 2 repitiendo
+            # el último id: con hasta 1000 ids quedan solo 11 sentencias preparadas distintas.
+            marcadores = 1
+            while marcadores < len(ids):
+                marcadores *= 2
+            valores = list(ids) + [ids[-1]] * (marcadores - len(ids))
+            condicion = "v.Id_Venta IN (%s)" % ", ".join(["%s"] * marcadores)
+        else:
+            valores = (desde_id, hasta_id)
+            condicion = "v.Id_Venta BETWEEN %s AND %s"
+
+        cursor = self._ejecutar("""
+            SELECT v.Id_Venta AS id_venta,
+                v.Fecha_Venta AS fecha,
+                c.Nombre AS comprador,
+                v.Total AS total,
+                p.Nombre_Producto AS producto,
+                d.Cantidad AS cantidad,
+                d.Precio_Unitario AS precio,
+                d.Subtotal AS subtotal
+            FROM venta v
+            INNER JOIN comprador c ON v.Id_Comprador = c.Id_Comprador
+            LEFT JOIN venta_detalle d ON d.Id_Venta = v.Id_Venta
+            LEFT JOIN producto p ON d.Id_Producto = p.Id_Producto
+            WHERE %s
+            ORDER BY v.Id_Venta, d.Id_Detalle
+        """ % condicion, valores, pool=self._lectura(primario))
+        try:
+            while True:
+                filas = cursor.fetchmany(tamano)
+                if not filas:
+                    break
+                for fila in filas:
+                    yield LineaVenta._make(fila)
+        finally:
+            # Igual que RepoProveedor.iterar: no dejar resultados sin leer en la conexión
+            cursor.fetchall()
+
+
+def agrupar_por_venta(lineas):
+    # Convierte las filas de RepoVentaDetalle.iterar_lote en una venta por vez:
+    # {"id", "fecha", "comprador", "total", "lineas": [DetalleVenta, ...]}.
+    # Es un generador: solo una venta está armada en memoria a la vez.
+    for id_venta, filas in groupby(lineas, key=lambda linea: linea.id_venta):
+        filas = list(filas)
+        primera = filas[0]
+        yield {
+            "id": id_venta,
+            "fecha": primera.fecha,
+            "comprador": primera.comprador,
+            "total": primera.total,
+            "lineas": [
+                DetalleVenta(f.producto, f.cantidad, f.precio, f.subtotal)
+                for f in filas if f.cantidad is not None
+            ],
+        }
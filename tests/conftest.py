@@ -0,0 +1,8 @@
+# conftest.py
+# Los módulos de la aplicación están en la raíz del repositorio (sin paquete):
+# se agrega esa carpeta al path para que las pruebas puedan importarlos.
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,87 @@
+# test_cache_paginas.py
+# Caché de páginas: backends (memoria y disco) y la vista cacheada vía test_client.
+
+import pytest
+
+flask = pytest.importorskip("flask")
+
+from cache_paginas import BackendDisco, BackendMemoria, CachePaginas, Pagina
+
+
+def pagina(tamano):
+    return Pagina(b"x" * tamano, "text/html", "etag", 0, 0)
+
+
+def test_memoria_respeta_el_limite():
+    backend = BackendMemoria(max_bytes=250)
+    for clave in "abc":
+        backend.guardar(clave, pagina(100))
+    assert backend.obtener("a") is None
+    assert backend.obtener("c") is not None
+    assert backend.estadisticas()["bytes"] <= 250
+
+
+def test_disco_comparte_generaciones_y_limite(tmp_path):
+    uno = BackendDisco(str(tmp_path), max_bytes=1000)
+    otro = BackendDisco(str(tmp_path), max_bytes=1000)
+    uno.guardar("a", pagina(100))
+    assert otro.obtener("a").cuerpo == b"x" * 100
+    otro.avanzar("catalogo")
+    assert uno.generacion("catalogo") == 1
+    for i in range(20):
+        (uno if i % 2 else otro).guardar("p%d" % i, pagina(100))
+    ocupado = sum(f.stat().st_size for f in (tmp_path / "paginas").iterdir())
+    # Cada worker puede pasarse como mucho una décima parte del límite
+    assert ocupado <= 1000 + 2 * 100 + 200
+
+
+@pytest.fixture
+def app():
+    app = flask.Flask(__name__)
+    app.secret_key = "pruebas"
+    paginas = CachePaginas(BackendMemoria(10 ** 6))
+    app.paginas = paginas
+    app.renderizadas = 0
+
+    @app.route("/")
+    @paginas.cachear(etiquetas=("catalogo",))
+    def index():
+        app.renderizadas += 1
+        return "pagina %d" % app.renderizadas
+
+    @app.route("/entrar")
+    def entrar():
+        flask.session["usuario"] = "ana"
+        return "ok"
+
+    return app
+
+
+def test_segunda_visita_sale_de_la_cache(app):
+    cliente = app.test_client()
+    primera = cliente.get("/")
+    segunda = cliente.get("/")
+    assert primera.data == segunda.data == b"pagina 1"
+    assert app.paginas.aciertos == 1
+
+
+def test_if_none_match_responde_304(app):
+    cliente = app.test_client()
+    etag = cliente.get("/").headers["ETag"]
+    respuesta = cliente.get("/", headers={"If-None-Match": etag})
+    assert respuesta.status_code == 304
+    assert respuesta.data == b""
+
+
+def test_purgar_vuelve_a_renderizar(app):
+    cliente = app.test_client()
+    cliente.get("/")
+    app.paginas.purgar("catalogo")
+    assert cliente.get("/").data == b"pagina 2"
+
+
+def test_usuario_con_sesion_no_usa_la_cache(app):
+    cliente = app.test_client()
+    cliente.get("/")
+    cliente.get("/entrar")
+    assert cliente.get("/").data == b"pagina 2"
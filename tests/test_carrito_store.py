@@ -0,0 +1,74 @@
+# test_carrito_store.py
+# Las dos implementaciones del carrito deben comportarse igual.
+
+import time
+
+import pytest
+
+from carrito_store import CarritoMemoria, CarritoSQLite, crear_store
+
+PRODUCTO = {"id": 7, "titulo": "Taza", "precio": 12.5, "imagen": "producto_1.png"}
+
+
+@pytest.fixture(params=["memoria", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memoria":
+        return CarritoMemoria()
+    return CarritoSQLite(str(tmp_path / "carritos.db"))
+
+
+def test_agregar_suma_cantidades(store):
+    assert store.agregar("c1", PRODUCTO) == 1
+    assert store.agregar("c1", PRODUCTO, 3) == 4
+    items = store.obtener("c1")
+    assert items[7]["cantidad"] == 4
+    assert items[7]["titulo"] == "Taza"
+    assert store.obtener("c2") == {}
+
+
+def test_sumar_y_fijar(store):
+    store.agregar("c1", PRODUCTO, 2)
+    assert store.sumar("c1", 7, 3) == 5
+    assert store.fijar("c1", 7, 9) == 9
+    assert store.sumar("c1", 7, -9) == 0
+    assert store.obtener("c1") == {}
+
+
+def test_producto_que_no_esta(store):
+    assert store.sumar("c1", 99, 1) is None
+    assert store.fijar("c1", 99, 3) is None
+    assert store.fijar("c1", 99, 0) is None
+
+
+def test_eliminar_y_vaciar(store):
+    store.agregar("c1", PRODUCTO)
+    store.agregar("c1", dict(PRODUCTO, id=8))
+    store.eliminar("c1", 7)
+    assert list(store.obtener("c1")) == [8]
+    store.vaciar("c1")
+    assert store.obtener("c1") == {}
+
+
+def test_sqlite_borra_carritos_abandonados(tmp_path):
+    store = CarritoSQLite(str(tmp_path / "carritos.db"), max_inactivo=60)
+    store.agregar("viejo", PRODUCTO)
+    with store._conexion() as conexion:
+        conexion.execute("UPDATE carrito_item SET actualizado = ?", (time.time() - 120,))
+    store._proxima_limpieza = 0
+    store.agregar("nuevo", PRODUCTO)
+    assert store.obtener("viejo") == {}
+    assert store.obtener("nuevo")[7]["cantidad"] == 1
+
+
+def test_memoria_borra_carritos_abandonados(monkeypatch):
+    store = CarritoMemoria(max_inactivo=60)
+    store.agregar("viejo", PRODUCTO)
+    store._tocado["viejo"] -= 120
+    store._proxima_limpieza = 0
+    store.agregar("nuevo", PRODUCTO)
+    assert "viejo" not in store._carritos
+
+
+def test_backend_desconocido():
+    with pytest.raises(ValueError):
+        crear_store("redis")
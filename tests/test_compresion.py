@@ -0,0 +1,68 @@
+# test_compresion.py
+# Compresión de respuestas negociada con Accept-Encoding (vía test_client).
+
+import gzip
+
+import pytest
+
+flask = pytest.importorskip("flask")
+
+import compresion
+from compresion import Compresor
+
+GRANDE = "hola mundo " * 500
+
+
+@pytest.fixture
+def cliente(monkeypatch):
+    monkeypatch.setattr(compresion, "brotli", None)   # resultados iguales con o sin brotli
+    app = flask.Flask(__name__)
+    Compresor(minimo=1024).registrar(app)
+
+    @app.route("/grande")
+    def grande():
+        respuesta = flask.make_response(GRANDE)
+        respuesta.set_etag("abc")
+        return respuesta
+
+    @app.route("/chica")
+    def chica():
+        return "hola"
+
+    @app.route("/partes")
+    def partes():
+        return flask.Response((GRANDE for _ in range(3)), mimetype="text/plain")
+
+    @app.route("/imagen")
+    def imagen():
+        return flask.Response(b"\x89PNG" * 500, mimetype="image/png")
+
+    return app.test_client()
+
+
+def test_gzip_si_se_acepta(cliente):
+    respuesta = cliente.get("/grande", headers={"Accept-Encoding": "gzip"})
+    assert respuesta.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in respuesta.headers["Vary"]
+    assert gzip.decompress(respuesta.data).decode() == GRANDE
+    assert respuesta.headers["ETag"] == 'W/"abc"'
+
+
+def test_sin_accept_encoding_o_q0(cliente):
+    for encabezados in ({}, {"Accept-Encoding": "gzip;q=0"}):
+        respuesta = cliente.get("/grande", headers=encabezados)
+        assert "Content-Encoding" not in respuesta.headers
+        assert respuesta.data.decode() == GRANDE
+
+
+def test_respuestas_chicas_e_imagenes_sin_comprimir(cliente):
+    for ruta in ("/chica", "/imagen"):
+        respuesta = cliente.get(ruta, headers={"Accept-Encoding": "gzip"})
+        assert "Content-Encoding" not in respuesta.headers
+
+
+def test_streaming_por_partes(cliente):
+    respuesta = cliente.get("/partes", headers={"Accept-Encoding": "gzip"})
+    assert respuesta.headers["Content-Encoding"] == "gzip"
+    assert "Content-Length" not in respuesta.headers
+    assert gzip.decompress(respuesta.data).decode() == GRANDE * 3
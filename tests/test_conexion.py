@@ -0,0 +1,121 @@
+# test_conexion.py
+# Pruebas del pool de conexiones con una conexión falsa (sin servidor MySQL).
+
+import pytest
+
+flask = pytest.importorskip("flask")
+mysql_connector = pytest.importorskip("mysql.connector")
+
+import conexion as modulo
+from conexion import PoolAgotado, PoolConexiones
+
+
+class ConexionFalsa:
+    # Imita lo que el pool usa de una conexión de mysql-connector.
+    def __init__(self):
+        self.conectada = True
+        self.in_transaction = False
+        self.rollbacks = 0
+        self.cerrada = False
+
+    def is_connected(self):
+        return self.conectada
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.in_transaction = False
+
+    def close(self):
+        self.cerrada = True
+
+    def cursor(self, **opciones):
+        return CursorFalso(opciones)
+
+
+class CursorFalso:
+    def __init__(self, opciones):
+        self.opciones = opciones
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    creadas = []
+
+    def conectar(**config):
+        creadas.append(ConexionFalsa())
+        return creadas[-1]
+
+    monkeypatch.setattr(modulo.mysql.connector, "connect", conectar)
+    pool = PoolConexiones({}, tamano=2, espera_max=0.05)
+    pool.creadas = creadas
+    return pool
+
+
+def test_reutiliza_la_ultima_devuelta(pool):
+    a = pool.obtener()
+    b = pool.obtener()
+    pool.devolver(a)
+    pool.devolver(b)
+    assert pool.obtener() is b
+    assert len(pool.creadas) == 2
+
+
+def test_deshace_transaccion_abierta(pool):
+    c = pool.obtener()
+    c.in_transaction = True
+    pool.devolver(c)
+    assert c.rollbacks == 1
+    assert pool.obtener() is c
+
+
+def test_descarta_conexion_caida(pool):
+    c = pool.obtener()
+    pool.preparado("SELECT 1", c)
+    c.conectada = False
+    pool.devolver(c)
+    assert c.cerrada
+    estado = pool.estadisticas()
+    assert estado["creadas"] == 0
+    assert estado["libres"] == 0
+    assert estado["sentencias_preparadas"] == 0
+    assert pool.obtener() is not c
+
+
+def test_descarta_conexion_marcada_rota(pool):
+    c = pool.obtener()
+    pool.devolver(c, rota=True)
+    assert c.cerrada
+    assert pool.estadisticas()["creadas"] == 0
+
+
+def test_liberar_descarta_tras_error_mysql(pool):
+    app = flask.Flask(__name__)
+    with app.app_context():
+        c = pool.conexion()
+        pool.liberar(mysql_connector.Error("se perdió la conexión"))
+        assert c.cerrada
+    with app.app_context():
+        c = pool.conexion()
+        pool.liberar(ValueError("error de la vista"))
+        assert not c.cerrada
+    assert pool.estadisticas()["libres"] == 1
+
+
+def test_agotado_sin_espera(pool):
+    pool.obtener()
+    pool.obtener()
+    with pytest.raises(PoolAgotado):
+        pool.obtener(espera=0)
+    assert pool.estadisticas()["agotado"] == 1
+
+
+def test_preparado_devuelve_el_mismo_sql(pool):
+    c = pool.obtener()
+    cursor, sql = pool.preparado("SELECT %s" % "1", c)
+    otro_cursor, otro_sql = pool.preparado("SELECT %s" % "1", c)
+    assert otro_cursor is cursor
+    assert otro_sql is sql
+    assert cursor.opciones == {"prepared": True}
@@ -0,0 +1,50 @@
+# test_inventario.py
+# Descuento de stock con un cursor falso que registra las consultas.
+
+import pytest
+
+from inventario import SinStock, descontar_stock
+
+
+class CursorFalso:
+    def __init__(self, stock):
+        self.stock = stock          # {id: stock}
+        self.consultas = []
+
+    def execute(self, sql, parametros=()):
+        self.consultas.append((" ".join(sql.split()), list(parametros)))
+
+    def fetchall(self):
+        _, ids = self.consultas[-1]
+        return [{"Id_Producto": i, "Stock": self.stock[i]} for i in sorted(ids) if i in self.stock]
+
+
+def test_bloquea_en_orden_y_descuenta():
+    cursor = CursorFalso({1: 5, 2: 5, 3: 5})
+    descontar_stock(cursor, [{"id": 3, "cantidad": 1}, {"id": 1, "cantidad": 2}])
+    bloqueo, actualizacion = cursor.consultas
+    assert bloqueo[0].endswith("ORDER BY Id_Producto FOR UPDATE")
+    assert bloqueo[1] == [1, 3]
+    assert actualizacion[0].startswith("UPDATE producto p JOIN")
+    assert actualizacion[1] == [1, 2, 3, 1]
+
+
+def test_sin_stock_no_descuenta():
+    cursor = CursorFalso({1: 5, 2: 1})
+    with pytest.raises(SinStock) as error:
+        descontar_stock(cursor, [
+            {"id": 1, "titulo": "Taza", "cantidad": 2},
+            {"id": 2, "titulo": "Plato", "cantidad": 3},
+            {"id": 9, "titulo": "Borrado", "cantidad": 1},
+        ])
+    assert error.value.lineas == [
+        {"id": 2, "titulo": "Plato", "pedido": 3, "disponible": 1},
+        {"id": 9, "titulo": "Borrado", "pedido": 1, "disponible": 0},
+    ]
+    assert len(cursor.consultas) == 1
+
+
+def test_carrito_vacio():
+    cursor = CursorFalso({})
+    descontar_stock(cursor, [])
+    assert cursor.consultas == []